@@ -0,0 +1,116 @@
+"""
+Offline scrape benchmark.
+
+Replays recorded search responses (see homeharvest.core.transport) through scrape_property and
+reports pages/s, rows/s and peak memory per return type, with no network access. Fixtures are
+generated on the first run by recording synthetic responses; --fixtures can point at recordings of
+live scrapes instead.
+
+    python benchmarks/bench.py
+    python benchmarks/bench.py --sizes 1000 10000 --return-types pandas lazy --latency 0.05
+    python benchmarks/bench.py --json results.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from homeharvest import scrape_property  # noqa: E402
+from homeharvest.core import jsonlib, transport  # noqa: E402
+from homeharvest.core.scrapers.realtor import RealtorScraper  # noqa: E402
+from synthetic import PAGE_SIZE, SyntheticAdapter  # noqa: E402
+
+LOCATION = "San Diego, CA"
+RETURN_TYPES = ["pandas", "pydantic", "raw", "compact", "lazy"]
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def fixture_dir(fixtures: str, size: int) -> str:
+    return os.path.join(fixtures, f"{size}_listings")
+
+
+def generate_fixtures(directory: str, size: int) -> None:
+    """Record a synthetic scrape of size listings into directory."""
+    transport.record(directory, SyntheticAdapter(total=size))
+    scrape_property(LOCATION, return_type="raw", limit=size, coalesce=False)
+    transport.reset()
+
+
+def scrape(size: int, return_type: str) -> int:
+    RealtorScraper._location_cache.clear()  #: every run resolves the location, like a cold scrape
+    results = scrape_property(LOCATION, return_type=return_type, limit=size, coalesce=False)
+    return len(results)
+
+
+def run(directory: str, size: int, return_type: str, latency: float, repeat: int) -> dict:
+    transport.replay(directory, latency=latency)
+
+    durations = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        rows = scrape(size, return_type)
+        durations.append(time.perf_counter() - start)
+
+    #: memory is measured in a separate run, as tracing slows the scrape down
+    gc.collect()
+    tracemalloc.start()
+    scrape(size, return_type)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    seconds = min(durations)
+    pages = math.ceil(rows / PAGE_SIZE)
+    return {
+        "listings": size,
+        "return_type": return_type,
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "pages_per_second": round(pages / seconds, 2),
+        "rows_per_second": round(rows / seconds),
+        "peak_memory_mb": round(peak / 2**20, 1),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Offline scrape benchmark (record/replay fixtures).")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Listings per fixture")
+    parser.add_argument("--return-types", nargs="+", choices=RETURN_TYPES, default=RETURN_TYPES)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="Fixture directory (generated if missing)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per request")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (the fastest is reported)")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{'listings':>9} {'return type':<12} {'seconds':>8} {'pages/s':>9} {'rows/s':>9} {'peak MB':>8}")
+    for size in args.sizes:
+        directory = fixture_dir(args.fixtures, size)
+        if not os.path.isdir(directory):
+            generate_fixtures(directory, size)
+
+        for return_type in args.return_types:
+            result = run(directory, size, return_type, args.latency, args.repeat)
+            results.append(result)
+            print(
+                f"{size:>9} {return_type:<12} {result['seconds']:>8.3f} {result['pages_per_second']:>9.1f} "
+                f"{result['rows_per_second']:>9} {result['peak_memory_mb']:>8.1f}"
+            )
+
+    transport.reset()
+    if args.json:
+        with open(args.json, "wb") as f:
+            f.write(jsonlib.dumpb({"latency": args.latency, "results": results}))
+
+
+if __name__ == "__main__":
+    main()
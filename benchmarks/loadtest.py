@@ -0,0 +1,108 @@
+"""
+Load test of concurrent scrapes against the local stand-in server.
+
+Starts the stand-in (standin.py) in-process, points the scraper at it and runs --markets scrapes
+at once, then reports throughput, the server's view of the load (requests, 429s, peak concurrent
+requests) and peak memory. Useful to tune NUM_PROPERTY_WORKERS, batch concurrency and retry
+behavior under latency and 429 bursts.
+
+    python benchmarks/loadtest.py --markets 8 --total 5000 --latency 0.1 --jitter 0.1
+    python benchmarks/loadtest.py --markets 4 --workers 40 --burst-every 50 --burst-length 5 --stream
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from homeharvest import scrape_property  # noqa: E402
+from homeharvest.core.scrapers.realtor import RealtorScraper  # noqa: E402
+from standin import StandinServer, add_profile_arguments, profile_from_args  # noqa: E402
+from synthetic import CITIES  # noqa: E402
+
+LISTING_TYPES = ["for_sale", "sold", "for_rent"]
+
+
+def markets(count: int) -> list[tuple[str, str]]:
+    """count distinct (location, listing_type) markets."""
+    pairs = itertools.product(LISTING_TYPES, [f"{city}, {state}" for city, state, *_ in CITIES])
+    return [(location, listing_type) for listing_type, location in itertools.islice(itertools.cycle(pairs), count)]
+
+
+def scrape_market(location: str, listing_type: str, limit: int, return_type: str, stream: bool) -> int:
+    rows = 0
+
+    def count_page(event) -> None:
+        nonlocal rows
+        if event.stage == "page":
+            rows += len(event.properties)
+
+    scrape_property(
+        location,
+        listing_type=listing_type,
+        return_type=return_type,
+        limit=limit,
+        coalesce=False,
+        retain_results=not stream,
+        progress_callback=count_page,
+    )
+    return rows
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Load test concurrent scrapes against the local stand-in server.")
+    parser.add_argument("--markets", type=int, default=4, help="Scrapes run at once")
+    parser.add_argument("--total", type=int, default=2000, help="Listings per market")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=RealtorScraper.NUM_PROPERTY_WORKERS,
+        help="Page workers per scrape (RealtorScraper.NUM_PROPERTY_WORKERS)",
+    )
+    parser.add_argument("--return-type", default="pydantic", choices=["pandas", "pydantic", "raw", "compact", "lazy"])
+    parser.add_argument("--stream", action="store_true", help="Don't keep results (retain_results=False)")
+    parser.add_argument("--json", help="Also write the report to this JSON file")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    RealtorScraper.NUM_PROPERTY_WORKERS = args.workers
+    with StandinServer(args.total, profile_from_args(args)) as server:
+        server.point()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.markets) as executor:
+            futures = [
+                executor.submit(scrape_market, location, listing_type, args.total, args.return_type, args.stream)
+                for location, listing_type in markets(args.markets)
+            ]
+            rows = sum(future.result() for future in futures)
+        seconds = time.perf_counter() - start
+        server_stats = server.stats()
+
+    report = {
+        "markets": args.markets,
+        "workers": args.workers,
+        "return_type": args.return_type,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows / seconds),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "server": server_stats,
+    }
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
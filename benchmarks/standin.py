@@ -0,0 +1,265 @@
+"""
+Local stand-in for the realtor.com search and autocomplete APIs, for load testing.
+
+Serves SyntheticAPI responses (paginated home_search with total, aliased home_<id> bulk detail
+queries, location autocomplete) over HTTP at any scale, with injectable latency and error
+profiles: a fixed plus random delay per request, a share of slow responses, random 429s and
+periodic 429 bursts. Counters (requests per kind, 429s, peak concurrent requests) are served at
+/_stats, and reset with a POST to /_reset.
+
+    python benchmarks/standin.py --total 50000 --latency 0.1 --jitter 0.05 --burst-every 100 --burst-length 10
+
+Scrapers are pointed at it through the environment (printed on start):
+
+    HOMEHARVEST_SEARCH_GQL_URL=http://127.0.0.1:8765/api/v1/rdc_search_srp \\
+    HOMEHARVEST_AUTOCOMPLETE_URL=http://127.0.0.1:8765/suggest homeharvest "San Diego, CA" -o jsonl
+
+or in-process with StandinServer(...).point(), as loadtest.py does.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import SyntheticAPI  # noqa: E402
+
+
+@dataclass
+class Profile:
+    """Latency and error behavior of the stand-in."""
+
+    #: seconds added to every response, plus a random 0..jitter
+    latency: float = 0.0
+    jitter: float = 0.0
+    #: share of responses delayed by slow_latency instead
+    slow_rate: float = 0.0
+    slow_latency: float = 2.0
+    #: share of requests answered with a 429 at random
+    error_rate: float = 0.0
+    #: every burst_every requests, the next burst_length requests are answered with a 429
+    burst_every: int = 0
+    burst_length: int = 0
+    #: Retry-After header of 429 responses (seconds)
+    retry_after: int = 1
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.by_kind = {"autocomplete": 0, "search": 0, "details": 0}
+            self.throttled = 0
+            self.in_flight = 0
+            self.peak_in_flight = 0
+            self.started = time.monotonic()
+
+    def begin(self) -> int:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return self.requests
+
+    def end(self, kind: str | None) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if kind is None:
+                self.throttled += 1
+            else:
+                self.by_kind[kind] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "by_kind": dict(self.by_kind),
+                "throttled": self.throttled,
+                "peak_in_flight": self.peak_in_flight,
+                "seconds": round(time.monotonic() - self.started, 3),
+            }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  #: keep-alive, like the real API behind the pooled session
+    server: StandinHTTPServer
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _send(self, status: int, body: bytes, headers: dict | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _serve(self, body: bytes | None) -> None:
+        server = self.server
+        if self.path == "/_stats":
+            self._send(200, json.dumps(server.stats.snapshot()).encode())
+            return
+        if self.path == "/_reset":
+            server.stats.reset()
+            self._send(200, b"{}")
+            return
+
+        number = server.stats.begin()
+        kind = None
+        try:
+            profile = server.profile
+            rng = random.Random()
+            bursting = (
+                profile.burst_every and (number - 1) % profile.burst_every >= profile.burst_every - profile.burst_length
+            )
+            if bursting or rng.random() < profile.error_rate:
+                self._send(429, b'{"error": "Too Many Requests"}', {"Retry-After": str(profile.retry_after)})
+                return
+
+            slow = rng.random() < profile.slow_rate
+            delay = profile.slow_latency if slow else profile.latency + rng.uniform(0, profile.jitter)
+            if delay:
+                time.sleep(delay)
+
+            payload = server.api.respond(self.command, self.path, body)
+            if self.command == "GET":
+                kind = "autocomplete"
+            else:
+                kind = "search" if "home_search" in payload.get("data", {}) else "details"
+            self._send(200, json.dumps(payload).encode())
+        finally:
+            server.stats.end(kind)
+
+    def do_GET(self) -> None:
+        self._serve(None)
+
+    def do_POST(self) -> None:
+        self._serve(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+
+
+class StandinHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    #: the scraper opens many pooled connections at once
+    request_queue_size = 128
+
+    def __init__(self, address: tuple[str, int], api: SyntheticAPI, profile: Profile):
+        super().__init__(address, _Handler)
+        self.api = api
+        self.profile = profile
+        self.stats = Stats()
+
+
+class StandinServer:
+    """
+    The stand-in server, run on a background thread.
+
+    :param total: Listings every search pages through
+    :param port: 0 picks a free port
+    """
+
+    def __init__(self, total: int = 1000, profile: Profile | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.httpd = StandinHTTPServer((host, port), SyntheticAPI(total), profile or Profile())
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def search_url(self) -> str:
+        return f"{self.url}/api/v1/rdc_search_srp"
+
+    @property
+    def autocomplete_url(self) -> str:
+        return f"{self.url}/suggest"
+
+    @property
+    def profile(self) -> Profile:
+        return self.httpd.profile
+
+    def stats(self) -> dict:
+        return self.httpd.stats.snapshot()
+
+    def reset_stats(self) -> None:
+        self.httpd.stats.reset()
+
+    def point(self) -> None:
+        """Send the requests of RealtorScraper in this process to the stand-in."""
+        from homeharvest.core.scrapers.realtor import RealtorScraper
+
+        RealtorScraper.SEARCH_GQL_URL = self.search_url
+        RealtorScraper.ADDRESS_AUTOCOMPLETE_URL = self.autocomplete_url
+        RealtorScraper._location_cache.clear()
+
+    def start(self) -> StandinServer:
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> StandinServer:
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = Profile()
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="Seconds added to every response")
+    parser.add_argument(
+        "--jitter", type=float, default=defaults.jitter, help="Extra random delay of up to this many seconds"
+    )
+    parser.add_argument("--slow-rate", type=float, default=defaults.slow_rate, help="Share of slow responses")
+    parser.add_argument("--slow-latency", type=float, default=defaults.slow_latency, help="Delay of slow responses")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="Share of random 429 responses")
+    parser.add_argument("--burst-every", type=int, default=defaults.burst_every, help="Requests between 429 bursts")
+    parser.add_argument("--burst-length", type=int, default=defaults.burst_length, help="429 responses per burst")
+    parser.add_argument("--retry-after", type=int, default=defaults.retry_after, help="Retry-After of 429 responses")
+
+
+def profile_from_args(args: argparse.Namespace) -> Profile:
+    return Profile(**{name: getattr(args, name) for name in asdict(Profile())})
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in for the realtor.com APIs, for load testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--total", type=int, default=1000, help="Listings every search pages through")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = StandinServer(args.total, profile_from_args(args), args.host, args.port)
+    print(f"HOMEHARVEST_SEARCH_GQL_URL={server.search_url}")
+    print(f"HOMEHARVEST_AUTOCOMPLETE_URL={server.autocomplete_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(json.dumps(server.stats()))
+
+
+if __name__ == "__main__":
+    main()
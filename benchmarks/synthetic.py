@@ -0,0 +1,255 @@
+"""
+Synthetic stand-in for the realtor.com endpoints, used to generate benchmark fixtures offline.
+
+SyntheticAPI answers the three requests a scrape makes (location autocomplete, home_search
+pages of 200 and bulk property details) with deterministic listings shaped like the real API's,
+so recording through it produces fixtures that exercise the whole parsing path. It is served
+in-process by SyntheticAdapter, or over HTTP by the stand-in server (standin.py).
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import re
+from datetime import datetime, timedelta
+from urllib.parse import unquote_plus
+
+from requests.adapters import BaseAdapter
+from requests.models import PreparedRequest, Response
+
+PAGE_SIZE = 200
+
+CITIES = [
+    ("San Diego", "CA", "San Diego", "06073", "921"),
+    ("Dallas", "TX", "Dallas", "48113", "752"),
+    ("Phoenix", "AZ", "Maricopa", "04013", "850"),
+    ("Columbus", "OH", "Franklin", "39049", "432"),
+]
+STREETS = ["Main", "Oak", "Pine", "Maple", "Cedar", "Elm", "Lake", "Hill", "Park", "Sunset"]
+SUFFIXES = ["St", "Ave", "Dr", "Ln", "Ct", "Way", "Blvd"]
+NEIGHBORHOODS = ["North Park", "Downtown", "Old Town", "Midtown", "Riverside", "Heights"]
+TYPES = ["single_family", "condos", "townhomes", "multi_family", "land"]
+TAGS = ["garage_1_or_more", "central_air", "swimming_pool", "hardwood_floors", "fireplace", "view", "updated_kitchen"]
+
+
+def _date(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def synthetic_home(index: int, status: str, city: tuple, now: datetime) -> dict:
+    """One home_search result, deterministic for (index, status, city)."""
+    rng = random.Random(f"{city[0]}:{status}:{index}")
+    property_id = str(rng.randrange(10**9, 10**10))
+    city_name, state_code, county, fips_code, zip_prefix = city
+    sqft = rng.randrange(600, 4500)
+    list_price = round(sqft * rng.uniform(180, 650), -3)
+    list_date = now - timedelta(days=rng.randrange(0, 120), hours=rng.randrange(24))
+    sold = status == "sold"
+    sold_date = (list_date + timedelta(days=rng.randrange(5, 60))).strftime("%Y-%m-%d") if sold else None
+    street_number = str(rng.randrange(1, 9999))
+    street = f"{rng.choice(STREETS)} {rng.choice(SUFFIXES)}"
+    office_id = str(rng.randrange(100, 999))
+    agent_id = str(rng.randrange(1000, 9999))
+
+    return {
+        "pending_date": _date(list_date + timedelta(days=10)) if rng.random() < 0.1 else None,
+        "listing_id": str(rng.randrange(10**9, 10**10)),
+        "property_id": property_id,
+        "href": f"https://www.realtor.com/realestateandhomes-detail/M{property_id}",
+        "permalink": f"{street_number}-{street.replace(' ', '-')}_{city_name.replace(' ', '-')}_{state_code}_M{property_id}",
+        "list_date": _date(list_date),
+        "status": status,
+        "mls_status": "Closed" if sold else "Active",
+        "last_sold_price": round(list_price * rng.uniform(0.95, 1.05), -3) if sold or rng.random() < 0.4 else None,
+        "last_sold_date": sold_date,
+        "list_price": list_price,
+        "list_price_max": None,
+        "list_price_min": None,
+        "price_per_sqft": round(list_price / sqft),
+        "tags": rng.sample(TAGS, rng.randrange(0, 5)),
+        "open_houses": (
+            [
+                {
+                    "start_date": _date(now + timedelta(days=3)),
+                    "end_date": _date(now + timedelta(days=3, hours=2)),
+                    "description": None,
+                    "time_zone": "PST",
+                    "dst": True,
+                    "href": None,
+                    "methods": None,
+                }
+            ]
+            if rng.random() < 0.2
+            else None
+        ),
+        "details": None,
+        "pet_policy": None,
+        "units": None,
+        "flags": {
+            "is_contingent": rng.random() < 0.05,
+            "is_pending": rng.random() < 0.05,
+            "is_new_construction": rng.random() < 0.08,
+        },
+        "description": {
+            "type": rng.choice(TYPES),
+            "sqft": sqft,
+            "beds": rng.randrange(1, 6),
+            "baths_full": rng.randrange(1, 4),
+            "baths_half": rng.randrange(0, 2),
+            "lot_sqft": rng.randrange(1500, 20000),
+            "year_built": rng.randrange(1920, 2025),
+            "garage": rng.randrange(0, 3),
+            "name": None,
+            "stories": rng.randrange(1, 3),
+            "text": " ".join(rng.choice(STREETS + TAGS) for _ in range(rng.randrange(40, 120))),
+        },
+        "source": {"id": f"{state_code}MLS", "listing_id": f"{rng.randrange(10**7, 10**8)}"},
+        "hoa": {"fee": rng.randrange(50, 600)} if rng.random() < 0.4 else None,
+        "location": {
+            "address": {
+                "street_direction": None,
+                "street_number": street_number,
+                "street_name": street.split()[0],
+                "street_suffix": street.split()[1],
+                "line": f"{street_number} {street}",
+                "unit": f"Unit {rng.randrange(1, 40)}" if rng.random() < 0.2 else None,
+                "city": city_name,
+                "state_code": state_code,
+                "postal_code": f"{zip_prefix}{rng.randrange(10, 99)}",
+                "coordinate": {"lon": round(rng.uniform(-120, -80), 6), "lat": round(rng.uniform(30, 45), 6)},
+            },
+            "county": {"name": county, "fips_code": fips_code},
+            "neighborhoods": [{"name": rng.choice(NEIGHBORHOODS)}],
+        },
+        "tax_record": {
+            "cl_id": str(rng.randrange(10**8)),
+            "public_record_id": str(rng.randrange(10**8)),
+            "last_update_date": "2024-01-01T00:00:00Z",
+            "apn": str(rng.randrange(10**9)),
+            "tax_parcel_id": str(rng.randrange(10**9)),
+        },
+        "primary_photo": {"href": f"https://ap.rdcpix.com/{property_id}s.jpg"},
+        "photos": [
+            {"title": None, "href": f"https://ap.rdcpix.com/{property_id}-{k}s.jpg", "tags": [{"label": "house_view"}]}
+            for k in range(rng.randrange(5, 30))
+        ],
+        "advertisers": [
+            {
+                "email": f"agent{agent_id}@example.com",
+                "broker": {"name": f"Broker {office_id}", "fulfillment_id": office_id},
+                "type": "seller",
+                "name": f"Agent {agent_id}",
+                "fulfillment_id": agent_id,
+                "builder": None,
+                "phones": [{"ext": "", "primary": True, "type": "Mobile", "number": f"555{agent_id}"}],
+                "office": {
+                    "name": f"Office {office_id}",
+                    "email": f"office{office_id}@example.com",
+                    "fulfillment_id": office_id,
+                    "href": None,
+                    "phones": [{"ext": "", "primary": True, "type": "Office", "number": f"555{office_id}0"}],
+                    "mls_set": f"O-{state_code}MLS-{office_id}",
+                },
+                "corporation": None,
+                "mls_set": f"A-{state_code}MLS-{agent_id}",
+                "nrds_id": agent_id,
+                "state_license": agent_id,
+                "rental_corporation": None,
+                "rental_management": None,
+            }
+        ],
+        "current_estimates": [
+            {
+                "source": {"type": "corelogic", "name": "CoreLogic"},
+                "estimate": round(list_price * 1.02),
+                "estimateHigh": round(list_price * 1.1),
+                "estimateLow": round(list_price * 0.95),
+                "date": now.strftime("%Y-%m-%d"),
+                "isBestHomeValue": True,
+            }
+        ],
+    }
+
+
+def synthetic_details(property_id: str) -> dict:
+    """Extra property details (bulk "home" query) of a property."""
+    rng = random.Random(property_id)
+    return {
+        "property_id": property_id,
+        "nearbySchools": {
+            "schools": [{"district": {"id": str(rng.randrange(1000)), "name": "Unified School District"}}]
+        },
+        "popularity": None,
+        "location": {"parcel": {"parcel_id": str(rng.randrange(10**9))}},
+        "taxHistory": [
+            {"tax": rng.randrange(2000, 15000), "year": year, "assessment": {"building": 1, "land": 2, "total": 3}}
+            for year in range(2024, 2024 - rng.randrange(1, 10), -1)
+        ],
+        "property_history": [],
+        "monthly_fees": None,
+        "one_time_fees": None,
+        "parking": None,
+        "terms": None,
+    }
+
+
+class SyntheticAPI:
+    """
+    Synthetic realtor.com API: maps a request to its JSON response.
+
+    :param total: Number of listings every search reports (and pages through)
+    """
+
+    def __init__(self, total: int = 1000):
+        self.total = total
+        self.now = datetime.now().replace(microsecond=0)
+
+    def _city(self, text: str) -> tuple:
+        for city in CITIES:
+            if city[0].casefold() in text.casefold():
+                return city
+        return CITIES[0]
+
+    def respond(self, method: str, url: str, body: bytes | str | None) -> dict:
+        if method == "GET":  #: location autocomplete
+            city = self._city(unquote_plus(url))
+            return {"autocomplete": [{"area_type": "city", "city": city[0], "state_code": city[1], "centroid": None}]}
+
+        payload = json.loads(body)
+        query = payload["query"]
+        aliases = re.findall(r"home_(\w+): home\(", query)
+        if aliases:  #: bulk property details
+            return {"data": {f"home_{property_id}": synthetic_details(property_id) for property_id in aliases}}
+
+        variables = payload.get("variables") or {}
+        offset = variables.get("offset", 0)
+        status = (re.search(r"status: (\w+)", query) or [None, "for_sale"])[1]
+        city = self._city(str(variables.get("city")))
+        results = [
+            synthetic_home(i, status, city, self.now) for i in range(offset, min(offset + PAGE_SIZE, self.total))
+        ]
+        return {"data": {"home_search": {"count": len(results), "total": self.total, "results": results}}}
+
+
+class SyntheticAdapter(BaseAdapter):
+    """Answers scraper requests in-process with SyntheticAPI responses instead of calling realtor.com."""
+
+    def __init__(self, total: int = 1000):
+        super().__init__()
+        self.api = SyntheticAPI(total)
+        self.requests = 0
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        self.requests += 1
+        response = Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = "application/json"
+        response._content = json.dumps(self.api.respond(request.method, request.url, request.body)).encode()
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self) -> None:
+        pass
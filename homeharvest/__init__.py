@@ -1,10 +1,41 @@
+from __future__ import annotations
+import sys
+import time
 import warnings
-import pandas as pd
-from .core.scrapers import ScraperInput
-from .utils import process_result, ordered_properties, validate_input, validate_dates, validate_limit
+from .core.scrapers import ScraperInput, ScrapeProgress
+from .exceptions import ScrapeCancelled
+from .utils import (
+    flatten_property,
+    format_date_columns,
+    ordered_properties,
+    validate_input,
+    validate_dates,
+    validate_limit,
+)
 from .core.scrapers.realtor import RealtorScraper
 from .core.scrapers.models import ListingType, SearchPropertyType, ReturnType, Property
-from typing import Union, Optional, List
+from .core.scrapers.realtor.lazy import LazyProperty
+from .core.singleflight import scrape_flights, scrape_key
+from .core.metrics import ScrapeStats
+from .core.tracing import set_attributes, span
+from .core.profiling import Profiler
+from .core.spill import SpilledResults
+from .store import PropertyStore, STORE_RETURN_TYPES
+from typing import Union, Optional, List, Callable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from .core.scrapers.compact import CompactProperty
+
+
+def __getattr__(name: str):
+    #: the compact record types are generated on import, so they are only built once asked for
+    if name == "CompactProperty":
+        from .core.scrapers.compact import CompactProperty
+
+        return CompactProperty
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def scrape_property(
     location: str,
@@ -20,14 +51,27 @@ def scrape_property(
     foreclosure: bool = None,
     extra_property_data: bool = True,
     exclude_pending: bool = False,
-    limit: int = 10000
-) -> Union[pd.DataFrame, list[dict], list[Property]]:
+    limit: int = 10000,
+    parse_processes: int = None,
+    progress_callback: Callable[[ScrapeProgress], None] = None,
+    coalesce: bool = True,
+    retain_results: bool = True,
+    stats: ScrapeStats = None,
+    profile: bool = False,
+    memory_budget: int = None,
+    store: Union[PropertyStore, str] = None,
+    max_age: float = None,
+    incremental: bool = False,
+) -> Union[pd.DataFrame, list[dict], list[Property], list[CompactProperty], list[LazyProperty], SpilledResults]:
     """
     Scrape properties from Realtor.com based on a given location and listing type.
     :param location: Location to search (e.g. "Dallas, TX", "85281", "2530 Al Lipscomb Way")
     :param listing_type: Listing Type (for_sale, for_rent, sold, pending)
-    :param return_type: Return type (pandas, pydantic, raw)
-    :param property_type: Property Type (single_family, multi_family, condos, condo_townhome_rowhome_coop, condo_townhome, townhomes, duplex_triplex, farm, land, mobile)
+    :param return_type: Return type (pandas, pydantic, raw, compact, lazy). compact returns slotted records with the
+        same attributes as pydantic, at a much smaller memory footprint per row. lazy keeps the raw payload and parses
+        each field on first access.
+    :param property_type: Property Type (single_family, multi_family, condos, condo_townhome_rowhome_coop,
+        condo_townhome, townhomes, duplex_triplex, farm, land, mobile)
     :param radius: Get properties within _ (e.g. 1.0) miles. Only applicable for individual addresses.
     :param mls_only: If set, fetches only listings with MLS IDs.
     :param proxy: Proxy to use for scraping
@@ -35,11 +79,36 @@ def scrape_property(
         - PENDING: Filters by pending_date. Contingent properties without pending_date are included.
         - SOLD: Filters by sold_date (when property was sold)
         - FOR_SALE/FOR_RENT: Filters by list_date (when property was listed)
-    :param date_from, date_to: Get properties sold or listed (dependent on your listing_type) between these dates. format: 2021-01-28
+    :param date_from, date_to: Get properties sold or listed (dependent on your listing_type) between these dates.
+        format: 2021-01-28
     :param foreclosure: If set, fetches only foreclosure listings.
-    :param extra_property_data: Increases requests by O(n). If set, this fetches additional property data (e.g. agent, broker, property evaluations etc.)
-    :param exclude_pending: If true, this excludes pending or contingent properties from the results, unless listing type is pending.
+    :param extra_property_data: Increases requests by O(n). If set, this fetches additional property data (e.g. agent,
+        broker, property evaluations etc.)
+    :param exclude_pending: If true, this excludes pending or contingent properties from the results, unless listing
+        type is pending.
     :param limit: Limit the number of results returned. Maximum is 10,000.
+    :param parse_processes: If set, parses properties in this many worker processes instead of threads, for large
+        CPU-bound scrapes.
+    :param progress_callback: Called with a ScrapeProgress event as each page of results and its extra details complete,
+        with the page's rows. Raise ScrapeCancelled from it to stop the scrape.
+    :param coalesce: If set, identical concurrent calls share a single scrape, and its result is reused by identical
+        calls for a few seconds (HOMEHARVEST_COALESCE_TTL). Shared results hold the same property objects. Streamed
+        (retain_results=False), memory_budget and store scrapes are never shared.
+    :param retain_results: If False, each page of results is only passed to progress_callback and an empty result is
+        returned, so memory stays bounded by a page (see homeharvest.writers).
+    :param stats: A ScrapeStats to fill with the scrape's per-stage metrics (time, bytes, retries and status codes of
+        the requests, parsing and DataFrame time).
+    :param profile: If set, runs the scrape under cProfile and tracemalloc and prints a report of the CPU time per stage
+        and the top CPU and allocation hotspots to stderr (also kept in stats.profile).
+    :param memory_budget: Megabytes of results to keep in memory. Past it, completed pages spill to a temporary SQLite
+        file, and non-pandas return types come back as a SpilledResults sequence reading them from disk (pandas results
+        are assembled from it page by page).
+    :param store: A PropertyStore (or the path of its SQLite file) that every page of results is saved into as it
+        arrives, along with a record of the scrape (see homeharvest.store).
+    :param max_age: With store, answer from the store if an identical scrape was saved less than this many seconds ago,
+        instead of scraping again.
+    :param incremental: With store, only fetch the extra details of and parse the rows that are new or changed (list
+        price, status, pending or sold date) since they were saved; unchanged rows are returned as saved in the store.
     """
     validate_input(listing_type)
     validate_dates(date_from, date_to)
@@ -60,21 +129,175 @@ def scrape_property(
         extra_property_data=extra_property_data,
         exclude_pending=exclude_pending,
         limit=limit,
+        parse_processes=parse_processes,
+        progress_callback=progress_callback,
+        retain_results=retain_results,
+        memory_budget=memory_budget,
+        incremental=incremental,
     )
+    if incremental and (store is None or return_type.lower() == "lazy"):
+        raise ValueError("incremental scrapes need a store and the pandas, pydantic or compact return type")
+    if store is not None:
+        if return_type.lower() not in STORE_RETURN_TYPES:
+            raise ValueError(f"store saves {', '.join(STORE_RETURN_TYPES)} results, not {return_type}")
+        if parse_processes and return_type.lower() == "pandas":
+            raise ValueError(
+                "store can't save pandas results parsed in worker processes (parse_processes), "
+                "use the pydantic return type"
+            )
+
+    if stats is None:
+        stats = ScrapeStats()
+    stats.started = time.perf_counter()
+
+    if isinstance(store, str):
+        with PropertyStore(store) as opened_store:
+            return _run(scraper_input, stats, coalesce, progress_callback, profile, opened_store, max_age)
+    return _run(scraper_input, stats, coalesce, progress_callback, profile, store, max_age)
+
+
+def _run(
+    scraper_input: ScraperInput,
+    stats: ScrapeStats,
+    coalesce: bool,
+    progress_callback: Callable[[ScrapeProgress], None] | None,
+    profile: bool,
+    store: PropertyStore | None,
+    max_age: float | None,
+):
+    if store is not None:
+        scrape_id = store.fresh_scrape(scraper_input, max_age) if max_age is not None else None
+        if scrape_id is not None:
+            return _from_store(scraper_input, stats, progress_callback, store, scrape_id)
+        return _scrape_into_store(scraper_input, stats, progress_callback, profile, store)
+
+    if not profile:
+        return _scrape(scraper_input, stats, coalesce, progress_callback)
+
+    #: a profiled scrape is never shared, a coalesced call would profile none of the work
+    with Profiler() as profiler:
+        result = _scrape(scraper_input, stats, False, progress_callback)
+    stats.profile = profiler.profile
+    print(profiler.profile.report(), file=sys.stderr)
+    return result
+
+
+def _scrape_into_store(
+    scraper_input: ScraperInput,
+    stats: ScrapeStats,
+    progress_callback: Callable[[ScrapeProgress], None] | None,
+    profile: bool,
+    store: PropertyStore,
+):
+    listing_type = scraper_input.listing_type.value.lower()
+    property_ids = []
 
-    site = RealtorScraper(scraper_input)
-    results = site.search()
+    def save_page(event: ScrapeProgress) -> None:
+        #: called serialized, pages are saved in the order they are reported
+        if event.stage == "page" and event.properties:
+            unchanged = set(event.unchanged)
+            store.save(
+                [prop for prop in event.properties if prop.property_id not in unchanged],
+                listing_type,
+                event.fingerprints,
+            )
+            property_ids.extend(prop.property_id for prop in event.properties)
+        if progress_callback:
+            progress_callback(event)
 
-    if scraper_input.return_type != ReturnType.pandas:
-        return results
+    delta_input = scraper_input.model_copy(update={"delta_source": store})
+    #: never coalesced, a shared or memoized scrape would send this call no page events to save
+    result = _run(delta_input, stats, False, save_page, profile, None, None)
+    store.record_scrape(scraper_input, property_ids)
+    return result
 
-    properties_dfs = [df for result in results if not (df := process_result(result)).empty]
-    if not properties_dfs:
+
+def _from_store(
+    scraper_input: ScraperInput,
+    stats: ScrapeStats,
+    progress_callback: Callable[[ScrapeProgress], None] | None,
+    store: PropertyStore,
+    scrape_id: int,
+):
+    with span("homeharvest.store", location=scraper_input.location, scrape_id=scrape_id) as current_span:
+        properties = store.scrape_properties(scrape_id, scraper_input.listing_type.value.lower())
+        if scraper_input.return_type == ReturnType.compact:
+            from .core.scrapers.compact import to_compact
+
+            properties = [to_compact(prop) for prop in properties]
+        #: the stored scrape is reported as a single page, so streaming callers (writers) get its rows too
+        if progress_callback:
+            progress_callback(ScrapeProgress(stage="page", completed=1, total=1, properties=properties))
+
+        if scraper_input.return_type == ReturnType.pandas:
+            result = _to_dataframe(properties, stats)
+        else:
+            result = properties if scraper_input.retain_results else []
+        stats.finish(len(result))
+        set_attributes(current_span, rows=stats.rows)
+        return result
+
+
+def _scrape(
+    scraper_input: ScraperInput,
+    stats: ScrapeStats,
+    coalesce: bool,
+    progress_callback: Callable[[ScrapeProgress], None] | None,
+):
+    def search(callback):
+        scraper = RealtorScraper(scraper_input.model_copy(update={"progress_callback": callback}))
+        return scraper.search(), scraper.stats
+
+    with span(
+        "homeharvest.scrape",
+        location=scraper_input.location,
+        listing_type=scraper_input.listing_type.value,
+        return_type=scraper_input.return_type.value,
+    ) as current_span:
+        #: a streamed scrape can't be shared, late joiners would need every page kept for replay, and a
+        #: spilled result can't either, the first caller to close it would remove the file of the others
+        if coalesce and scraper_input.retain_results and scraper_input.memory_budget is None:
+            results, scrape_stats = scrape_flights.do(scrape_key(scraper_input), search, progress_callback)
+        else:
+            results, scrape_stats = search(progress_callback)
+        #: a coalesced call gets the metrics of the scrape it shared
+        stats.merge(scrape_stats)
+
+        if scraper_input.return_type != ReturnType.pandas:
+            stats.finish(len(results) if scraper_input.retain_results else None)
+            set_attributes(current_span, rows=stats.rows)
+            return results if isinstance(results, SpilledResults) else list(results)
+
+        with span("homeharvest.result", properties=len(results)):
+            properties_df = _to_dataframe(results, stats)
+        stats.finish(len(properties_df))
+        set_attributes(current_span, rows=stats.rows)
+        return properties_df
+
+
+def _to_dataframe(results: list | SpilledResults, stats: ScrapeStats | None = None) -> pd.DataFrame:
+    #: pandas is only imported for pandas results, it dominates the import time of homeharvest
+    import pandas as pd
+
+    result_start = time.perf_counter()
+    #: spilled results are read and converted a page at a time
+    pages = results.pages() if isinstance(results, SpilledResults) else [results]
+    frames = []
+    for page in pages:
+        #: rows from worker processes (parse_processes) arrive already flattened
+        rows = [result if isinstance(result, dict) else flatten_property(result, format_dates=False) for result in page]
+        if rows:
+            frames.append(pd.DataFrame.from_records(rows, columns=ordered_properties))
+    if not frames:
         return pd.DataFrame()
 
     with warnings.catch_warnings():
         warnings.simplefilter("ignore", category=FutureWarning)
 
-        return pd.concat(properties_dfs, ignore_index=True, axis=0)[ordered_properties].replace(
-            {"None": pd.NA, None: pd.NA, "": pd.NA}
-        )
+        properties_df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+        properties_df = format_date_columns(properties_df)
+        properties_df = properties_df[ordered_properties].replace({"None": pd.NA, None: pd.NA, "": pd.NA})
+
+    if stats is not None:
+        stats.record("result", time.perf_counter() - result_start, items=len(properties_df))
+    return properties_df
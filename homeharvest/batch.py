@@ -0,0 +1,190 @@
+"""
+homeharvest.batch
+~~~~~~~~~~~~
+
+Batch scraping of many markets in one process, with resume.
+
+Markets (location, listing type) are scraped concurrently up to a global limit, sharing the HTTP
+session and location cache. Each market streams into its own file, partitioned by listing type:
+``<output_dir>/listing_type=<type>/<location>_<hash>.<ext>``. A market's file only appears once it
+is complete, and every finished market is appended to a checkpoint journal in the output directory,
+so an interrupted run started again skips the markets it already completed.
+
+The limit counts markets, not requests: each running market still fetches its pages on its own
+thread pool and parses each page on up to RealtorScraper.NUM_PROPERTY_WORKERS threads, as a single
+scrape_property call does. With parse_processes set, parsing goes to one process pool shared by
+all markets instead.
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Callable, Iterable
+
+from .core import jsonlib
+from .exceptions import ScrapeCancelled
+from .writers import WRITERS, write_properties
+
+JOURNAL_NAME = "_journal.jsonl"
+
+
+def read_markets(path: str, listing_types: Iterable[str] = ("for_sale",)) -> list[tuple[str, str]]:
+    """
+    Read the markets of a batch file.
+
+    A CSV file with a header holding a ``location`` column (and optionally ``listing_type``), or a
+    text file with one location per line. Locations without a listing type are scraped for each of
+    listing_types. Blank lines and lines starting with # are skipped.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        lines = [line for line in f.read().splitlines() if line.strip() and not line.lstrip().startswith("#")]
+
+    markets = []
+    header = next(csv.reader(lines[:1]), [])
+    if "location" in [column.strip().lower() for column in header]:
+        for row in csv.DictReader(lines):
+            row = {key.strip().lower(): (value or "").strip() for key, value in row.items() if key}
+            types = [row["listing_type"]] if row.get("listing_type") else listing_types
+            markets.extend((row["location"], listing_type) for listing_type in types if row["location"])
+    else:
+        for line in lines:
+            markets.extend((line.strip(), listing_type) for listing_type in listing_types)
+
+    return list(dict.fromkeys(markets))
+
+
+def market_path(output_dir: str, location: str, listing_type: str, output: str) -> str:
+    """
+    Output file of a market: <output_dir>/listing_type=<type>/<location slug>_<hash>.<ext>
+
+    The slug keeps names readable, the short hash of the location keeps markets whose slugs collide
+    (e.g. "St. Louis" and "St Louis") in separate files.
+    """
+    slug = re.sub(r"[^a-z0-9]+", "_", location.casefold()).strip("_") or "location"
+    digest = hashlib.sha1(location.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(output_dir, f"listing_type={listing_type}", f"{slug}_{digest}.{WRITERS[output].extension}")
+
+
+class Journal:
+    """Append-only checkpoint journal of finished markets (one JSON object per line)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def completed(self) -> set[tuple[str, str]]:
+        """Markets whose last journal entry is a success."""
+        status = {}
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                for line in f:
+                    try:
+                        entry = jsonlib.loads(line)
+                    except ValueError:  #: torn last line of an interrupted run
+                        continue
+                    status[(entry["location"], entry["listing_type"])] = entry["status"]
+
+        return {market for market, market_status in status.items() if market_status == "done"}
+
+    def record(self, location: str, listing_type: str, status: str, **details: Any) -> None:
+        entry = {
+            "location": location,
+            "listing_type": listing_type,
+            "status": status,
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            **details,
+        }
+        with self._lock, open(self.path, "ab") as f:
+            f.write(jsonlib.dumpb(entry) + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def run_batch(
+    markets: Iterable[tuple[str, str]],
+    output_dir: str,
+    output: str = "csv",
+    concurrency: int = 4,
+    progress: Callable[[str, str, str, int], Any] | None = None,
+    **scrape_kwargs,
+) -> dict[str, int]:
+    """
+    Scrape every (location, listing_type) market into its own file under output_dir.
+
+    :param markets: Markets to scrape, e.g. from read_markets
+    :param output_dir: Directory of the market files and of the checkpoint journal
+    :param output: Output format (csv, jsonl, parquet)
+    :param concurrency: Markets scraped at once (each with its own page and parse threads, see the module docstring)
+    :param progress: Called with (location, listing_type, status, rows) as each market finishes,
+        status being "done", "failed" or "skipped" (completed by an earlier run)
+    :param scrape_kwargs: Other arguments of scrape_property (past_days, mls_only, proxy, ...)
+    :return: Number of markets per status
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    journal = Journal(os.path.join(output_dir, JOURNAL_NAME))
+    completed = journal.completed()
+    counts = {"done": 0, "failed": 0, "skipped": 0}
+    stop = threading.Event()
+
+    def check_stop(rows: int) -> None:
+        if stop.is_set():
+            raise ScrapeCancelled("Batch was interrupted.")
+
+    def scrape_market(location: str, listing_type: str) -> int:
+        path = market_path(output_dir, location, listing_type, output)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        #: written under a temporary name, so an interrupted market never looks complete
+        partial_path = f"{path}.partial"
+        try:
+            rows = write_properties(
+                partial_path, output, progress=check_stop, location=location, listing_type=listing_type, **scrape_kwargs
+            )
+        except BaseException:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+        os.replace(partial_path, path)
+        journal.record(location, listing_type, "done", rows=rows, path=os.path.relpath(path, output_dir))
+        return rows
+
+    pending = []
+    for location, listing_type in markets:
+        if (location, listing_type) in completed:
+            counts["skipped"] += 1
+            if progress:
+                progress(location, listing_type, "skipped", 0)
+        else:
+            pending.append((location, listing_type))
+
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    futures = {executor.submit(scrape_market, *market): market for market in pending}
+    try:
+        for future in as_completed(futures):
+            location, listing_type = futures[future]
+            try:
+                rows = future.result()
+            except Exception as e:
+                journal.record(location, listing_type, "failed", error=str(e))
+                counts["failed"] += 1
+                if progress:
+                    progress(location, listing_type, "failed", 0)
+                continue
+
+            counts["done"] += 1
+            if progress:
+                progress(location, listing_type, "done", rows)
+    except BaseException:
+        #: interrupted (e.g. Ctrl+C): stop the running markets at their next page, skip the queued ones
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        raise
+
+    executor.shutdown()
+    return counts
@@ -0,0 +1,329 @@
+"""
+homeharvest.changes
+~~~~~~~~~~~~
+
+Change feed of markets: what changed since the last scrape, as typed events.
+
+A ChangeIndex (a small SQLite file) keeps, per market and property, a content hash of the last
+scraped property along with its list price and status. scrape_changes() scrapes a market page by
+page, compares every row with the index and yields a ChangeEvent for each difference:
+
+    new_listing     a property that wasn't in the market before
+    price_change    the list price changed
+    status_change   the status changed (e.g. FOR_SALE -> PENDING)
+    sold            the status changed to SOLD (or a property appeared in a sold market)
+    delisted        a property of the last scrape is no longer in the market
+
+Rows whose content hash didn't change produce no event, so consumers only handle what changed
+instead of diffing whole result sets. The first scrape of a market only records its state.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import queue
+import sqlite3
+import threading
+from typing import Iterator
+
+from pydantic import BaseModel
+
+from .core import jsonlib
+from .core.scrapers.models import Property
+from .exceptions import ScrapeCancelled
+
+EVENT_TYPES = ("new_listing", "price_change", "status_change", "sold", "delisted")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS markets (
+    key TEXT PRIMARY KEY,
+    location TEXT NOT NULL,
+    listing_type TEXT NOT NULL,
+    runs INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS state (
+    market TEXT NOT NULL,
+    property_id TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    list_price INTEGER,
+    status TEXT,
+    seen INTEGER NOT NULL,
+    PRIMARY KEY (market, property_id)
+) WITHOUT ROWID;
+"""
+
+#: scrape_property arguments that don't change which properties are in a market
+_UNKEYED_ARGUMENTS = {
+    "proxy",
+    "parse_processes",
+    "coalesce",
+    "stats",
+    "profile",
+    "memory_budget",
+    "store",
+    "max_age",
+    "incremental",
+    "extra_property_data",
+}
+
+#: pages scraped ahead of the consumer of the events
+QUEUED_PAGES = 4
+
+
+class ChangeEvent(BaseModel):
+    """A change of a property in a market. property is None for delisted properties."""
+
+    type: str
+    property_id: str
+    location: str
+    listing_type: str
+    previous_price: int | None = None
+    price: int | None = None
+    previous_status: str | None = None
+    status: str | None = None
+    property: Property | None = None
+
+
+def content_hash(prop: Property) -> str:
+    """Hash of everything scraped about a property, except the days on the market that change every day."""
+    return hashlib.blake2b(prop.model_dump_json(exclude={"days_on_mls"}).encode(), digest_size=8).hexdigest()
+
+
+class _Market:
+    def __init__(self, key: str, location: str, listing_type: str, run: int):
+        self.key = key
+        self.location = location
+        self.listing_type = listing_type
+        self.run = run
+
+    @property
+    def baseline(self) -> bool:
+        """First scrape of the market: there is nothing to compare with yet."""
+        return self.run == 1
+
+
+class ChangeIndex:
+    """
+    Previous state of the markets a change feed watches, shared by the threads of a scrape.
+
+    :param path: Index file (created if missing), or ":memory:"
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        with self._lock, self._connection:
+            if path != ":memory:":
+                self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.executescript(SCHEMA)
+
+    def begin(self, location: str, listing_type: str, scrape_kwargs: dict) -> _Market:
+        """Start a scrape of a market, numbered after its last complete scrape."""
+        normalized = " ".join(location.split()).casefold()
+        params = {key: value for key, value in scrape_kwargs.items() if key not in _UNKEYED_ARGUMENTS}
+        key = hashlib.sha1(jsonlib.dumps([normalized, listing_type, sorted(params.items())]).encode()).hexdigest()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO markets (key, location, listing_type) VALUES (?, ?, ?)",
+                (key, normalized, listing_type),
+            )
+            (runs,) = self._connection.execute("SELECT runs FROM markets WHERE key = ?", (key,)).fetchone()
+        return _Market(key, location, listing_type, runs + 1)
+
+    def diff(self, market: _Market, properties: list[Property]) -> tuple[list[ChangeEvent], list[tuple]]:
+        """Events of a page of properties, and the state rows to record once they are handled."""
+        property_ids = [prop.property_id for prop in properties]
+        with self._lock:
+            previous = {
+                row[0]: row[1:]
+                for row in self._connection.execute(
+                    f"SELECT property_id, hash, list_price, status FROM state "
+                    f"WHERE market = ? AND property_id IN ({', '.join('?' * len(property_ids))})",
+                    (market.key, *property_ids),
+                )
+            }
+
+        events, rows = [], []
+        for prop in properties:
+            current_hash = content_hash(prop)
+            rows.append((market.key, prop.property_id, current_hash, prop.list_price, prop.status, market.run))
+
+            if prop.property_id not in previous:
+                if not market.baseline:
+                    events.append(_event(market, "sold" if prop.status == "SOLD" else "new_listing", prop))
+                continue
+
+            previous_hash, previous_price, previous_status = previous[prop.property_id]
+            if previous_hash == current_hash:
+                continue
+            if prop.status != previous_status:
+                event_type = "sold" if prop.status == "SOLD" else "status_change"
+                events.append(_event(market, event_type, prop, previous_price, previous_status))
+            if prop.list_price != previous_price:
+                events.append(_event(market, "price_change", prop, previous_price, previous_status))
+        return events, rows
+
+    def update(self, rows: list[tuple]) -> None:
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO state VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def delisted(self, market: _Market) -> list[ChangeEvent]:
+        """Events of the properties of the market that its scrape, run to the end, didn't see."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT property_id, list_price, status FROM state WHERE market = ? AND seen < ?",
+                (market.key, market.run),
+            ).fetchall()
+        return [
+            ChangeEvent(
+                type="delisted",
+                property_id=property_id,
+                location=market.location,
+                listing_type=market.listing_type,
+                previous_price=list_price,
+                previous_status=status,
+            )
+            for property_id, list_price, status in rows
+        ]
+
+    def finish(self, market: _Market, complete: bool) -> None:
+        """
+        Close a scrape of a market that ran to the end, dropping the delisted properties from its state.
+
+        :param complete: The scrape returned the whole market (not cut off by its limit)
+        """
+        with self._lock, self._connection:
+            if complete:
+                self._connection.execute("DELETE FROM state WHERE market = ? AND seen < ?", (market.key, market.run))
+            self._connection.execute("UPDATE markets SET runs = ? WHERE key = ?", (market.run, market.key))
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self) -> ChangeIndex:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _event(
+    market: _Market,
+    event_type: str,
+    prop: Property,
+    previous_price: int | None = None,
+    previous_status: str | None = None,
+) -> ChangeEvent:
+    return ChangeEvent(
+        type=event_type,
+        property_id=prop.property_id,
+        location=market.location,
+        listing_type=market.listing_type,
+        previous_price=previous_price,
+        price=prop.list_price,
+        previous_status=previous_status,
+        status=prop.status,
+        property=prop,
+    )
+
+
+_DONE = object()
+
+
+def scrape_changes(
+    index: ChangeIndex | str, location: str, listing_type: str = "for_sale", **scrape_kwargs
+) -> Iterator[ChangeEvent]:
+    """
+    Scrape a market and yield the ChangeEvents since its last scrape, as the pages come in.
+
+    The index records a page's state once its events were consumed, so events are never lost to
+    a consumer that stops early: the changes it didn't get are reported again by the next scrape.
+    Properties are only delisted by scrapes that got every page of the market's search, with fewer
+    results than their limit: a scrape whose location didn't resolve, whose search failed, or whose
+    results the limit cut off (however many rows the filters kept) leaves them listed.
+
+    :param index: ChangeIndex (or the path of its file)
+    :param location: Location of the market (e.g. "San Diego, CA")
+    :param listing_type: Listing type of the market (for_sale, for_rent, sold, pending)
+    :param scrape_kwargs: Other arguments of scrape_property (past_days, property_type, store, incremental, ...)
+    """
+    owned = isinstance(index, str)
+    if owned:
+        index = ChangeIndex(index)
+    market = index.begin(location, listing_type, scrape_kwargs)
+    pages: queue.Queue = queue.Queue(maxsize=QUEUED_PAGES)
+    stop = threading.Event()
+
+    def put(item) -> None:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        raise ScrapeCancelled("Change feed was closed.")
+
+    #: pages of the search the scrape got, out of pages_total, and whether they all had results
+    search = {"pages": 0, "pages_total": None, "found": 0, "answered": True}
+
+    def diff_page(event) -> None:
+        if event.stage != "page":
+            return
+        search["pages"] += 1
+        search["pages_total"] = event.total
+        if event.found is None:
+            search["answered"] = False
+        else:
+            search["found"] = max(search["found"], event.found)
+        if event.properties:
+            put(index.diff(market, event.properties))
+
+    def scrape() -> None:
+        from . import scrape_property
+
+        try:
+            scrape_property(
+                location,
+                listing_type=listing_type,
+                return_type="pydantic",
+                retain_results=False,
+                progress_callback=diff_page,
+                **scrape_kwargs,
+            )
+            put(_DONE)
+        except ScrapeCancelled:
+            pass
+        except BaseException as e:
+            try:
+                put(e)
+            except ScrapeCancelled:
+                pass
+
+    thread = threading.Thread(target=scrape, name="homeharvest-changes", daemon=True)
+    thread.start()
+    try:
+        while (item := pages.get()) is not _DONE:
+            if isinstance(item, BaseException):
+                raise item
+            events, states = item
+            yield from events
+            index.update(states)
+
+        #: a scrape without pages (e.g. an unresolved location) saw nothing of the market, it isn't counted
+        if search["pages"]:
+            complete = (
+                search["answered"]
+                and search["pages"] == search["pages_total"]
+                and search["found"] < scrape_kwargs.get("limit", 10000)
+            )
+            if complete:
+                yield from index.delisted(market)
+            index.finish(market, complete)
+    finally:
+        stop.set()
+        thread.join()
+        if owned:
+            index.close()
@@ -1,11 +1,15 @@
 import argparse
 import datetime
 from homeharvest import scrape_property
+from homeharvest.core.jsonlib import dumpb
+from homeharvest.writers import WRITERS, write_properties
+from homeharvest.batch import read_markets, run_batch
+from homeharvest.utils import flatten_property
 
 
 def main():
     parser = argparse.ArgumentParser(description="Home Harvest Property Scraper")
-    parser.add_argument("location", type=str, help="Location to scrape (e.g., San Francisco, CA)")
+    parser.add_argument("location", type=str, nargs="?", help="Location to scrape (e.g., San Francisco, CA)")
 
     parser.add_argument(
         "-l",
@@ -20,9 +24,10 @@ def main():
         "-o",
         "--output",
         type=str,
-        default="excel",
-        choices=["excel", "csv"],
-        help="Output format",
+        default=None,
+        choices=["excel", "csv", "json", "jsonl", "parquet"],
+        help="Output format, excel by default (csv in batch mode). csv, jsonl and parquet are written page by page "
+        "as results arrive",
     )
 
     parser.add_argument(
@@ -56,29 +61,187 @@ def main():
         help="If set, fetches only MLS listings.",
     )
 
+    parser.add_argument(
+        "-b",
+        "--batch",
+        type=str,
+        default=None,
+        help="Scrape every market of this file instead of a single location: a CSV with location and "
+        "(optionally) listing_type columns, or one location per line",
+    )
+    parser.add_argument(
+        "--watch",
+        type=str,
+        default=None,
+        help="Watch every market of this file (same format as --batch) for new listings, printed as JSON lines "
+        "until interrupted",
+    )
+    parser.add_argument(
+        "--min_interval",
+        type=float,
+        default=60,
+        help="Watch mode: fewest seconds between two polls of a market (busy markets)",
+    )
+    parser.add_argument(
+        "--max_interval",
+        type=float,
+        default=1800,
+        help="Watch mode: most seconds between two polls of a market (quiet markets)",
+    )
+    parser.add_argument(
+        "--output_dir",
+        type=str,
+        default="HomeHarvest_batch",
+        help="Batch mode: directory of the per-market files and of the resume journal",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Batch and watch mode: markets scraped at once (each fetches and parses its pages on its own threads)",
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the scrape (cProfile and tracemalloc) and print the CPU and memory hotspots per stage to stderr",
+    )
+
+    parser.add_argument(
+        "--store",
+        type=str,
+        default=None,
+        help="Also save the results into this local SQLite property store",
+    )
+
+    parser.add_argument(
+        "--max_age",
+        type=float,
+        default=None,
+        help="With --store, serve an identical scrape saved less than this many seconds ago from the store",
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="With --store, only fetch details for and parse the listings that changed since they were saved",
+    )
+
     args = parser.parse_args()
 
-    result = scrape_property(
-        args.location,
-        args.listing_type,
+    if args.watch:
+        return run_watch_mode(parser, args)
+    if args.batch:
+        if args.profile:
+            parser.error("--profile profiles a single location, not --batch")
+        if args.store:
+            parser.error("--store saves a single location, not --batch")
+        return run_batch_mode(parser, args)
+    if args.incremental and not args.store:
+        parser.error("--incremental needs --store")
+    if not args.location:
+        parser.error("a location is required (or --batch)")
+    args.output = args.output or "excel"
+
+    if not args.filename:
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        args.filename = f"HomeHarvest_{timestamp}"
+
+    scrape_kwargs = dict(
+        location=args.location,
+        listing_type=args.listing_type,
         radius=args.radius,
         proxy=args.proxy,
         mls_only=args.mls_only,
         past_days=args.days,
+        profile=args.profile,
+        store=args.store,
+        max_age=args.max_age,
+        incremental=args.incremental,
     )
 
-    if not args.filename:
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        args.filename = f"HomeHarvest_{timestamp}"
+    if args.output in WRITERS:
+        output_filename = f"{args.filename}.{WRITERS[args.output].extension}"
+        rows = write_properties(output_filename, args.output, **scrape_kwargs)
+        print(f"{args.output.upper()} file saved as {output_filename} ({rows} properties)")
+        return
+
+    result = scrape_property(**scrape_kwargs)
 
     if args.output == "excel":
         output_filename = f"{args.filename}.xlsx"
         result.to_excel(output_filename, index=False)
         print(f"Excel file saved as {output_filename}")
-    elif args.output == "csv":
-        output_filename = f"{args.filename}.csv"
-        result.to_csv(output_filename, index=False)
-        print(f"CSV file saved as {output_filename}")
+    elif args.output == "json":
+        output_filename = f"{args.filename}.json"
+        with open(output_filename, "wb") as f:
+            f.write(dumpb(result.to_dict(orient="records")))
+        print(f"JSON file saved as {output_filename}")
+
+
+def run_batch_mode(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    output = args.output or "csv"
+    if output not in WRITERS:
+        parser.error(f"batch mode writes {', '.join(WRITERS)} files, not {output}")
+
+    markets = read_markets(args.batch, [args.listing_type])
+
+    def report(location: str, listing_type: str, status: str, rows: int) -> None:
+        print(f"[{status}] {location} ({listing_type})" + (f": {rows} properties" if status == "done" else ""))
+
+    counts = run_batch(
+        markets,
+        args.output_dir,
+        output,
+        concurrency=args.concurrency,
+        progress=report,
+        radius=args.radius,
+        proxy=args.proxy,
+        mls_only=args.mls_only,
+        past_days=args.days,
+    )
+    print(
+        f"{counts['done']} markets scraped, {counts['skipped']} already done, {counts['failed']} failed "
+        f"(files and journal in {args.output_dir})"
+    )
+
+
+def run_watch_mode(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    from homeharvest.watch import Watcher
+
+    #: new listings are printed as JSON lines, options of file outputs and stored scrapes don't apply
+    for option, value in (
+        ("a location", args.location),
+        ("--batch", args.batch),
+        ("--output", args.output),
+        ("--filename", args.filename),
+        ("--profile", args.profile),
+        ("--store", args.store),
+        ("--max_age", args.max_age),
+        ("--incremental", args.incremental),
+    ):
+        if value:
+            parser.error(f"{option} can't be used with --watch")
+
+    def print_listing(market, prop) -> None:
+        print(dumpb({"market": market.location, **flatten_property(prop)}).decode(), flush=True)
+
+    watcher = Watcher(
+        read_markets(args.watch, [args.listing_type]),
+        print_listing,
+        min_interval=args.min_interval,
+        max_interval=args.max_interval,
+        concurrency=args.concurrency,
+        proxy=args.proxy,
+        mls_only=args.mls_only,
+        radius=args.radius,
+        last_x_days=args.days,
+    )
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,43 @@
+"""
+homeharvest.core.delta
+~~~~~~~~~~~~
+
+Incremental scrapes (scrape_property(store=..., incremental=True)).
+
+Each search result row gets a fingerprint of its cheap fields, the ones a listing changes when it
+is repriced, goes pending or sells. A scrape given a delta source (a PropertyStore) attaches the
+fingerprints to its page events so they are saved along with the properties, and an incremental
+scrape looks up the stored fingerprints of every page: rows that match are taken from the store
+as they were saved, and only new or changed rows get their extra details fetched and are parsed.
+A nightly rescrape of a market then costs its search pages plus the work of its churn.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from abc import ABC, abstractmethod
+
+from .scrapers.models import Property
+
+#: search result fields whose change means the stored property is stale
+FINGERPRINT_FIELDS = ("list_price", "status", "mls_status", "pending_date", "last_sold_date")
+
+
+def fingerprint(result: dict, extra_property_data: bool) -> str:
+    """Fingerprint of a raw search result: its FINGERPRINT_FIELDS, and whether it's enriched with extra details."""
+    values = [str(result.get(field)) for field in FINGERPRINT_FIELDS]
+    #: a property saved without its extra details must not stand in for one scraped with them
+    values.append("details" if extra_property_data else "")
+    return hashlib.blake2b("\x1f".join(values).encode(), digest_size=8).hexdigest()
+
+
+class DeltaSource(ABC):
+    """Previously saved properties an incremental scrape compares against (implemented by PropertyStore)."""
+
+    @abstractmethod
+    def fingerprints(self, property_ids: list[str], listing_type: str) -> dict[str, str]:
+        """Saved fingerprints of the given properties of listing_type (properties never saved are left out)."""
+
+    @abstractmethod
+    def load(self, property_ids: list[str], listing_type: str) -> list[Property]:
+        """The saved properties of listing_type among property_ids."""
@@ -0,0 +1,126 @@
+"""
+homeharvest.core.jsonlib
+~~~~~~~~~~~~
+
+Pluggable JSON backend for response decoding and result encoding.
+
+orjson is used when installed, then pysimdjson (decoding only), then the standard library.
+Force a backend with the HOMEHARVEST_JSON_BACKEND environment variable ("orjson", "simdjson"
+or "json") or with set_backend().
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Callable
+
+
+class JSONBackend:
+    def __init__(self, name: str, loads: Callable[[bytes | str], Any], dumpb: Callable[[Any], bytes]):
+        self.name = name
+        self.loads = loads
+        self.dumpb = dumpb
+
+    def __repr__(self) -> str:
+        return f"JSONBackend({self.name!r})"
+
+
+def _default(value: Any) -> Any:
+    """Fallback encoder for values the backends don't handle natively (pandas NA, numpy scalars, URLs...)."""
+    if value.__class__.__name__ in ("NAType", "NaTType"):
+        return None
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if hasattr(value, "item"):  #: numpy scalars
+        return value.item()
+    return str(value)
+
+
+def _stdlib_dumpb(value: Any) -> bytes:
+    return json.dumps(value, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def _stdlib_backend() -> JSONBackend:
+    return JSONBackend("json", json.loads, _stdlib_dumpb)
+
+
+def _orjson_backend() -> JSONBackend:
+    import orjson
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumpb(value: Any) -> bytes:
+        return orjson.dumps(value, default=_default, option=options)
+
+    #: orjson.JSONDecodeError subclasses json.JSONDecodeError, so existing retry logic keeps working
+    return JSONBackend("orjson", orjson.loads, dumpb)
+
+
+def _simdjson_backend() -> JSONBackend:
+    import simdjson
+
+    def loads(data: bytes | str) -> Any:
+        try:
+            return simdjson.loads(data)
+        except ValueError as e:
+            if isinstance(e, json.JSONDecodeError):
+                raise
+            document = data.decode(errors="replace") if isinstance(data, bytes) else data
+            raise json.JSONDecodeError(str(e), document, 0) from e
+
+    return JSONBackend("simdjson", loads, _stdlib_dumpb)
+
+
+_BACKEND_FACTORIES = {
+    "orjson": _orjson_backend,
+    "simdjson": _simdjson_backend,
+    "json": _stdlib_backend,
+}
+
+
+def _load_backend(name: str | None = None) -> JSONBackend:
+    if name:
+        if name not in _BACKEND_FACTORIES:
+            raise ValueError(f"Unknown JSON backend {name!r}, expected one of {', '.join(_BACKEND_FACTORIES)}.")
+        return _BACKEND_FACTORIES[name]()
+
+    for factory in _BACKEND_FACTORIES.values():
+        try:
+            return factory()
+        except ImportError:
+            continue
+
+
+_backend = _load_backend(os.environ.get("HOMEHARVEST_JSON_BACKEND") or None)
+
+
+def set_backend(name: str | None = None) -> JSONBackend:
+    """Switch the JSON backend ("orjson", "simdjson", "json"), or pick the fastest installed one if name is None."""
+    global _backend
+
+    _backend = _load_backend(name)
+    return _backend
+
+
+def get_backend() -> JSONBackend:
+    return _backend
+
+
+def loads(data: bytes | str) -> Any:
+    return _backend.loads(data)
+
+
+def dumpb(value: Any) -> bytes:
+    """Encode to compact UTF-8 JSON bytes. datetimes become ISO strings, pandas NA becomes null."""
+    return _backend.dumpb(value)
+
+
+def dumps(value: Any) -> str:
+    """Same as dumpb, as a str."""
+    return _backend.dumpb(value).decode()
+
+
+def response_json(response) -> Any:
+    """Decode a requests.Response body with the active backend (replacement for response.json())."""
+    return _backend.loads(response.content)
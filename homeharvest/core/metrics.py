@@ -0,0 +1,272 @@
+"""
+homeharvest.core.metrics
+~~~~~~~~~~~~
+
+Per-stage metrics of scrapes.
+
+Every scrape records, per stage, the time spent and for HTTP stages the response bytes, retries
+and status codes, into a ScrapeStats object (pass stats= to scrape_property to get it):
+
+    autocomplete    location lookup request
+    search          search page requests (and single home lookups)
+    details         bulk extra property details requests
+    process         parsing of the raw results into the return type, per page
+    delta           fingerprint lookup of incremental scrapes, per page (items: rows reused unchanged)
+    result          building the returned DataFrame (pandas return type)
+
+The same measurements are sent as they happen to the registered metrics sinks (add_sink), e.g.
+PrometheusSink, which keeps per-stage histograms and counters across scrapes and renders them in
+the Prometheus text format.
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("autocomplete", "search", "details", "process", "delta", "result")
+
+#: upper bounds (seconds) of the histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+@dataclass
+class StageStats:
+    """Totals of one stage of a scrape."""
+
+    count: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    bytes: int = 0
+    retries: int = 0
+    items: int = 0
+    status_codes: dict[int, int] = field(default_factory=dict)
+
+    def add(self, seconds: float, bytes: int = 0, retries: int = 0, items: int = 0, status: int | None = None) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.bytes += bytes
+        self.retries += retries
+        self.items += items
+        if status is not None:
+            self.status_codes[status] = self.status_codes.get(status, 0) + 1
+
+    def merge(self, other: StageStats) -> None:
+        self.count += other.count
+        self.seconds += other.seconds
+        self.max_seconds = max(self.max_seconds, other.max_seconds)
+        self.bytes += other.bytes
+        self.retries += other.retries
+        self.items += other.items
+        for status, count in other.status_codes.items():
+            self.status_codes[status] = self.status_codes.get(status, 0) + count
+
+
+class ScrapeStats:
+    """
+    Metrics of one scrape, per stage. Stage times are summed over threads, so with concurrent pages
+    they can add up to more than the wall time (seconds).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages: dict[str, StageStats] = {}
+        self.rows = 0
+        self.started = time.perf_counter()
+        self.seconds: float | None = None
+        #: ScrapeProfile of a scrape_property(profile=True) call
+        self.profile = None
+
+    def record(
+        self, stage: str, seconds: float, bytes: int = 0, retries: int = 0, items: int = 0, status: int | None = None
+    ) -> None:
+        """Add a measurement of stage, and send it to the metrics sinks."""
+        with self._lock:
+            self.stages.setdefault(stage, StageStats()).add(seconds, bytes, retries, items, status)
+
+        for sink in list(_sinks):
+            try:
+                sink.record(stage, seconds, bytes, retries, items, status)
+            except Exception:  #: metrics never fail a scrape
+                logger.exception("Metrics sink %r failed", sink)
+
+    def merge(self, other: ScrapeStats) -> None:
+        """Add the stage totals of other (e.g. the scrape a coalesced call shared), without sending them to the sinks."""
+        with self._lock:
+            for stage, stats in other.stages.items():
+                self.stages.setdefault(stage, StageStats()).merge(stats)
+            self.rows += other.rows
+
+    def finish(self, rows: int | None = None) -> None:
+        """Mark the scrape as done (with rows returned, if not counted as pages came in), and send it to the metrics sinks."""
+        if rows is not None:
+            self.rows = rows
+        self.seconds = time.perf_counter() - self.started
+        for sink in list(_sinks):
+            try:
+                sink.scrape_finished(self)
+            except Exception:
+                logger.exception("Metrics sink %r failed", sink)
+
+    @property
+    def requests(self) -> int:
+        return sum(self.stages[stage].count for stage in ("autocomplete", "search", "details") if stage in self.stages)
+
+    @property
+    def bytes(self) -> int:
+        return sum(stats.bytes for stats in self.stages.values())
+
+    @property
+    def retries(self) -> int:
+        return sum(stats.retries for stats in self.stages.values())
+
+    def as_dict(self) -> dict:
+        return {
+            "seconds": self.seconds,
+            "rows": self.rows,
+            "requests": self.requests,
+            "bytes": self.bytes,
+            "retries": self.retries,
+            "stages": {
+                stage: {
+                    "count": stats.count,
+                    "seconds": round(stats.seconds, 6),
+                    "max_seconds": round(stats.max_seconds, 6),
+                    "bytes": stats.bytes,
+                    "retries": stats.retries,
+                    "items": stats.items,
+                    "status_codes": dict(stats.status_codes),
+                }
+                for stage, stats in self.stages.items()
+            },
+        }
+
+    def __repr__(self) -> str:
+        stages = ", ".join(f"{stage}={stats.count}x/{stats.seconds:.3f}s" for stage, stats in self.stages.items())
+        return f"ScrapeStats(rows={self.rows}, seconds={self.seconds}, {stages})"
+
+
+class MetricsSink:
+    """Receives the measurements of every scrape. Subclass and register with add_sink()."""
+
+    def record(self, stage: str, seconds: float, bytes: int, retries: int, items: int, status: int | None) -> None:
+        pass
+
+    def scrape_finished(self, stats: ScrapeStats) -> None:
+        pass
+
+
+_sinks: list[MetricsSink] = []
+
+
+def add_sink(sink: MetricsSink) -> MetricsSink:
+    if sink not in _sinks:
+        _sinks.append(sink)
+    return sink
+
+
+def remove_sink(sink: MetricsSink) -> None:
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = buckets
+        self.counts = [0] * (len(buckets) + 1)  #: last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+class PrometheusSink(MetricsSink):
+    """Aggregates the metrics of every scrape of the process, rendered in the Prometheus text format by render()."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS, prefix: str = "homeharvest"):
+        self.buckets = buckets
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.histograms: dict[str, Histogram] = {}
+        self.responses: dict[tuple[str, int], int] = {}
+        self.bytes: dict[str, int] = {}
+        self.retries: dict[str, int] = {}
+        self.items: dict[str, int] = {}
+        self.scrapes = 0
+        self.rows = 0
+        self.scrape_histogram = Histogram(buckets)
+
+    def record(self, stage: str, seconds: float, bytes: int, retries: int, items: int, status: int | None) -> None:
+        with self._lock:
+            self.histograms.setdefault(stage, Histogram(self.buckets)).observe(seconds)
+            if status is not None:
+                self.responses[(stage, status)] = self.responses.get((stage, status), 0) + 1
+            self.bytes[stage] = self.bytes.get(stage, 0) + bytes
+            self.retries[stage] = self.retries.get(stage, 0) + retries
+            self.items[stage] = self.items.get(stage, 0) + items
+
+    def scrape_finished(self, stats: ScrapeStats) -> None:
+        with self._lock:
+            self.scrapes += 1
+            self.rows += stats.rows
+            self.scrape_histogram.observe(stats.seconds or 0.0)
+
+    def _histogram_lines(self, name: str, histogram: Histogram, labels: str = "") -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip([*map(str, histogram.bounds), "+Inf"], histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{"," if labels else ""}le="{bound}"}} {cumulative}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {histogram.sum}")
+        lines.append(f"{name}_count{suffix} {histogram.count}")
+        return lines
+
+    def render(self) -> str:
+        p = self.prefix
+        with self._lock:
+            lines = [
+                f"# HELP {p}_stage_seconds Time spent per scrape stage.",
+                f"# TYPE {p}_stage_seconds histogram",
+            ]
+            for stage, histogram in sorted(self.histograms.items()):
+                lines += self._histogram_lines(f"{p}_stage_seconds", histogram, f'stage="{stage}"')
+
+            lines += [
+                f"# HELP {p}_responses_total HTTP responses per stage and status code.",
+                f"# TYPE {p}_responses_total counter",
+            ]
+            lines += [
+                f'{p}_responses_total{{stage="{stage}",status="{status}"}} {count}'
+                for (stage, status), count in sorted(self.responses.items())
+            ]
+
+            for name, values, help_text in (
+                ("response_bytes", self.bytes, "Response bytes per stage."),
+                ("retries", self.retries, "Request retries per stage."),
+                ("items", self.items, "Items (properties) handled per stage."),
+            ):
+                lines += [f"# HELP {p}_{name}_total {help_text}", f"# TYPE {p}_{name}_total counter"]
+                lines += [f'{p}_{name}_total{{stage="{stage}"}} {value}' for stage, value in sorted(values.items())]
+
+            lines += [
+                f"# HELP {p}_scrapes_total Finished scrapes.",
+                f"# TYPE {p}_scrapes_total counter",
+                f"{p}_scrapes_total {self.scrapes}",
+                f"# HELP {p}_rows_total Rows returned by finished scrapes.",
+                f"# TYPE {p}_rows_total counter",
+                f"{p}_rows_total {self.rows}",
+                f"# HELP {p}_scrape_seconds Wall time of finished scrapes.",
+                f"# TYPE {p}_scrape_seconds histogram",
+            ]
+            lines += self._histogram_lines(f"{p}_scrape_seconds", self.scrape_histogram)
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,149 @@
+"""
+homeharvest.core.profiling
+~~~~~~~~~~~~
+
+Profiling mode of scrapes (scrape_property(profile=True), homeharvest --profile).
+
+The scrape runs under cProfile, in the calling thread and in every thread started during it (the
+page and parsing thread pools), timed in per-thread CPU time so threads waiting on the network
+or on each other don't show up, and under tracemalloc. The resulting ScrapeProfile reports the
+CPU time of the main stages, the top functions by own CPU time and the top allocation sites of
+memory still held at the end of the scrape, plus the peak of traced memory. Work sent to worker
+processes (parse_processes) is not profiled.
+
+From Python 3.12, cProfile is built on sys.monitoring: a single profiler sees every thread of the
+process and no second one can be enabled, so the scrape is profiled by one profiler timed in wall
+time. The calls of concurrent threads are then interleaved in its stacks, and the CPU times of the
+stages are approximate (they include time spent waiting).
+"""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+#: stage -> (file path suffix, function name) whose cumulative time is the time of the stage
+STAGE_FUNCTIONS = {
+    "http requests": (os.path.join("scrapers", "__init__.py"), "request"),
+    "json decoding": ("jsonlib.py", "response_json"),
+    "process_property": ("processors.py", "process_property"),
+    "parse_description": ("parsers.py", "parse_description"),
+    "flatten_property": ("utils.py", "flatten_property"),
+    "process_result (DataFrame)": (os.path.join("homeharvest", "__init__.py"), "_to_dataframe"),
+}
+
+#: before 3.12 a profiler only sees the thread that enabled it, so every thread of a scrape gets its own
+PER_THREAD_PROFILERS = sys.version_info < (3, 12)
+
+#: profiled scrapes replace the thread profile hook of the process, so they run one at a time
+_profile_lock = threading.Lock()
+
+
+class ScrapeProfile:
+    """CPU and memory profile of a scrape."""
+
+    def __init__(self, cpu: pstats.Stats, memory: tracemalloc.Snapshot, peak_memory: int):
+        self.cpu = cpu
+        self.memory = memory
+        self.peak_memory = peak_memory
+
+    def stage_seconds(self) -> dict[str, float]:
+        """Cumulative CPU seconds per stage, summed over threads (stages nest, e.g. parse_description is part of process_property)."""
+        seconds = dict.fromkeys(STAGE_FUNCTIONS, 0.0)
+        for (filename, _, function), (_, _, _, cumulative, _) in self.cpu.stats.items():
+            for stage, (suffix, stage_function) in STAGE_FUNCTIONS.items():
+                if function == stage_function and filename.endswith(suffix):
+                    seconds[stage] += cumulative
+        return seconds
+
+    def report(self, top: int = 15) -> str:
+        lines = ["CPU time per stage (cumulative over threads):"]
+        lines += [f"  {stage:<28} {seconds:8.3f}s" for stage, seconds in self.stage_seconds().items()]
+
+        lines += ["", f"Top {top} functions by own CPU time:"]
+        output = io.StringIO()
+        self.cpu.stream = output
+        self.cpu.sort_stats(pstats.SortKey.TIME).print_stats(top)
+        lines += [line for line in output.getvalue().splitlines() if line.strip()][-(top + 1) :]
+
+        lines += [
+            "",
+            f"Peak traced memory: {self.peak_memory / 2**20:.1f} MiB",
+            f"Top {top} allocation sites held at the end:",
+        ]
+        for statistic in self.memory.statistics("lineno")[:top]:
+            frame = statistic.traceback[0]
+            lines.append(
+                f"  {statistic.size / 2**20:8.2f} MiB {statistic.count:>9} blocks  {frame.filename}:{frame.lineno}"
+            )
+        return "\n".join(lines)
+
+    def dump(self, path: str) -> None:
+        """Save the CPU profile for pstats, snakeviz and similar tools."""
+        self.cpu.dump_stats(path)
+
+
+class Profiler:
+    """Context manager profiling the scrape run inside it; the ScrapeProfile is in .profile afterwards."""
+
+    def __init__(self):
+        self.profile: ScrapeProfile | None = None
+        self._main: cProfile.Profile | None = None
+        self._thread_profilers: list[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._started_tracemalloc = False
+
+    def _profile_thread(self, *args) -> None:
+        #: first profile event of a new thread: replace this hook with a profiler of the thread
+        profiler = cProfile.Profile(time.thread_time)
+        with self._lock:
+            self._thread_profilers.append(profiler)
+        profiler.enable()
+
+    def __enter__(self) -> Profiler:
+        _profile_lock.acquire()
+        self._started_tracemalloc = not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start()
+        else:
+            tracemalloc.reset_peak()
+
+        if PER_THREAD_PROFILERS:
+            threading.setprofile(self._profile_thread)
+            self._main = cProfile.Profile(time.thread_time)
+        else:
+            #: sees the pool threads as well, and thread CPU time would be mixed across them
+            self._main = cProfile.Profile(time.perf_counter)
+        self._main.enable()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        try:
+            self._main.disable()
+            if PER_THREAD_PROFILERS:
+                threading.setprofile(None)
+
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+                ]
+            )
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+
+            cpu = pstats.Stats(self._main)
+            with self._lock:
+                #: threads of the scrape's pools have exited, their profilers are complete
+                for profiler in self._thread_profilers:
+                    cpu.add(profiler)
+            self.profile = ScrapeProfile(cpu, snapshot, peak_memory)
+        finally:
+            _profile_lock.release()
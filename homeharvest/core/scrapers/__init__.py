@@ -1,16 +1,45 @@
 from __future__ import annotations
-from typing import Union
+from typing import Union, Any, Callable
+import threading
+import time
 
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import uuid
+from datetime import datetime
 from ...exceptions import AuthenticationError
+from .. import jsonlib
+from ..metrics import ScrapeStats
+from ..spill import SpillBuffer
+from ..tracing import set_attributes, span
+from ..transport import adapter_from_env
 from .models import Property, ListingType, SiteName, SearchPropertyType, ReturnType
 import json
 from pydantic import BaseModel
 
 
+class ScrapeProgress(BaseModel):
+    """Progress event passed to ScraperInput.progress_callback.
+
+    stage "page": a page of search results is fully processed, properties holds its rows
+    (already in the requested return type). stage "details": the extra property details of
+    a page were fetched. completed/total count pages (total is None until the first page is in).
+    Scrapes with a delta source also give the fingerprints of the page's rows that were fetched
+    and parsed, and the property ids of the rows taken unchanged from the delta source. found is
+    the number of results the search reported for the whole scrape (before the limit and the
+    filters), None if a page had no search results in its response (an error or a cancelled scrape).
+    """
+
+    stage: str
+    completed: int
+    total: int | None = None
+    properties: list[Any] = []
+    fingerprints: dict[str, str] = {}
+    unchanged: list[str] = []
+    found: int | None = None
+
+
 class ScraperInput(BaseModel):
     location: str
     listing_type: ListingType
@@ -26,6 +55,17 @@ class ScraperInput(BaseModel):
     exclude_pending: bool | None = False
     limit: int = 10000
     return_type: ReturnType = ReturnType.pandas
+    parse_processes: int | None = None
+    progress_callback: Callable[[ScrapeProgress], Any] | None = None
+    retain_results: bool = True
+    memory_budget: int | None = None
+    #: DeltaSource (PropertyStore) the page fingerprints are computed for, and with incremental compared against
+    delta_source: Any = None
+    incremental: bool = False
+    #: list date descending order of results, and a filter of the raw search rows
+    #: (False drops a row before its details are fetched)
+    newest_first: bool = False
+    row_filter: Callable[[dict], bool] | None = None
 
 
 class Scraper:
@@ -40,33 +80,7 @@ class Scraper:
         self.property_type = scraper_input.property_type
 
         if not self.session:
-            Scraper.session = requests.Session()
-            retries = Retry(
-                total=3, backoff_factor=4, status_forcelist=[429, 403], allowed_methods=frozenset(["GET", "POST"])
-            )
-
-            adapter = HTTPAdapter(max_retries=retries)
-            Scraper.session.mount("http://", adapter)
-            Scraper.session.mount("https://", adapter)
-            Scraper.session.headers.update(
-                {
-                    "accept": "application/json, text/javascript",
-                    "accept-language": "en-US,en;q=0.9",
-                    "cache-control": "no-cache",
-                    "content-type": "application/json",
-                    "origin": "https://www.realtor.com",
-                    "pragma": "no-cache",
-                    "priority": "u=1, i",
-                    "rdc-ab-tests": "commute_travel_time_variation:v1",
-                    "sec-ch-ua": '"Not)A;Brand";v="99", "Google Chrome";v="127", "Chromium";v="127"',
-                    "sec-ch-ua-mobile": "?0",
-                    "sec-ch-ua-platform": '"Windows"',
-                    "sec-fetch-dest": "empty",
-                    "sec-fetch-mode": "cors",
-                    "sec-fetch-site": "same-origin",
-                    "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36",
-                }
-            )
+            Scraper.create_session()
 
         if scraper_input.proxy:
             proxy_url = scraper_input.proxy
@@ -84,9 +98,114 @@ class Scraper:
         self.exclude_pending = scraper_input.exclude_pending
         self.limit = scraper_input.limit
         self.return_type = scraper_input.return_type
+        self.parse_processes = scraper_input.parse_processes
+
+        #: single "now" for every date-relative value of a scrape (days_on_mls, past_days filtering)
+        self.reference_time = datetime.now()
+
+        self.progress_callback = scraper_input.progress_callback
+        self.retain_results = scraper_input.retain_results
+        #: past the memory budget (MB), completed pages spill to disk
+        self.spill = SpillBuffer(scraper_input.memory_budget * 2**20) if scraper_input.memory_budget else None
+        self.delta_source = scraper_input.delta_source
+        self.incremental = scraper_input.incremental
+        self.newest_first = scraper_input.newest_first
+        self.row_filter = scraper_input.row_filter
+        self.cancelled = threading.Event()
+        self.stats = ScrapeStats()
+        self.pages_completed = 0
+        self.pages_total = None
+        self.detail_batches_completed = 0
+        self._progress_lock = threading.RLock()
+
+    @classmethod
+    def create_session(cls) -> requests.Session:
+        """Create the shared, pooled session used by every scraper (kept for the life of the process)."""
+        Scraper.session = requests.Session()
+        retries = Retry(
+            total=3, backoff_factor=4, status_forcelist=[429, 403], allowed_methods=frozenset(["GET", "POST"])
+        )
+
+        adapter = HTTPAdapter(max_retries=retries)
+        #: HOMEHARVEST_TRANSPORT record/replay fixtures (see homeharvest.core.transport)
+        adapter = adapter_from_env(adapter) or adapter
+        Scraper.session.mount("http://", adapter)
+        Scraper.session.mount("https://", adapter)
+        Scraper.session.headers.update(
+            {
+                "accept": "application/json, text/javascript",
+                "accept-language": "en-US,en;q=0.9",
+                "cache-control": "no-cache",
+                "content-type": "application/json",
+                "origin": "https://www.realtor.com",
+                "pragma": "no-cache",
+                "priority": "u=1, i",
+                "rdc-ab-tests": "commute_travel_time_variation:v1",
+                "sec-ch-ua": '"Not)A;Brand";v="99", "Google Chrome";v="127", "Chromium";v="127"',
+                "sec-ch-ua-mobile": "?0",
+                "sec-ch-ua-platform": '"Windows"',
+                "sec-fetch-dest": "empty",
+                "sec-fetch-mode": "cors",
+                "sec-fetch-site": "same-origin",
+                "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36",
+            }
+        )
+        return Scraper.session
 
     def search(self) -> list[Union[Property | dict]]: ...
 
+    def request(self, stage: str, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request through the shared session, recording its time, size, retries and status under stage."""
+        with span("homeharvest.http", stage=stage, method=method, url=url) as current_span:
+            start = time.perf_counter()
+            response = self.session.request(method, url, **kwargs)
+            #: retries made by the adapter (urllib3 Retry) before this response
+            retry_state = getattr(response.raw, "retries", None)
+            retries = len(retry_state.history) if retry_state else 0
+            self.stats.record(
+                stage,
+                time.perf_counter() - start,
+                bytes=len(response.content),
+                retries=retries,
+                status=response.status_code,
+            )
+            set_attributes(current_span, status_code=response.status_code, bytes=len(response.content), retries=retries)
+        return response
+
+    def report_progress(
+        self,
+        stage: str,
+        completed: int,
+        total: int | None,
+        properties: list | None = None,
+        fingerprints: dict[str, str] | None = None,
+        unchanged: list[str] | None = None,
+        found: int | None = None,
+    ) -> None:
+        """Send a ScrapeProgress event to the progress callback, if any.
+
+        Calls are serialized, as pages complete on worker threads. If the callback raises
+        (e.g. ScrapeCancelled), the scrape is marked cancelled and the exception propagates.
+        """
+        if not self.progress_callback:
+            return
+
+        event = ScrapeProgress(
+            stage=stage,
+            completed=completed,
+            total=total,
+            properties=properties or [],
+            fingerprints=fingerprints or {},
+            unchanged=unchanged or [],
+            found=found,
+        )
+        with self._progress_lock:
+            try:
+                self.progress_callback(event)
+            except BaseException:
+                self.cancelled.set()
+                raise
+
     @staticmethod
     def _parse_home(home) -> Property: ...
 
@@ -117,7 +236,7 @@ class Scraper:
             ),
         )
 
-        data = response.json()
+        data = jsonlib.response_json(response)
 
         if not (access_token := data.get("access_token")):
             raise AuthenticationError(
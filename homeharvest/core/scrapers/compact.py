@@ -0,0 +1,91 @@
+"""
+homeharvest.core.scrapers.compact
+~~~~~~~~~~~~
+
+Slotted record types mirroring the pydantic models, used by return_type="compact".
+
+Each model (Property, Address, Description, Advertisers, ...) gets a generated
+``__slots__`` dataclass with the same attribute names, so ``prop.address.city`` or
+``prop.flags.is_pending`` keep working while a row costs a fraction of the memory.
+"""
+
+from __future__ import annotations
+
+import sys
+from dataclasses import make_dataclass, asdict
+from functools import lru_cache
+from typing import Any
+
+from pydantic import BaseModel, AnyUrl
+
+from . import models
+from .models import Property
+
+#: string fields that repeat across most rows of a search (city, state, county, MLS, ...)
+#: and are interned so every row points at the same string object
+INTERNED_FIELDS = frozenset(
+    {
+        "city",
+        "state",
+        "zip",
+        "county",
+        "fips_code",
+        "neighborhoods",
+        "mls",
+        "mls_set",
+        "status",
+        "mls_status",
+        "type",
+        "name",
+        "time_zone",
+        "category",
+        "parent_category",
+    }
+)
+
+
+@lru_cache(maxsize=None)
+def compact_type(model: type[BaseModel]) -> type:
+    """Return the slotted dataclass mirroring ``model`` (fields and computed fields)."""
+    field_names = [*model.model_fields, *model.model_computed_fields]
+    record_type = make_dataclass(f"Compact{model.__name__}", field_names, slots=True)
+
+    #: register under this module so records can be pickled
+    record_type.__module__ = __name__
+    globals()[record_type.__name__] = record_type
+    return record_type
+
+
+def _compact_value(value: Any, field_name: str | None = None) -> Any:
+    if isinstance(value, BaseModel):
+        return to_compact(value)
+    if isinstance(value, list):
+        return tuple(_compact_value(item) for item in value)
+    if isinstance(value, AnyUrl):
+        return str(value)
+    if field_name in INTERNED_FIELDS and type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+def to_compact(model: BaseModel):
+    """Convert a pydantic model (and all nested models) into compact records.
+
+    URLs become plain strings, lists become tuples, and repeated strings are interned.
+    Free-form dicts (photos, parcel_info, phones) are kept as-is.
+    """
+    record_type = compact_type(type(model))
+    return record_type(*(_compact_value(getattr(model, name), name) for name in record_type.__dataclass_fields__))
+
+
+def compact_to_dict(record) -> dict:
+    """Recursively convert a compact record back into plain dicts/lists, like ``model_dump``."""
+    return asdict(record)
+
+
+#: create every record type up front, so records unpickled from worker processes can find their class
+for _model in vars(models).values():
+    if isinstance(_model, type) and issubclass(_model, BaseModel) and _model.__module__ == models.__name__:
+        compact_type(_model)
+
+CompactProperty = compact_type(Property)
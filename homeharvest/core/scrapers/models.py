@@ -9,6 +9,8 @@ class ReturnType(Enum):
     pydantic = "pydantic"
     pandas = "pandas"
     raw = "raw"
+    compact = "compact"
+    lazy = "lazy"
 
 
 class SiteName(Enum):
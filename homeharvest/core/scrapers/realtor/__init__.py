@@ -8,8 +8,12 @@ This module implements the scraper for realtor.com
 from __future__ import annotations
 
 import json
+import os
+import threading
+import time
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime
+from datetime import datetime, timedelta
 from json import JSONDecodeError
 from typing import Dict, Union
 
@@ -21,31 +25,60 @@ from tenacity import (
 )
 
 from .. import Scraper
-from ..models import (
-    Property,
-    ListingType,
-    ReturnType
-)
+from ... import jsonlib, tracing
+from ...tracing import set_attributes, span
+from ..models import Property, ListingType, ReturnType
 from .queries import GENERAL_RESULTS_QUERY, SEARCH_HOMES_DATA, HOMES_DATA, HOME_FRAGMENT
-from .processors import (
-    process_property,
-    process_extra_property_details,
-    get_key
-)
+from .processors import is_property_included, process_property, process_extra_property_details, get_key
+from .lazy import process_property_lazy
+from .parsers import calculate_days_on_mls, parse_naive_datetime
+from ...delta import fingerprint
 
 
 class RealtorScraper(Scraper):
-    SEARCH_GQL_URL = "https://www.realtor.com/api/v1/rdc_search_srp?client_id=rdc-search-new-communities&schema=vesta"
+    #: API endpoints, overridable through the environment to point scrapers at a stand-in server
+    SEARCH_GQL_URL = os.environ.get(
+        "HOMEHARVEST_SEARCH_GQL_URL",
+        "https://www.realtor.com/api/v1/rdc_search_srp?client_id=rdc-search-new-communities&schema=vesta",
+    )
     PROPERTY_URL = "https://www.realtor.com/realestateandhomes-detail/"
     PROPERTY_GQL = "https://graph.realtor.com/graphql"
-    ADDRESS_AUTOCOMPLETE_URL = "https://parser-external.geo.moveaws.com/suggest"
+    ADDRESS_AUTOCOMPLETE_URL = os.environ.get(
+        "HOMEHARVEST_AUTOCOMPLETE_URL", "https://parser-external.geo.moveaws.com/suggest"
+    )
     NUM_PROPERTY_WORKERS = 20
     DEFAULT_PAGE_SIZE = 200
+    #: seconds a resolved location is reused before asking the autocomplete API again
+    LOCATION_CACHE_TTL = 3600
+    #: resolved locations kept at most, the least recently used are dropped first
+    LOCATION_CACHE_SIZE = 1024
+
+    _location_cache: OrderedDict[tuple[str, str], tuple[float, dict]] = OrderedDict()
+    _location_cache_lock = threading.Lock()
 
     def __init__(self, scraper_input):
         super().__init__(scraper_input)
 
     def handle_location(self):
+        """Resolve the location with the autocomplete API, cached for LOCATION_CACHE_TTL seconds."""
+        cache_key = (" ".join(self.location.split()).casefold(), self.listing_type.value)
+        with self._location_cache_lock:
+            cached = self._location_cache.get(cache_key)
+            if cached and cached[0] > time.monotonic():
+                self._location_cache.move_to_end(cache_key)
+                return cached[1]
+
+        location_info = self._resolve_location()
+        if location_info:  #: unresolved locations are not cached, they may be a transient API failure
+            with self._location_cache_lock:
+                self._location_cache[cache_key] = (time.monotonic() + self.LOCATION_CACHE_TTL, location_info)
+                self._location_cache.move_to_end(cache_key)
+                while len(self._location_cache) > self.LOCATION_CACHE_SIZE:
+                    self._location_cache.popitem(last=False)
+
+        return location_info
+
+    def _resolve_location(self):
         params = {
             "input": self.location,
             "client_id": self.listing_type.value.lower().replace("_", "-"),
@@ -53,11 +86,13 @@ class RealtorScraper(Scraper):
             "area_types": "city,state,county,postal_code,address,street,neighborhood,school,school_district,university,park",
         }
 
-        response = self.session.get(
+        response = self.request(
+            "autocomplete",
+            "GET",
             self.ADDRESS_AUTOCOMPLETE_URL,
             params=params,
         )
-        response_json = response.json()
+        response_json = jsonlib.response_json(response)
 
         result = response_json["autocomplete"]
 
@@ -83,8 +118,8 @@ class RealtorScraper(Scraper):
             "variables": variables,
         }
 
-        response = self.session.post(self.SEARCH_GQL_URL, json=payload)
-        response_json = response.json()
+        response = self.request("search", "POST", self.SEARCH_GQL_URL, json=payload)
+        response_json = jsonlib.response_json(response)
 
         property_info = response_json["data"]["property"]
         if property_info["listings"] is None:
@@ -113,23 +148,55 @@ class RealtorScraper(Scraper):
             "variables": variables,
         }
 
-        response = self.session.post(self.SEARCH_GQL_URL, json=payload)
-        response_json = response.json()
+        response = self.request("search", "POST", self.SEARCH_GQL_URL, json=payload)
+        response_json = jsonlib.response_json(response)
 
         property_info = response_json["data"]["home"]
 
-        if self.return_type != ReturnType.raw:
-            return [process_property(property_info, self.mls_only, self.extra_property_data, 
-                                   self.exclude_pending, self.listing_type, get_key, process_extra_property_details)]
-        else:
+        self.pages_completed, self.pages_total = 1, 1
+        if self.return_type == ReturnType.raw:
+            self.report_progress("page", 1, 1, [property_info], found=1)
             return [property_info]
 
+        if self.return_type == ReturnType.lazy:
+            lazy_property = process_property_lazy(
+                property_info,
+                self.mls_only,
+                self.extra_property_data,
+                self.exclude_pending,
+                self.listing_type,
+                self.reference_time,
+            )
+            self.report_progress("page", 1, 1, [lazy_property] if lazy_property else [], found=1)
+            return [lazy_property]
+
+        realty_property = process_property(
+            property_info,
+            self.mls_only,
+            self.extra_property_data,
+            self.exclude_pending,
+            self.listing_type,
+            get_key,
+            process_extra_property_details,
+            self.reference_time,
+        )
+        if self.return_type == ReturnType.compact and realty_property:
+            from ..compact import to_compact
+
+            realty_property = to_compact(realty_property)
 
+        self.report_progress("page", 1, 1, [realty_property] if realty_property else [], found=1)
+        return [realty_property]
 
-    def general_search(self, variables: dict, search_type: str) -> Dict[str, Union[int, Union[list[Property], list[dict]]]]:
+    def general_search(
+        self, variables: dict, search_type: str
+    ) -> Dict[str, Union[int, Union[list[Property], list[dict]]]]:
         """
         Handles a location area & returns a list of properties
         """
+        #: total is None when the search didn't answer (cancelled, or a response without results)
+        if self.cancelled.is_set():
+            return {"total": None, "properties": []}
 
         date_param = ""
         if self.listing_type == ListingType.SOLD:
@@ -138,7 +205,7 @@ class RealtorScraper(Scraper):
             elif self.last_x_days:
                 date_param = f'sold_date: {{ min: "$today-{self.last_x_days}D" }}'
         elif self.listing_type == ListingType.PENDING:
-            # Skip server-side date filtering for PENDING as both pending_date and contract_date 
+            # Skip server-side date filtering for PENDING as both pending_date and contract_date
             # filters are broken in the API. Client-side filtering will be applied later.
             pass
         else:
@@ -152,11 +219,12 @@ class RealtorScraper(Scraper):
             property_types = [pt.value for pt in self.property_type]
             property_type_param = f"type: {json.dumps(property_types)}"
 
-        sort_param = (
-            "sort: [{ field: sold_date, direction: desc }]"
-            if self.listing_type == ListingType.SOLD
-            else ""  #: "sort: [{ field: list_date, direction: desc }]"  #: prioritize normal fractal sort from realtor
-        )
+        if self.listing_type == ListingType.SOLD:
+            sort_param = "sort: [{ field: sold_date, direction: desc }]"
+        elif self.newest_first:
+            sort_param = "sort: [{ field: list_date, direction: desc }]"
+        else:
+            sort_param = ""  #: prioritize normal fractal sort from realtor
 
         pending_or_contingent_param = (
             "or_filters: { contingent: true, pending: true }" if self.listing_type == ListingType.PENDING else ""
@@ -257,8 +325,8 @@ class RealtorScraper(Scraper):
             "variables": variables,
         }
 
-        response = self.session.post(self.SEARCH_GQL_URL, json=payload)
-        response_json = response.json()
+        response = self.request("search", "POST", self.SEARCH_GQL_URL, json=payload)
+        response_json = jsonlib.response_json(response)
         search_key = "home_search" if "home_search" in query else "property_search"
 
         properties: list[Union[Property, dict]] = []
@@ -271,7 +339,7 @@ class RealtorScraper(Scraper):
             or response_json["data"][search_key] is None
             or "results" not in response_json["data"][search_key]
         ):
-            return {"total": 0, "properties": []}
+            return {"total": None, "properties": []}
 
         properties_list = response_json["data"][search_key]["results"]
         total_properties = response_json["data"][search_key]["total"]
@@ -281,9 +349,33 @@ class RealtorScraper(Scraper):
         #: example, if your offset is 200, and your limit is 250, return 50
         properties_list: list[dict] = properties_list[: self.limit - offset]
 
+        #: rows the caller already has (e.g. seen by a watcher) are dropped before their details are fetched
+        filtered = 0
+        if self.row_filter is not None:
+            kept = [data for data in properties_list if self.row_filter(data)]
+            filtered = len(properties_list) - len(kept)
+            properties_list = kept
+
+        fingerprints: dict[str, str] = {}
+        unchanged: list[Property] = []
+        if self.delta_source is not None:
+            fingerprints = {
+                data["property_id"]: fingerprint(data, self.extra_property_data) for data in properties_list
+            }
+            if self.incremental:
+                properties_list, unchanged = self._reuse_unchanged(properties_list, fingerprints)
+                for prop in unchanged:
+                    del fingerprints[prop.property_id]
+
         if self.extra_property_data:
             property_ids = [data["property_id"] for data in properties_list]
-            extra_property_details = self.get_bulk_prop_details(property_ids) or {}
+            with span("homeharvest.details", properties=len(property_ids)):
+                extra_property_details = self.get_bulk_prop_details(property_ids) or {}
+
+            with self._progress_lock:
+                self.detail_batches_completed += 1
+                detail_batches_completed = self.detail_batches_completed
+            self.report_progress("details", detail_batches_completed, self.pages_total)
 
             for result in properties_list:
                 specific_details_for_property = extra_property_details.get(result["property_id"], {})
@@ -296,53 +388,180 @@ class RealtorScraper(Scraper):
 
                 result.update(specific_details_for_property)
 
-        if self.return_type != ReturnType.raw:
-            with ThreadPoolExecutor(max_workers=self.NUM_PROPERTY_WORKERS) as executor:
-                futures = [executor.submit(process_property, result, self.mls_only, self.extra_property_data, 
-                                         self.exclude_pending, self.listing_type, get_key, process_extra_property_details) for result in properties_list]
-
-                for future in as_completed(futures):
-                    result = future.result()
-                    if result:
-                        properties.append(result)
-        else:
-            properties = properties_list
+        with span("homeharvest.process", properties=len(properties_list), return_type=self.return_type.value):
+            process_start = time.perf_counter()
+            if self.return_type == ReturnType.raw:
+                properties = properties_list
+            elif self.return_type == ReturnType.lazy:
+                #: nothing is parsed up front, so there is no work to spread over threads
+                for result in properties_list:
+                    if lazy_property := process_property_lazy(
+                        result,
+                        self.mls_only,
+                        self.extra_property_data,
+                        self.exclude_pending,
+                        self.listing_type,
+                        self.reference_time,
+                    ):
+                        properties.append(lazy_property)
+            elif self.parse_processes:
+                #: CPU-bound parsing goes to worker processes, this thread only waits (other pages keep fetching)
+                from .workers import get_process_pool, process_property_batch, split_batches
+
+                executor = get_process_pool(self.parse_processes)
+                futures = [
+                    executor.submit(
+                        process_property_batch,
+                        batch,
+                        self.mls_only,
+                        self.extra_property_data,
+                        self.exclude_pending,
+                        self.listing_type,
+                        self.return_type,
+                        self.reference_time,
+                    )
+                    for batch in split_batches(properties_list, self.parse_processes)
+                ]
+
+                for future in futures:
+                    properties.extend(future.result())
+            else:
+                from ..compact import to_compact
+
+                with ThreadPoolExecutor(max_workers=self.NUM_PROPERTY_WORKERS) as executor:
+                    futures = [
+                        executor.submit(
+                            process_property,
+                            result,
+                            self.mls_only,
+                            self.extra_property_data,
+                            self.exclude_pending,
+                            self.listing_type,
+                            get_key,
+                            process_extra_property_details,
+                            self.reference_time,
+                        )
+                        for result in properties_list
+                    ]
+
+                    for future in as_completed(futures):
+                        result = future.result()
+                        if result:
+                            #: convert per page so the pydantic models of a page are released right away
+                            properties.append(to_compact(result) if self.return_type == ReturnType.compact else result)
+            self.stats.record("process", time.perf_counter() - process_start, items=len(properties_list))
+
+        if unchanged:
+            from ..compact import to_compact
+
+            properties.extend(
+                to_compact(prop) if self.return_type == ReturnType.compact else prop for prop in unchanged
+            )
 
         return {
             "total": total_properties,
             "properties": properties,
+            "fingerprints": fingerprints,
+            "unchanged": [prop.property_id for prop in unchanged],
+            "filtered": filtered,
+        }
+
+    def _reuse_unchanged(
+        self, properties_list: list[dict], fingerprints: dict[str, str]
+    ) -> tuple[list[dict], list[Property]]:
+        """
+        Split a page into the rows to fetch and parse, and the saved properties of the rows whose fingerprint
+        didn't change.
+        """
+        start = time.perf_counter()
+        listing_type = self.listing_type.value.lower()
+        #: the filters of the scrape apply to the saved properties too (they may have been saved by another scrape)
+        included = {
+            data["property_id"]: data
+            for data in properties_list
+            if is_property_included(data, self.mls_only, self.exclude_pending, self.listing_type)
         }
+        saved = self.delta_source.fingerprints(list(included), listing_type)
+        matching = [property_id for property_id in included if saved.get(property_id) == fingerprints[property_id]]
+
+        unchanged = []
+        for prop in self.delta_source.load(matching, listing_type):
+            #: days on the market move with the calendar, not with the listing
+            days_on_mls = calculate_days_on_mls(included[prop.property_id], now=self.reference_time)
+            unchanged.append(prop.model_copy(update={"days_on_mls": days_on_mls}))
+
+        reused = {prop.property_id for prop in unchanged}
+        changed = [data for property_id, data in included.items() if property_id not in reused]
+        self.stats.record("delta", time.perf_counter() - start, items=len(unchanged))
+        return changed, unchanged
 
     def search(self):
-        location_info = self.handle_location()
+        self.reference_time = datetime.now()
+
+        with span("homeharvest.location", location=self.location):
+            location_info = self.handle_location()
         if not location_info:
             return []
 
         location_type = location_info["area_type"]
+        if location_type == "address" and not self.radius:  #: single address search, non comps
+            property_id = location_info["mpr_id"]
+            return self.handle_home(property_id)
+
+        search = self._search_variables(location_info)
+        if search is None:
+            return []
+        search_variables, search_type = search
+
+        result = self._search_page(search_variables, search_type)
+        total = result["total"] or 0
+        offsets = range(
+            self.DEFAULT_PAGE_SIZE,
+            min(total, self.limit),
+            self.DEFAULT_PAGE_SIZE,
+        )
+        self.pages_total = 1 + len(offsets)
+        homes = self._handle_page(result)
+
+        with ThreadPoolExecutor() as executor:
+            futures = {
+                tracing.submit(executor, self._search_page, search_variables | {"offset": i}, search_type)
+                for i in offsets
+            }
+
+            try:
+                for future in as_completed(futures):
+                    #: drop the finished page, so a page is released as soon as it is handled
+                    futures.discard(future)
+                    homes.extend(self._handle_page(future.result()))
+            except BaseException:
+                #: cancelled from the progress callback (or a page failed), skip the pages not started yet
+                self.cancelled.set()
+                executor.shutdown(wait=False, cancel_futures=True)
+                if self.spill:
+                    self.spill.close()
+                raise
+
+        return self.spill.results(homes) if self.spill else homes
+
+    def _search_variables(self, location_info: dict) -> tuple[dict, str] | None:
+        """Variables and type of the area search of a resolved location (None if it can't be searched)."""
+        location_type = location_info["area_type"]
 
         search_variables = {
             "offset": 0,
         }
 
-        search_type = (
-            "comps"
-            if self.radius and location_type == "address"
-            else "address" if location_type == "address" and not self.radius else "area"
-        )
-        if location_type == "address":
-            if not self.radius:  #: single address search, non comps
-                property_id = location_info["mpr_id"]
-                return self.handle_home(property_id)
-
-            else:  #: general search, comps (radius)
-                if not location_info.get("centroid"):
-                    return []
-
-                coordinates = list(location_info["centroid"].values())
-                search_variables |= {
-                    "coordinates": coordinates,
-                    "radius": "{}mi".format(self.radius),
-                }
+        search_type = "comps" if self.radius and location_type == "address" else "area"
+        if location_type == "address":  #: general search, comps (radius)
+            if not location_info.get("centroid"):
+                return None
+
+            coordinates = list(location_info["centroid"].values())
+            search_variables |= {
+                "coordinates": coordinates,
+                "radius": "{}mi".format(self.radius),
+            }
 
         elif location_type == "postal_code":
             search_variables |= {
@@ -355,155 +574,164 @@ class RealtorScraper(Scraper):
                 "county": location_info.get("county"),
                 "state_code": location_info.get("state_code"),
                 "postal_code": location_info.get("postal_code"),
-
             }
 
         if self.foreclosure:
             search_variables["foreclosure"] = self.foreclosure
 
-        result = self.general_search(search_variables, search_type=search_type)
-        total = result["total"]
-        homes = result["properties"]
+        return search_variables, search_type
 
-        with ThreadPoolExecutor() as executor:
-            futures = [
-                executor.submit(
-                    self.general_search,
-                    variables=search_variables | {"offset": i},
-                    search_type=search_type,
-                )
-                for i in range(
-                    self.DEFAULT_PAGE_SIZE,
-                    min(total, self.limit),
-                    self.DEFAULT_PAGE_SIZE,
-                )
-            ]
-
-            for future in as_completed(futures):
-                homes.extend(future.result()["properties"])
+    def search_newest(self, max_pages: int = 5) -> list:
+        """
+        Newest listings of the location first (by list date), one page at a time.
+
+        Paging stops at the first page where the row filter dropped a row, i.e. reached listings the
+        caller has already seen, so only the new listings are fetched, enriched and parsed.
+        """
+        self.reference_time = datetime.now()
 
+        with span("homeharvest.location", location=self.location):
+            location_info = self.handle_location()
+        if not location_info or (location_info["area_type"] == "address" and not self.radius):
+            return []
+        search = self._search_variables(location_info)
+        if search is None:
+            return []
+        search_variables, search_type = search
+
+        homes = []
+        for page in range(max_pages):
+            offset = page * self.DEFAULT_PAGE_SIZE
+            if offset >= self.limit:
+                break
+            result = self._search_page(search_variables | {"offset": offset}, search_type)
+            homes.extend(self._handle_page(result))
+            if result.get("filtered") or offset + self.DEFAULT_PAGE_SIZE >= (result["total"] or 0):
+                break
+        return homes
+
+    def _search_page(self, variables: dict, search_type: str) -> dict:
+        with span(
+            "homeharvest.search_page", offset=variables.get("offset", 0), search_type=search_type
+        ) as current_span:
+            result = self.general_search(variables, search_type=search_type)
+            set_attributes(current_span, total=result["total"], properties=len(result["properties"]))
+            return result
+
+    def _handle_page(self, result: dict):
+        """Filter a completed page of results and report it to the progress callback."""
+        homes = result["properties"]
         # Apply client-side date filtering for PENDING properties
         # (server-side filters are broken in the API)
         if self.listing_type == ListingType.PENDING and (self.last_x_days or self.date_from):
             homes = self._apply_pending_date_filter(homes)
-        
-        return homes
+
+        self.pages_completed += 1
+        self.stats.rows += len(homes)
+        self.report_progress(
+            "page",
+            self.pages_completed,
+            self.pages_total,
+            homes,
+            result.get("fingerprints"),
+            result.get("unchanged"),
+            result["total"],
+        )
+        #: streamed scrapes hand each page to the progress callback only, so memory stays bounded by a page
+        if not self.retain_results:
+            return []
+        return self.spill.add(homes) if self.spill else homes
 
     def _apply_pending_date_filter(self, homes):
         """Apply client-side date filtering for PENDING properties based on pending_date field.
         For contingent properties without pending_date, tries fallback date fields."""
         if not homes:
             return homes
-            
-        from datetime import datetime, timedelta
-        
+
         # Determine date range for filtering
         date_range = self._get_date_range()
         if not date_range:
             return homes
-            
+
         filtered_homes = []
-        
+
         for home in homes:
             # Extract the best available date for this property
             property_date = self._extract_property_date_for_filtering(home)
-            
+
             # Handle properties without dates (include contingent properties)
             if property_date is None:
                 if self._is_contingent(home):
                     filtered_homes.append(home)  # Include contingent without date filter
                 continue
-            
+
             # Check if property date falls within the specified range
             if self._is_date_in_range(property_date, date_range):
                 filtered_homes.append(home)
-                
+
         return filtered_homes
-    
+
     def _get_pending_date(self, home):
         """Extract pending_date from a home property (handles both dict and Property object)."""
         if isinstance(home, dict):
-            return home.get('pending_date')
+            return home.get("pending_date")
         else:
             # Assume it's a Property object
-            return getattr(home, 'pending_date', None)
-    
-    
+            return getattr(home, "pending_date", None)
+
     def _is_contingent(self, home):
         """Check if a property is contingent."""
         if isinstance(home, dict):
-            flags = home.get('flags', {})
-            return flags.get('is_contingent', False)
+            flags = home.get("flags", {})
+            return flags.get("is_contingent", False)
         else:
             # Property object - check flags attribute
-            if hasattr(home, 'flags') and home.flags:
-                return getattr(home.flags, 'is_contingent', False)
+            if hasattr(home, "flags") and home.flags:
+                return getattr(home.flags, "is_contingent", False)
             return False
-    
+
     def _get_date_range(self):
         """Get the date range for filtering based on instance parameters."""
-        from datetime import datetime, timedelta
-        
         if self.last_x_days:
-            cutoff_date = datetime.now() - timedelta(days=self.last_x_days)
-            return {'type': 'since', 'date': cutoff_date}
+            cutoff_date = self.reference_time - timedelta(days=self.last_x_days)
+            return {"type": "since", "date": cutoff_date}
         elif self.date_from and self.date_to:
             try:
                 from_date = datetime.fromisoformat(self.date_from)
                 to_date = datetime.fromisoformat(self.date_to)
-                return {'type': 'range', 'from_date': from_date, 'to_date': to_date}
+                return {"type": "range", "from_date": from_date, "to_date": to_date}
             except ValueError:
                 return None
         return None
-    
+
     def _extract_property_date_for_filtering(self, home):
         """Extract pending_date from a property for filtering.
-        
+
         Returns parsed datetime object or None.
         """
         date_value = self._get_pending_date(home)
         if date_value:
             return self._parse_date_value(date_value)
         return None
-    
+
     def _parse_date_value(self, date_value):
         """Parse a date value (string or datetime) into a timezone-naive datetime object."""
-        from datetime import datetime
-        
         if isinstance(date_value, datetime):
             return date_value.replace(tzinfo=None)
-        
+
         if not isinstance(date_value, str):
             return None
-            
-        try:
-            # Handle timezone indicators
-            if date_value.endswith('Z'):
-                date_value = date_value[:-1] + '+00:00'
-            elif '.' in date_value and date_value.endswith('Z'):
-                date_value = date_value.replace('Z', '+00:00')
-            
-            # Try ISO format first
-            try:
-                parsed_date = datetime.fromisoformat(date_value)
-                return parsed_date.replace(tzinfo=None)
-            except ValueError:
-                # Try simple datetime format: '2025-08-29 00:00:00'
-                return datetime.strptime(date_value, '%Y-%m-%d %H:%M:%S')
-                
-        except (ValueError, AttributeError):
-            return None
-    
+
+        return parse_naive_datetime(date_value)
+
     def _is_date_in_range(self, date_obj, date_range):
         """Check if a datetime object falls within the specified date range."""
-        if date_range['type'] == 'since':
-            return date_obj >= date_range['date']
-        elif date_range['type'] == 'range':
-            return date_range['from_date'] <= date_obj <= date_range['to_date']
+        if date_range["type"] == "since":
+            return date_obj >= date_range["date"]
+        elif date_range["type"] == "range":
+            return date_range["from_date"] <= date_obj <= date_range["to_date"]
         return False
 
-
-
     @retry(
         retry=retry_if_exception_type(JSONDecodeError),
         wait=wait_exponential(min=4, max=10),
@@ -517,12 +745,12 @@ class RealtorScraper(Scraper):
         if not self.extra_property_data or not property_ids:
             return {}
 
-        property_ids = list(set(property_ids))
+        #: deduplicated in a stable order, so the same page always sends the same query
+        property_ids = list(dict.fromkeys(property_ids))
 
         # Construct the bulk query
         fragments = "\n".join(
-            f'home_{property_id}: home(property_id: {property_id}) {{ ...HomeData }}'
-            for property_id in property_ids
+            f"home_{property_id}: home(property_id: {property_id}) {{ ...HomeData }}" for property_id in property_ids
         )
         query = f"""{HOME_FRAGMENT}
         
@@ -530,13 +758,11 @@ class RealtorScraper(Scraper):
             {fragments}
         }}"""
 
-        response = self.session.post(self.SEARCH_GQL_URL, json={"query": query})
-        data = response.json()
+        response = self.request("details", "POST", self.SEARCH_GQL_URL, json={"query": query})
+        data = jsonlib.response_json(response)
 
         if "data" not in data:
             return {}
 
         properties = data["data"]
-        return {data.replace('home_', ''): properties[data] for data in properties if properties[data]}
-
-
+        return {data.replace("home_", ""): properties[data] for data in properties if properties[data]}
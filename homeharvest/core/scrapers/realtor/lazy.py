@@ -0,0 +1,93 @@
+"""
+homeharvest.realtor.lazy
+~~~~~~~~~~~~
+
+Lazily parsed Property variant, used by return_type="lazy".
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from functools import lru_cache
+from typing import Any
+
+from pydantic import TypeAdapter
+
+from ..models import Property, ListingType
+from .processors import (
+    PROPERTY_FIELD_PARSERS,
+    EXTRA_DETAIL_FIELDS,
+    is_property_included,
+    process_extra_property_details,
+)
+from .parsers import calculate_days_on_mls
+
+
+@lru_cache(maxsize=None)
+def _field_adapter(field: str) -> TypeAdapter:
+    Property.model_rebuild()
+    return TypeAdapter(Property.model_fields[field].annotation)
+
+
+class LazyProperty:
+    """
+    Wraps the raw GraphQL result of a home and parses each Property field on first access.
+
+    Attribute access matches Property (``prop.description.beds``, ``prop.list_date``, ...), and every
+    field is validated into the same type the Property model would give it. Parsed values are
+    memoized on the instance, so fields that are never read are never parsed.
+    """
+
+    def __init__(self, raw: dict, extra_property_data: bool = False, reference_time: datetime | None = None):
+        self.raw = raw
+        self.extra_property_data = extra_property_data
+        self.reference_time = reference_time or datetime.now()
+
+    def __getattr__(self, name: str) -> Any:
+        #: only reached for fields that were not parsed yet
+        if name in PROPERTY_FIELD_PARSERS:
+            value = PROPERTY_FIELD_PARSERS[name](self.raw)
+        elif name in EXTRA_DETAIL_FIELDS:
+            value = self._extra_details.get(EXTRA_DETAIL_FIELDS[name])
+        elif name == "days_on_mls":
+            value = calculate_days_on_mls(self.raw, now=self.reference_time)
+        else:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+        value = _field_adapter(name).validate_python(value)
+        self.__dict__[name] = value
+        return value
+
+    @property
+    def _extra_details(self) -> dict:
+        if "_extra_details_cache" not in self.__dict__:
+            self.__dict__["_extra_details_cache"] = (
+                process_extra_property_details(self.raw) if self.extra_property_data else {}
+            )
+        return self.__dict__["_extra_details_cache"]
+
+    def __repr__(self) -> str:
+        return f"LazyProperty(property_id={self.raw.get('property_id')!r})"
+
+    def to_property(self) -> Property:
+        """Parse every field and return the equivalent Property."""
+        fields = [*PROPERTY_FIELD_PARSERS, *EXTRA_DETAIL_FIELDS, "days_on_mls"]
+        return Property(**{field: getattr(self, field) for field in fields})
+
+    def model_dump(self, **kwargs) -> dict:
+        return self.to_property().model_dump(**kwargs)
+
+
+def process_property_lazy(
+    result: dict,
+    mls_only: bool = False,
+    extra_property_data: bool = False,
+    exclude_pending: bool = False,
+    listing_type: ListingType = ListingType.FOR_SALE,
+    reference_time: datetime | None = None,
+) -> LazyProperty | None:
+    """Apply the same filters as process_property, deferring all parsing to attribute access"""
+    if not is_property_included(result, mls_only, exclude_pending, listing_type):
+        return None
+
+    return LazyProperty(result, extra_property_data=extra_property_data, reference_time=reference_time)
@@ -3,6 +3,7 @@ Parsers for realtor.com data processing
 """
 
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 from ..models import Address, Description, PropertyType
 
@@ -247,13 +248,48 @@ def parse_description(result: dict) -> Description | None:
     )
 
 
-def calculate_days_on_mls(result: dict) -> Optional[int]:
-    """Calculate days on MLS from result data"""
+@lru_cache(maxsize=4096)
+def parse_date(date_str: str) -> datetime:
+    """Parse the date part of an ISO date/datetime string (e.g. 2025-08-29T10:00:00Z -> 2025-08-29).
+
+    Cached, as the listings of a scrape share a small set of distinct dates."""
+    return datetime.fromisoformat(date_str.split("T")[0])
+
+
+@lru_cache(maxsize=4096)
+def parse_datetime(date_str: str) -> datetime:
+    """Parse an ISO date/datetime string, keeping the time part. Cached like parse_date."""
+    return datetime.fromisoformat(date_str)
+
+
+@lru_cache(maxsize=4096)
+def parse_naive_datetime(date_str: str) -> datetime | None:
+    """Parse an ISO ("...Z" included) or "YYYY-MM-DD HH:MM:SS" string into a timezone-naive datetime.
+    Returns None if the string cannot be parsed."""
+    if date_str.endswith("Z"):
+        date_str = date_str[:-1] + "+00:00"
+
+    try:
+        return datetime.fromisoformat(date_str).replace(tzinfo=None)
+    except ValueError:
+        pass
+
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+
+
+def calculate_days_on_mls(result: dict, now: datetime | None = None) -> Optional[int]:
+    """Calculate days on MLS from result data
+
+    now is the reference time of the scrape, so every row of a scrape is counted against the same instant.
+    """
     list_date_str = result.get("list_date")
-    list_date = datetime.strptime(list_date_str.split("T")[0], "%Y-%m-%d") if list_date_str else None
+    list_date = parse_date(list_date_str) if list_date_str else None
     last_sold_date_str = result.get("last_sold_date")
-    last_sold_date = datetime.strptime(last_sold_date_str, "%Y-%m-%d") if last_sold_date_str else None
-    today = datetime.now()
+    last_sold_date = parse_date(last_sold_date_str) if last_sold_date_str else None
+    today = now or datetime.now()
 
     if list_date:
         if result["status"] == "sold":
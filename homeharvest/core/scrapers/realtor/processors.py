@@ -24,6 +24,8 @@ from .parsers import (
     parse_address,
     parse_description,
     calculate_days_on_mls,
+    parse_date,
+    parse_datetime,
     process_alt_photos
 )
 
@@ -76,91 +78,127 @@ def process_advertisers(advertisers: list[dict] | None) -> Advertisers | None:
     return processed_advertisers
 
 
-def process_property(result: dict, mls_only: bool = False, extra_property_data: bool = False, 
-                    exclude_pending: bool = False, listing_type: ListingType = ListingType.FOR_SALE,
-                    get_key_func=None, process_extra_property_details_func=None) -> Property | None:
-    """Process property data from GraphQL response"""
-    mls = result["source"].get("id") if "source" in result and isinstance(result["source"], dict) else None
+def _get_mls(result: dict) -> str | None:
+    return result["source"].get("id") if "source" in result and isinstance(result["source"], dict) else None
 
-    if not mls and mls_only:
-        return None
 
+def _get_coordinate(result: dict) -> dict | None:
     able_to_get_lat_long = (
         result
         and result.get("location")
         and result["location"].get("address")
         and result["location"]["address"].get("coordinate")
     )
+    return result["location"]["address"]["coordinate"] if able_to_get_lat_long else None
+
+
+def _get_status(result: dict) -> str:
+    is_pending = result["flags"].get("is_pending")
+    is_contingent = result["flags"].get("is_contingent")
+    return "PENDING" if is_pending else "CONTINGENT" if is_contingent else result["status"].upper()
+
+
+def _get_estimated_value(result: dict) -> int | None:
+    property_estimates_root = result.get("current_estimates") or result.get("estimates", {}).get("currentValues")
+    estimated_value = get_key(property_estimates_root, [0, "estimate"])
+    return estimated_value if estimated_value else None
+
+
+#: Property field -> parser of the raw GraphQL result, shared by process_property and LazyProperty
+PROPERTY_FIELD_PARSERS = {
+    "mls": _get_mls,
+    "mls_id": lambda result: (
+        result["source"].get("listing_id") if "source" in result and isinstance(result["source"], dict) else None
+    ),
+    "property_url": lambda result: result["href"],
+    "property_id": lambda result: result["property_id"],
+    "listing_id": lambda result: result.get("listing_id"),
+    "permalink": lambda result: result.get("permalink"),
+    "status": _get_status,
+    "list_price": lambda result: result["list_price"],
+    "list_price_min": lambda result: result["list_price_min"],
+    "list_price_max": lambda result: result["list_price_max"],
+    "list_date": lambda result: parse_date(result["list_date"]) if result.get("list_date") else None,
+    "prc_sqft": lambda result: result.get("price_per_sqft"),
+    "last_sold_date": lambda result: parse_datetime(result["last_sold_date"]) if result.get("last_sold_date") else None,
+    "pending_date": lambda result: parse_date(result["pending_date"]) if result.get("pending_date") else None,
+    "new_construction": lambda result: result["flags"].get("is_new_construction") is True,
+    "hoa_fee": lambda result: result["hoa"]["fee"] if result.get("hoa") and isinstance(result["hoa"], dict) else None,
+    "latitude": lambda result: (coordinate := _get_coordinate(result)) and coordinate.get("lat"),
+    "longitude": lambda result: (coordinate := _get_coordinate(result)) and coordinate.get("lon"),
+    "address": lambda result: parse_address(result, search_type="general_search"),
+    "description": parse_description,
+    "neighborhoods": parse_neighborhoods,
+    "county": lambda result: result["location"]["county"].get("name") if result["location"]["county"] else None,
+    "fips_code": lambda result: (
+        result["location"]["county"].get("fips_code") if result["location"]["county"] else None
+    ),
+    "estimated_value": _get_estimated_value,
+    "advertisers": lambda result: process_advertisers(result.get("advertisers")),
+
+    # Additional fields from GraphQL
+    "mls_status": lambda result: result.get("mls_status"),
+    "last_sold_price": lambda result: result.get("last_sold_price"),
+    "tags": lambda result: result.get("tags"),
+    "details": lambda result: result.get("details"),
+    "open_houses": lambda result: parse_open_houses(result.get("open_houses")),
+    "pet_policy": lambda result: result.get("pet_policy"),
+    "units": lambda result: parse_units(result.get("units")),
+    "monthly_fees": lambda result: result.get("monthly_fees"),
+    "one_time_fees": lambda result: result.get("one_time_fees"),
+    "parking": lambda result: result.get("parking"),
+    "terms": lambda result: result.get("terms"),
+    "popularity": lambda result: result.get("popularity"),
+    "tax_record": lambda result: parse_tax_record(result.get("tax_record")),
+    "parcel_info": lambda result: result.get("location", {}).get("parcel"),
+    "current_estimates": lambda result: parse_current_estimates(result.get("current_estimates")),
+    "estimates": lambda result: parse_estimates(result.get("estimates")),
+    "photos": lambda result: result.get("photos"),
+    "flags": lambda result: result.get("flags"),
+}
+
+#: Property field -> key in the output of process_extra_property_details
+EXTRA_DETAIL_FIELDS = {
+    "nearby_schools": "schools",
+    "assessed_value": "assessed_value",
+    "tax": "tax",
+    "tax_history": "tax_history",
+}
+
+
+def is_property_included(result: dict, mls_only: bool = False, exclude_pending: bool = False,
+                         listing_type: ListingType = ListingType.FOR_SALE) -> bool:
+    """Apply the mls_only and exclude_pending filters to a raw GraphQL result"""
+    if not _get_mls(result) and mls_only:
+        return False
 
     is_pending = result["flags"].get("is_pending")
     is_contingent = result["flags"].get("is_contingent")
 
     if (is_pending or is_contingent) and (exclude_pending and listing_type != ListingType.PENDING):
-        return None
+        return False
 
-    property_id = result["property_id"]
-    prop_details = process_extra_property_details_func(result) if extra_property_data and process_extra_property_details_func else {}
+    return True
 
-    property_estimates_root = result.get("current_estimates") or result.get("estimates", {}).get("currentValues")
-    estimated_value = get_key_func(property_estimates_root, [0, "estimate"]) if get_key_func else None
 
-    advertisers = process_advertisers(result.get("advertisers"))
+def process_property(result: dict, mls_only: bool = False, extra_property_data: bool = False, 
+                    exclude_pending: bool = False, listing_type: ListingType = ListingType.FOR_SALE,
+                    get_key_func=None, process_extra_property_details_func=None,
+                    reference_time: datetime | None = None) -> Property | None:
+    """Process property data from GraphQL response
+
+    get_key_func is kept for backwards compatibility, nested keys are always read with get_key.
+    reference_time is the "now" days_on_mls is counted against, captured once per scrape.
+    """
+    if not is_property_included(result, mls_only, exclude_pending, listing_type):
+        return None
+
+    prop_details = process_extra_property_details_func(result) if extra_property_data and process_extra_property_details_func else {}
 
     realty_property = Property(
-        mls=mls,
-        mls_id=(
-            result["source"].get("listing_id")
-            if "source" in result and isinstance(result["source"], dict)
-            else None
-        ),
-        property_url=result["href"],
-        property_id=property_id,
-        listing_id=result.get("listing_id"),
-        permalink=result.get("permalink"),
-        status=("PENDING" if is_pending else "CONTINGENT" if is_contingent else result["status"].upper()),
-        list_price=result["list_price"],
-        list_price_min=result["list_price_min"],
-        list_price_max=result["list_price_max"],
-        list_date=(datetime.fromisoformat(result["list_date"].split("T")[0]) if result.get("list_date") else None),
-        prc_sqft=result.get("price_per_sqft"),
-        last_sold_date=(datetime.fromisoformat(result["last_sold_date"]) if result.get("last_sold_date") else None),
-        pending_date=(datetime.fromisoformat(result["pending_date"].split("T")[0]) if result.get("pending_date") else None),
-        new_construction=result["flags"].get("is_new_construction") is True,
-        hoa_fee=(result["hoa"]["fee"] if result.get("hoa") and isinstance(result["hoa"], dict) else None),
-        latitude=(result["location"]["address"]["coordinate"].get("lat") if able_to_get_lat_long else None),
-        longitude=(result["location"]["address"]["coordinate"].get("lon") if able_to_get_lat_long else None),
-        address=parse_address(result, search_type="general_search"),
-        description=parse_description(result),
-        neighborhoods=parse_neighborhoods(result),
-        county=(result["location"]["county"].get("name") if result["location"]["county"] else None),
-        fips_code=(result["location"]["county"].get("fips_code") if result["location"]["county"] else None),
-        days_on_mls=calculate_days_on_mls(result),
-        nearby_schools=prop_details.get("schools"),
-        assessed_value=prop_details.get("assessed_value"),
-        estimated_value=estimated_value if estimated_value else None,
-        advertisers=advertisers,
-        tax=prop_details.get("tax"),
-        tax_history=prop_details.get("tax_history"),
-        
-        # Additional fields from GraphQL
-        mls_status=result.get("mls_status"),
-        last_sold_price=result.get("last_sold_price"),
-        tags=result.get("tags"),
-        details=result.get("details"),
-        open_houses=parse_open_houses(result.get("open_houses")),
-        pet_policy=result.get("pet_policy"),
-        units=parse_units(result.get("units")),
-        monthly_fees=result.get("monthly_fees"),
-        one_time_fees=result.get("one_time_fees"),
-        parking=result.get("parking"),
-        terms=result.get("terms"),
-        popularity=result.get("popularity"),
-        tax_record=parse_tax_record(result.get("tax_record")),
-        parcel_info=result.get("location", {}).get("parcel"),
-        current_estimates=parse_current_estimates(result.get("current_estimates")),
-        estimates=parse_estimates(result.get("estimates")),
-        photos=result.get("photos"),
-        flags=result.get("flags"),
+        **{field: parse(result) for field, parse in PROPERTY_FIELD_PARSERS.items()},
+        **{field: prop_details.get(key) for field, key in EXTRA_DETAIL_FIELDS.items()},
+        days_on_mls=calculate_days_on_mls(result, now=reference_time),
     )
     return realty_property
 
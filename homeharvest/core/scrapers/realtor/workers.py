@@ -0,0 +1,105 @@
+"""
+homeharvest.realtor.workers
+~~~~~~~~~~~~
+
+Process pool backend for property processing (scrape_property(parse_processes=N)).
+
+process_property is pure Python, so the default thread pool cannot run it in parallel.
+With parse_processes set, each page's raw results are split into batches, sent to worker
+processes, and come back already processed (flattened rows for pandas output).
+
+Workers are started with forkserver (spawn where unavailable) rather than fork, as the pool is
+created while the page fetching threads are running. As with any multiprocessing code, scripts
+using it should call scrape_property under ``if __name__ == "__main__":``.
+"""
+
+from __future__ import annotations
+
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from ..models import ListingType, ReturnType
+from ..compact import to_compact
+from .processors import process_property, process_extra_property_details, get_key
+
+#: shared pools by worker count, never shut down while a scrape may still use one
+_pools: dict[int, ProcessPoolExecutor] = {}
+_pool_lock = threading.Lock()
+
+
+def get_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Return the shared process pool of max_workers workers, creating it on first use.
+
+    Pools outlive a single scrape, as starting worker processes costs far more than parsing a page.
+    Scrapes asking for different worker counts (e.g. concurrent MCP requests) get separate pools.
+    """
+    with _pool_lock:
+        pool = _pools.get(max_workers)
+        if pool is None:
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(start_method))
+            _pools[max_workers] = pool
+
+        return pool
+
+
+def shutdown_process_pool() -> None:
+    """Shut down every shared pool (at exit, once no scrape is running)."""
+    with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+
+atexit.register(shutdown_process_pool)
+
+
+def process_property_batch(
+    results: list[dict],
+    mls_only: bool,
+    extra_property_data: bool,
+    exclude_pending: bool,
+    listing_type: ListingType,
+    return_type: ReturnType,
+    reference_time: datetime | None = None,
+) -> list:
+    """Worker entry point: process a batch of raw results into the output type of return_type.
+
+    pandas output is flattened here as well (see homeharvest.utils.flatten_property), so only
+    plain rows travel back to the parent process.
+    """
+    from ....utils import flatten_property
+
+    processed = []
+    for result in results:
+        realty_property = process_property(
+            result,
+            mls_only,
+            extra_property_data,
+            exclude_pending,
+            listing_type,
+            get_key,
+            process_extra_property_details,
+            reference_time,
+        )
+        if not realty_property:
+            continue
+
+        if return_type == ReturnType.pandas:
+            processed.append(flatten_property(realty_property, format_dates=False))
+        elif return_type == ReturnType.compact:
+            processed.append(to_compact(realty_property))
+        else:
+            processed.append(realty_property)
+
+    return processed
+
+
+def split_batches(results: list, batch_count: int) -> list[list]:
+    """Split results into at most batch_count contiguous, evenly sized batches."""
+    batch_size = max(1, -(-len(results) // max(1, batch_count)))
+    return [results[i : i + batch_size] for i in range(0, len(results), batch_size)]
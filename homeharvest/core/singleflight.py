@@ -0,0 +1,172 @@
+"""
+homeharvest.core.singleflight
+~~~~~~~~~~~~
+
+Coalescing of identical concurrent scrapes.
+
+Calls with the same key made while a scrape is in flight wait for it and share its result instead
+of scraping again, and a successful result is memoized for a few seconds to also cover
+near-simultaneous repeats. Progress events of the shared scrape are sent to every caller's
+callback (callers that join late first get the events they missed).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Callable, Hashable
+
+from pydantic import BaseModel
+
+#: seconds a finished scrape's result is reused by identical calls
+DEFAULT_MEMO_TTL = float(os.environ.get("HOMEHARVEST_COALESCE_TTL", 5))
+
+#: ScraperInput fields that don't change what a scrape returns
+_UNKEYED_FIELDS = {"progress_callback", "parse_processes", "proxy"}
+
+
+def scrape_key(scraper_input: BaseModel) -> Hashable:
+    """Normalized, hashable key of a ScraperInput: equal for inputs that return the same properties."""
+    values = scraper_input.model_dump(exclude=_UNKEYED_FIELDS)
+    values["location"] = " ".join(values["location"].split()).casefold()
+    if values.get("property_type"):
+        #: enum members aren't orderable, property types are sorted by value
+        values["property_type"] = tuple(sorted(values["property_type"], key=lambda property_type: property_type.value))
+    return tuple(sorted(values.items()))
+
+
+class _Subscriber:
+    def __init__(self, callback: Callable[[Any], Any] | None):
+        self.callback = callback
+        self.error: BaseException | None = None
+        self.done = threading.Event()
+
+
+class _Flight:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.subscribers: list[_Subscriber] = []
+        self.events: list = []
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.finished = False
+        #: every subscriber detached, so the scrape is being stopped
+        self.abandoned = False
+
+    def subscribe(self, callback: Callable[[Any], Any] | None) -> _Subscriber | None:
+        """Join the flight, replaying the events sent so far. Returns None if the flight was abandoned."""
+        subscriber = _Subscriber(callback)
+        with self.lock:
+            if self.abandoned:
+                return None
+            if callback:
+                for event in self.events:
+                    callback(event)
+            self.subscribers.append(subscriber)
+            if self.finished:
+                subscriber.done.set()
+        return subscriber
+
+    def dispatch(self, event) -> None:
+        """Progress callback of the shared scrape, forwarding each event to every subscriber.
+
+        A subscriber whose callback raises (e.g. ScrapeCancelled) is detached and gets that
+        exception; the scrape itself is only stopped once no subscriber is left.
+        """
+        with self.lock:
+            self.events.append(event)
+            for subscriber in list(self.subscribers):
+                if not subscriber.callback:
+                    continue
+                try:
+                    subscriber.callback(event)
+                except BaseException as e:
+                    subscriber.error = e
+                    self.subscribers.remove(subscriber)
+                    subscriber.done.set()
+                    if not self.subscribers:
+                        self.abandoned = True
+                        raise
+
+    def finish(self, result: Any = None, error: BaseException | None = None) -> None:
+        with self.lock:
+            self.result, self.error, self.finished = result, error, True
+            for subscriber in self.subscribers:
+                subscriber.done.set()
+
+    def outcome(self, subscriber: _Subscriber) -> Any:
+        if subscriber.error is not None:
+            raise subscriber.error
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time, sharing its result with concurrent callers of the same key."""
+
+    def __init__(self, memo_ttl: float = DEFAULT_MEMO_TTL):
+        self.memo_ttl = memo_ttl
+        self._lock = threading.Lock()
+        self._flights: dict[Hashable, _Flight] = {}
+        self._memo: dict[Hashable, tuple[float, Any]] = {}
+
+    def do(
+        self,
+        key: Hashable,
+        func: Callable[[Callable[[Any], None]], Any],
+        progress_callback: Callable[[Any], Any] | None = None,
+    ) -> Any:
+        """
+        Return func(progress) for key, or the result of the identical call already in flight (or memoized).
+
+        func receives the progress callback of the shared call, which forwards to progress_callback
+        and the callbacks of every caller that joined. Results are shared as-is between callers.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._memo = {k: memo for k, memo in self._memo.items() if memo[0] > now}
+                if key in self._memo:
+                    return self._memo[key][1]
+
+                flight = self._flights.get(key)
+                leader = flight is None or flight.abandoned
+                if leader:
+                    flight = self._flights[key] = _Flight()
+
+            subscriber = flight.subscribe(progress_callback)
+            if subscriber is not None:
+                break
+
+        if not leader:
+            subscriber.done.wait()
+            return flight.outcome(subscriber)
+
+        try:
+            result = func(flight.dispatch)
+        except BaseException as e:
+            self._land(key, flight)
+            flight.finish(error=e)
+            raise
+
+        self._land(key, flight, result)
+        flight.finish(result)
+        return flight.outcome(subscriber)
+
+    def _land(self, key: Hashable, flight: _Flight, result: Any = None) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            if result is not None and self.memo_ttl > 0 and not flight.abandoned:
+                self._memo[key] = (time.monotonic() + self.memo_ttl, result)
+
+    def clear(self) -> None:
+        """Forget memoized results (in-flight calls are unaffected)."""
+        with self._lock:
+            self._memo.clear()
+
+
+#: shared by every scrape_property call
+scrape_flights = SingleFlight()
@@ -0,0 +1,184 @@
+"""
+homeharvest.core.spill
+~~~~~~~~~~~~
+
+Memory-bounded results (scrape_property(memory_budget=...)).
+
+Completed pages are kept in memory until their estimated size reaches the budget; from then on
+every page is pickled into a temporary SQLite file instead. The scrape returns a SpilledResults
+sequence that reads the spilled pages back one at a time, so the results of any size are
+available with memory bounded by the budget plus a page. The file is removed once the
+SpilledResults is garbage collected (or closed).
+"""
+
+from __future__ import annotations
+
+import bisect
+import gc
+import os
+import pickle
+import sqlite3
+import sys
+import tempfile
+import threading
+import weakref
+from collections.abc import Sequence
+from typing import Any, Iterator
+
+#: rows of a page measured to estimate the size of the page
+SAMPLE_ROWS = 3
+
+_SHARED_TYPES = (type, type(sys), type(len), type(lambda: None))
+
+
+def deep_sizeof(obj: Any) -> int:
+    """Approximate memory held by obj and the objects it references (classes, modules and functions excluded)."""
+    seen = set()
+    size = 0
+    pending = [obj]
+    while pending:
+        objects = [o for o in pending if id(o) not in seen and not isinstance(o, _SHARED_TYPES)]
+        seen.update(id(o) for o in objects)
+        size += sum(sys.getsizeof(o) for o in objects)
+        pending = gc.get_referents(*objects)
+    return size
+
+
+def estimate_page_size(page: list) -> int:
+    if not page:
+        return 0
+    sample = page[:: max(1, len(page) // SAMPLE_ROWS)][:SAMPLE_ROWS]
+    return sum(deep_sizeof(row) for row in sample) * len(page) // len(sample)
+
+
+def _close(connection: sqlite3.Connection, path: str) -> None:
+    connection.close()
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class SpillBuffer:
+    """
+    Decides, page by page, whether a scrape's results stay in memory or spill to disk.
+
+    :param budget: Bytes of results kept in memory before spilling
+    :param directory: Directory of the spill file (system temp directory by default)
+    """
+
+    def __init__(self, budget: int, directory: str | None = None):
+        self.budget = budget
+        self.directory = directory
+        self.retained_bytes = 0
+        self.spilled_rows = 0
+        self.page_lengths: list[int] = []
+        self._path: str | None = None
+        self._connection: sqlite3.Connection | None = None
+        self._finalizer: weakref.finalize | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def spilling(self) -> bool:
+        return self._connection is not None
+
+    def add(self, page: list) -> list:
+        """Take a completed page. Returns the rows to keep in memory: the page, or [] once it was spilled."""
+        if not self.spilling:
+            page_size = estimate_page_size(page)
+            if self.retained_bytes + page_size <= self.budget:
+                self.retained_bytes += page_size
+                return page
+            self._open()
+
+        if page:
+            with self._lock:
+                self._connection.execute("INSERT INTO pages (rows) VALUES (?)", (pickle.dumps(page, protocol=5),))
+                self._connection.commit()
+            self.page_lengths.append(len(page))
+            self.spilled_rows += len(page)
+        return []
+
+    def _open(self) -> None:
+        handle, self._path = tempfile.mkstemp(prefix="homeharvest-", suffix=".sqlite", dir=self.directory)
+        os.close(handle)
+        #: read back from whichever thread consumes the results
+        self._connection = sqlite3.connect(self._path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode = OFF")
+        self._connection.execute("PRAGMA synchronous = OFF")
+        self._connection.execute("CREATE TABLE pages (id INTEGER PRIMARY KEY, rows BLOB NOT NULL)")
+        #: the file goes with the buffer, which the SpilledResults keeps alive (or the failed scrape drops)
+        self._finalizer = weakref.finalize(self, _close, self._connection, self._path)
+
+    def read_page(self, number: int) -> list:
+        with self._lock:
+            (data,) = self._connection.execute("SELECT rows FROM pages WHERE id = ?", (number + 1,)).fetchone()
+        return pickle.loads(data)
+
+    def close(self) -> None:
+        """Remove the spill file."""
+        if self._finalizer:
+            self._finalizer()
+
+    def results(self, in_memory: list) -> list | SpilledResults:
+        """The scrape's results: in_memory as is if nothing spilled, else a SpilledResults over both."""
+        if not self.spilling:
+            return in_memory
+        return SpilledResults(self, in_memory)
+
+
+class SpilledResults(Sequence):
+    """Results of a scrape that exceeded its memory budget: the pages kept in memory, then the spilled pages, read from disk on access."""
+
+    def __init__(self, buffer: SpillBuffer, in_memory: list):
+        self._buffer = buffer
+        self._in_memory = in_memory
+        self.path = buffer._path
+        self._page_starts = []
+        start = len(in_memory)
+        for length in buffer.page_lengths:
+            self._page_starts.append(start)
+            start += length
+        self._length = start
+        #: last page read, so sequential indexing doesn't unpickle a page per row
+        self._cached_page: tuple[int, list] | None = None
+
+    def _page(self, number: int) -> list:
+        cached = self._cached_page
+        if cached and cached[0] == number:
+            return cached[1]
+        page = self._buffer.read_page(number)
+        self._cached_page = (number, page)
+        return page
+
+    def pages(self) -> Iterator[list]:
+        """The results page by page, with one spilled page in memory at a time."""
+        if self._in_memory:
+            yield self._in_memory
+        for number in range(len(self._page_starts)):
+            yield self._page(number)
+
+    def __iter__(self) -> Iterator:
+        for page in self.pages():
+            yield from page
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("SpilledResults index out of range")
+        if index < len(self._in_memory):
+            return self._in_memory[index]
+
+        number = bisect.bisect_right(self._page_starts, index) - 1
+        return self._page(number)[index - self._page_starts[number]]
+
+    def close(self) -> None:
+        """Remove the spill file now instead of when garbage collected."""
+        self._buffer.close()
+
+    def __repr__(self) -> str:
+        return f"SpilledResults({self._length} rows, {len(self._in_memory)} in memory, spilled to {self.path})"
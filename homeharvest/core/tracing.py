@@ -0,0 +1,86 @@
+"""
+homeharvest.core.tracing
+~~~~~~~~~~~~
+
+Optional OpenTelemetry tracing of scrapes.
+
+When opentelemetry-api is installed (pip install "homeharvest[tracing]"), scrapes emit spans
+through the globally configured tracer provider; without it every helper here is a no-op.
+
+    homeharvest.scrape                  scrape_property call
+    ├── homeharvest.location            location lookup
+    │   └── homeharvest.http            each request (method, url, status code, bytes)
+    ├── homeharvest.search_page         each page, on its worker thread (offset, queue delay)
+    │   ├── homeharvest.http
+    │   ├── homeharvest.details         bulk extra property details of the page
+    │   └── homeharvest.process         parsing of the page
+    └── homeharvest.result              DataFrame building
+
+    homeharvest.store                   scrape_property call answered from a PropertyStore (max_age)
+    homeharvest.watch                   watcher poll of a market (new listings found)
+
+Work handed to thread pools is submitted with submit(), which runs it in the submitter's context,
+so its spans are children of the submitting span, and records how long it waited in the queue
+(homeharvest.queue_seconds on its first span).
+"""
+
+from __future__ import annotations
+
+import contextvars
+import time
+from concurrent.futures import Executor, Future
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager
+
+#: opentelemetry Tracer, False once known to be unavailable
+_tracer = None
+
+#: seconds the current pool task waited before starting, reported by its first span
+_queue_delay: contextvars.ContextVar[float | None] = contextvars.ContextVar("homeharvest_queue_delay", default=None)
+
+
+def get_tracer():
+    """The homeharvest tracer, or None without opentelemetry (imported on first use, not on import of homeharvest)."""
+    global _tracer
+    if _tracer is None:
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            _tracer = False
+        else:
+            _tracer = trace.get_tracer("homeharvest")
+    return _tracer or None
+
+
+def span(name: str, **attributes: Any) -> ContextManager:
+    """Start a span as the current span (a no-op context manager without opentelemetry). None attributes are left out."""
+    tracer = get_tracer()
+    if tracer is None:
+        return nullcontext()
+
+    attributes = {f"homeharvest.{key}": value for key, value in attributes.items() if value is not None}
+    queue_delay = _queue_delay.get()
+    if queue_delay is not None:
+        attributes["homeharvest.queue_seconds"] = queue_delay
+        _queue_delay.set(None)
+    return tracer.start_as_current_span(name, attributes=attributes)
+
+
+def set_attributes(current_span, **attributes: Any) -> None:
+    """Set attributes on the span yielded by span() (ignored for the no-op span)."""
+    if current_span is not None:
+        for key, value in attributes.items():
+            if value is not None:
+                current_span.set_attribute(f"homeharvest.{key}", value)
+
+
+def submit(executor: Executor, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+    """executor.submit, running fn in a copy of the caller's context (current span included) and timing its queue wait."""
+    context = contextvars.copy_context()
+    submitted = time.perf_counter()
+
+    def run():
+        _queue_delay.set(time.perf_counter() - submitted)
+        return fn(*args, **kwargs)
+
+    return executor.submit(context.run, run)
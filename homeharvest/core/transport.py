@@ -0,0 +1,181 @@
+"""
+homeharvest.core.transport
+~~~~~~~~~~~~
+
+Record/replay transports for the shared scraper session (Scraper.session).
+
+record() captures every response (location autocomplete, search pages, bulk property details) into a
+directory of JSON files, one per request. replay() serves them back without touching the network,
+optionally with a simulated latency, so scrapes can be tested and benchmarked offline. Requests are
+matched on method, URL and body.
+
+    from homeharvest.core import transport
+
+    transport.record("fixtures/san_diego")
+    scrape_property("San Diego, CA")          #: live, responses saved
+
+    transport.replay("fixtures/san_diego", latency=0.05)
+    scrape_property("San Diego, CA")          #: offline
+
+The HOMEHARVEST_TRANSPORT environment variable ("record:<dir>" or "replay:<dir>") applies the same
+when the session is created, e.g. to run the CLI against fixtures.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import random
+import threading
+import time
+from typing import Callable
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.models import PreparedRequest, Response
+from requests.structures import CaseInsensitiveDict
+
+from . import jsonlib
+
+
+class NoRecordedResponse(requests.ConnectionError):
+    """Raised by ReplayAdapter for a request that was not recorded."""
+
+
+def request_key(request: PreparedRequest) -> str:
+    """Stable identifier of a request: hash of its method, URL and body."""
+    body = request.body or b""
+    if isinstance(body, str):
+        body = body.encode()
+    return hashlib.sha1(b"\n".join([request.method.encode(), request.url.encode(), body])).hexdigest()
+
+
+def _body_text(request: PreparedRequest) -> str | None:
+    body = request.body
+    return body.decode(errors="replace") if isinstance(body, bytes) else body
+
+
+class RecordingAdapter(BaseAdapter):
+    """Sends requests through inner (a regular HTTPAdapter by default) and saves each response to directory."""
+
+    def __init__(self, directory: str, inner: BaseAdapter | None = None):
+        super().__init__()
+        self.directory = directory
+        self.inner = inner or HTTPAdapter()
+        os.makedirs(directory, exist_ok=True)
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        response = self.inner.send(request, **kwargs)
+        entry = {
+            "method": request.method,
+            "url": request.url,
+            "request_body": _body_text(request),
+            "status_code": response.status_code,
+            "headers": {"Content-Type": response.headers.get("Content-Type", "application/json")},
+            "body": response.content.decode(response.encoding or "utf-8", errors="replace"),
+        }
+
+        path = os.path.join(self.directory, f"{request_key(request)}.json")
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(jsonlib.dumpb(entry))
+        os.replace(tmp_path, path)
+        return response
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Serves the responses saved by RecordingAdapter.
+
+    :param latency: Seconds to wait before each response (simulated network time)
+    :param jitter: Extra random wait of up to this many seconds
+    """
+
+    def __init__(self, directory: str, latency: float = 0.0, jitter: float = 0.0):
+        super().__init__()
+        self.directory = directory
+        self.latency = latency
+        self.jitter = jitter
+        self._cache: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, key: str) -> dict | None:
+        with self._lock:
+            if key not in self._cache:
+                path = os.path.join(self.directory, f"{key}.json")
+                if not os.path.exists(path):
+                    return None
+                with open(path, "rb") as f:
+                    self._cache[key] = jsonlib.loads(f.read())
+            return self._cache[key]
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        entry = self._entry(request_key(request))
+        if entry is None:
+            raise NoRecordedResponse(f"No recorded response for {request.method} {request.url}", request=request)
+
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        response = Response()
+        response.status_code = entry["status_code"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = entry["body"].encode()
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.reason = "Replayed"
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+def mount(adapter: BaseAdapter) -> BaseAdapter:
+    """Route every request of the scraper session through adapter (creating the session if needed)."""
+    from .scrapers import Scraper
+
+    session = Scraper.session or Scraper.create_session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return adapter
+
+
+def record(directory: str, inner: BaseAdapter | None = None) -> RecordingAdapter:
+    """Save every response of the following scrapes to directory."""
+    return mount(RecordingAdapter(directory, inner))
+
+
+def replay(directory: str, latency: float = 0.0, jitter: float = 0.0) -> ReplayAdapter:
+    """Serve the following scrapes from the responses recorded in directory, without network access."""
+    return mount(ReplayAdapter(directory, latency, jitter))
+
+
+def reset() -> None:
+    """Go back to live requests (a fresh default session)."""
+    from .scrapers import Scraper
+
+    Scraper.create_session()
+
+
+#: HOMEHARVEST_TRANSPORT modes, called with the directory and the session's live adapter
+TRANSPORT_MODES: dict[str, Callable[[str, BaseAdapter], BaseAdapter]] = {
+    "record": lambda directory, inner: RecordingAdapter(directory, inner),
+    "replay": lambda directory, inner: ReplayAdapter(directory),
+}
+
+
+def adapter_from_env(inner: BaseAdapter | None = None) -> BaseAdapter | None:
+    """The adapter configured by HOMEHARVEST_TRANSPORT ("record:<dir>" or "replay:<dir>"), if any."""
+    setting = os.environ.get("HOMEHARVEST_TRANSPORT")
+    if not setting:
+        return None
+
+    mode, _, directory = setting.partition(":")
+    if mode not in TRANSPORT_MODES or not directory:
+        raise ValueError(f"Invalid HOMEHARVEST_TRANSPORT {setting!r}, expected record:<dir> or replay:<dir>.")
+    return TRANSPORT_MODES[mode](directory, inner or HTTPAdapter())
@@ -6,6 +6,10 @@ class InvalidDate(Exception):
     """Raised when only one of date_from or date_to is provided or not in the correct format. ex: 2023-10-23"""
 
 
+class ScrapeCancelled(Exception):
+    """Raised from a progress callback to stop a running scrape."""
+
+
 class AuthenticationError(Exception):
     """Raised when there is an issue with the authentication process."""
     def __init__(self, *args, response):
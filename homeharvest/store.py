@@ -0,0 +1,500 @@
+"""
+homeharvest.store
+~~~~~~~~~~~~
+
+Local property store: a SQLite file that scrapes write into (scrape_property(store=...)) and that
+answers repeated questions at local-disk speed.
+
+The store is normalized into properties (address, geography, building), listings (one row per
+property and listing type, with the full Property as JSON), tax_history, schools and
+advertisers, indexed by property_id, zip code, status, list date and list price. Every scrape
+is recorded with its parameters and the properties it returned, so a scrape_property call
+given max_age= is answered from the store while an identical scrape is younger than that, and
+only goes to the network once it is stale.
+
+    store = PropertyStore("homes.sqlite")
+    scrape_property("San Diego, CA", store=store, max_age=3600)
+    store.query(zip_code="92104", status="for_sale", max_price=900_000, min_beds=3)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Iterable, TYPE_CHECKING
+
+from .core import jsonlib
+from .core.delta import DeltaSource
+from .core.scrapers.models import Property
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from .core.scrapers import ScraperInput
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS properties (
+    property_id TEXT PRIMARY KEY,
+    formatted_address TEXT,
+    street TEXT,
+    unit TEXT,
+    city TEXT,
+    state TEXT,
+    zip_code TEXT,
+    county TEXT,
+    fips_code TEXT,
+    neighborhoods TEXT,
+    latitude REAL,
+    longitude REAL,
+    style TEXT,
+    beds INTEGER,
+    full_baths INTEGER,
+    half_baths INTEGER,
+    sqft INTEGER,
+    lot_sqft INTEGER,
+    year_built INTEGER,
+    stories INTEGER,
+    parking_garage REAL,
+    assessed_value INTEGER,
+    estimated_value INTEGER,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS properties_zip_code ON properties (zip_code);
+CREATE INDEX IF NOT EXISTS properties_city_state ON properties (city, state);
+
+CREATE TABLE IF NOT EXISTS listings (
+    property_id TEXT NOT NULL REFERENCES properties (property_id),
+    listing_type TEXT NOT NULL,
+    listing_id TEXT,
+    property_url TEXT,
+    status TEXT,
+    mls_status TEXT,
+    mls TEXT,
+    mls_id TEXT,
+    list_price INTEGER,
+    list_price_min INTEGER,
+    list_price_max INTEGER,
+    sold_price INTEGER,
+    last_sold_price INTEGER,
+    price_per_sqft INTEGER,
+    hoa_fee INTEGER,
+    list_date TEXT,
+    pending_date TEXT,
+    last_sold_date TEXT,
+    days_on_mls INTEGER,
+    new_construction INTEGER,
+    data TEXT NOT NULL,
+    scraped_at REAL NOT NULL,
+    fingerprint TEXT,
+    PRIMARY KEY (property_id, listing_type)
+);
+CREATE INDEX IF NOT EXISTS listings_status ON listings (status);
+CREATE INDEX IF NOT EXISTS listings_list_date ON listings (list_date);
+CREATE INDEX IF NOT EXISTS listings_list_price ON listings (list_price);
+
+CREATE TABLE IF NOT EXISTS tax_history (
+    property_id TEXT NOT NULL REFERENCES properties (property_id),
+    year INTEGER,
+    tax INTEGER,
+    assessed_year INTEGER,
+    assessment_building INTEGER,
+    assessment_land INTEGER,
+    assessment_total INTEGER,
+    market_total INTEGER,
+    appraisal_total INTEGER,
+    value_total INTEGER
+);
+CREATE INDEX IF NOT EXISTS tax_history_property_id ON tax_history (property_id, year);
+
+CREATE TABLE IF NOT EXISTS schools (
+    property_id TEXT NOT NULL REFERENCES properties (property_id),
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS schools_property_id ON schools (property_id);
+CREATE INDEX IF NOT EXISTS schools_name ON schools (name);
+
+CREATE TABLE IF NOT EXISTS advertisers (
+    property_id TEXT NOT NULL REFERENCES properties (property_id),
+    role TEXT NOT NULL,
+    name TEXT,
+    uuid TEXT,
+    email TEXT,
+    phones TEXT,
+    PRIMARY KEY (property_id, role)
+);
+CREATE INDEX IF NOT EXISTS advertisers_name ON advertisers (name);
+
+CREATE TABLE IF NOT EXISTS scrapes (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL,
+    params TEXT NOT NULL,
+    scraped_at REAL NOT NULL,
+    rows INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scrapes_key ON scrapes (key, scraped_at);
+
+CREATE TABLE IF NOT EXISTS scrape_members (
+    scrape_id INTEGER NOT NULL REFERENCES scrapes (id),
+    position INTEGER NOT NULL,
+    property_id TEXT NOT NULL,
+    PRIMARY KEY (scrape_id, position)
+);
+"""
+
+#: ScraperInput fields that don't change which properties a scrape returns
+_UNKEYED_FIELDS = {
+    "progress_callback",
+    "parse_processes",
+    "proxy",
+    "return_type",
+    "retain_results",
+    "memory_budget",
+    "delta_source",
+    "incremental",
+    "newest_first",
+    "row_filter",
+}
+
+#: columns added to the tables of older store files
+_MIGRATIONS = {("listings", "fingerprint"): "ALTER TABLE listings ADD COLUMN fingerprint TEXT"}
+
+ADVERTISER_ROLES = ("agent", "broker", "builder", "office")
+
+#: return types the store can save and serve (raw results are unparsed API payloads)
+STORE_RETURN_TYPES = ("pandas", "pydantic", "compact", "lazy")
+
+
+def scrape_params(scraper_input: ScraperInput) -> dict:
+    """Normalized parameters of a scrape: equal for inputs that return the same properties."""
+    params = scraper_input.model_dump(mode="json", exclude=_UNKEYED_FIELDS)
+    params["location"] = " ".join(params["location"].split()).casefold()
+    if params.get("property_type"):
+        params["property_type"] = sorted(params["property_type"])
+    return params
+
+
+def to_property(item: Any) -> Property:
+    """The Property of a pydantic, compact or lazy result."""
+    if isinstance(item, Property):
+        return item
+    if hasattr(item, "to_property"):  #: LazyProperty
+        return item.to_property()
+    if hasattr(item, "__dataclass_fields__"):  #: compact record
+        from .core.scrapers.compact import compact_to_dict
+
+        return Property.model_validate(compact_to_dict(item))
+    raise TypeError(
+        f"Can't store {type(item).__name__} results, use one of the {', '.join(STORE_RETURN_TYPES)} return types"
+    )
+
+
+def _iso(value: datetime | date | str | None) -> str | None:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _phones(phones: Any) -> str | None:
+    if phones is None:
+        return None
+    if hasattr(phones, "model_dump"):
+        phones = phones.model_dump()
+    return jsonlib.dumps(phones)
+
+
+def _total(assessment) -> int | None:
+    return assessment.total if assessment else None
+
+
+class PropertyStore(DeltaSource):
+    """
+    SQLite store of scraped properties, shared by the threads of a scrape.
+
+    :param path: Database file (created if missing), or ":memory:"
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        #: pages are saved from the scrape's worker threads, serialized by the lock
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        with self._lock, self._connection:
+            if path != ":memory:":
+                self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.executescript(SCHEMA)
+            for (table, column), statement in _MIGRATIONS.items():
+                columns = [row["name"] for row in self._connection.execute(f"PRAGMA table_info({table})")]
+                if column not in columns:
+                    self._connection.execute(statement)
+
+    def save(
+        self, properties: Iterable[Any], listing_type: str, fingerprints: dict[str, str] | None = None
+    ) -> list[str]:
+        """
+        Insert or update a page of results (pydantic, compact or lazy) of listing_type. Returns their property ids.
+
+        :param fingerprints: Fingerprints of the properties' search results, by property id (see homeharvest.core.delta)
+        """
+        properties = [to_property(item) for item in properties]
+        fingerprints = fingerprints or {}
+        now = time.time()
+
+        property_rows, listing_rows, tax_rows, school_rows, advertiser_rows = [], [], [], [], []
+        for prop in properties:
+            address = prop.address
+            description = prop.description
+            property_rows.append(
+                (
+                    prop.property_id,
+                    address.formatted_address if address else None,
+                    address.street if address else None,
+                    address.unit if address else None,
+                    address.city if address else None,
+                    address.state if address else None,
+                    address.zip if address else None,
+                    prop.county,
+                    prop.fips_code,
+                    prop.neighborhoods,
+                    prop.latitude,
+                    prop.longitude,
+                    description.style.value if description and description.style else None,
+                    description.beds if description else None,
+                    description.baths_full if description else None,
+                    description.baths_half if description else None,
+                    description.sqft if description else None,
+                    description.lot_sqft if description else None,
+                    description.year_built if description else None,
+                    description.stories if description else None,
+                    description.garage if description else None,
+                    prop.assessed_value,
+                    prop.estimated_value,
+                    now,
+                )
+            )
+            listing_rows.append(
+                (
+                    prop.property_id,
+                    listing_type,
+                    prop.listing_id,
+                    str(prop.property_url),
+                    prop.status,
+                    prop.mls_status,
+                    prop.mls,
+                    prop.mls_id,
+                    prop.list_price,
+                    prop.list_price_min,
+                    prop.list_price_max,
+                    description.sold_price if description else None,
+                    prop.last_sold_price,
+                    prop.prc_sqft,
+                    prop.hoa_fee,
+                    _iso(prop.list_date),
+                    _iso(prop.pending_date),
+                    _iso(prop.last_sold_date),
+                    prop.days_on_mls,
+                    prop.new_construction,
+                    prop.model_dump_json(),
+                    now,
+                    fingerprints.get(prop.property_id),
+                )
+            )
+            for entry in prop.tax_history or []:
+                tax_rows.append(
+                    (
+                        prop.property_id,
+                        entry.year,
+                        entry.tax,
+                        entry.assessed_year,
+                        entry.assessment.building if entry.assessment else None,
+                        entry.assessment.land if entry.assessment else None,
+                        _total(entry.assessment),
+                        _total(entry.market),
+                        _total(entry.appraisal),
+                        _total(entry.value),
+                    )
+                )
+            school_rows.extend((prop.property_id, name) for name in prop.nearby_schools or [])
+            for role in ADVERTISER_ROLES:
+                advertiser = getattr(prop.advertisers, role, None) if prop.advertisers else None
+                if advertiser:
+                    advertiser_rows.append(
+                        (
+                            prop.property_id,
+                            role,
+                            advertiser.name,
+                            advertiser.uuid,
+                            getattr(advertiser, "email", None),
+                            _phones(getattr(advertiser, "phones", None)),
+                        )
+                    )
+
+        property_ids = [row[0] for row in property_rows]
+        #: the child tables of a property are replaced as a whole by its latest scrape
+        replaced = [(property_id,) for property_id in property_ids]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                f"INSERT OR REPLACE INTO properties VALUES ({', '.join('?' * 24)})", property_rows
+            )
+            self._connection.executemany(
+                f"INSERT OR REPLACE INTO listings VALUES ({', '.join('?' * 23)})", listing_rows
+            )
+            for table in ("tax_history", "schools", "advertisers"):
+                self._connection.executemany(f"DELETE FROM {table} WHERE property_id = ?", replaced)
+            self._connection.executemany(f"INSERT INTO tax_history VALUES ({', '.join('?' * 10)})", tax_rows)
+            self._connection.executemany("INSERT INTO schools VALUES (?, ?)", school_rows)
+            self._connection.executemany("INSERT INTO advertisers VALUES (?, ?, ?, ?, ?, ?)", advertiser_rows)
+        return property_ids
+
+    def record_scrape(self, scraper_input: ScraperInput, property_ids: list[str]) -> int:
+        """Record a completed scrape and the properties it returned. Returns the scrape id."""
+        params = jsonlib.dumps(scrape_params(scraper_input))
+        key = hashlib.sha1(params.encode()).hexdigest()
+        #: a property on two pages (listings moving between pages mid-scrape) is a member once
+        property_ids = list(dict.fromkeys(property_ids))
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "INSERT INTO scrapes (key, params, scraped_at, rows) VALUES (?, ?, ?, ?)",
+                (key, params, time.time(), len(property_ids)),
+            )
+            scrape_id = cursor.lastrowid
+            self._connection.executemany(
+                "INSERT INTO scrape_members VALUES (?, ?, ?)",
+                [(scrape_id, position, property_id) for position, property_id in enumerate(property_ids)],
+            )
+        return scrape_id
+
+    def fresh_scrape(self, scraper_input: ScraperInput, max_age: float) -> int | None:
+        """Id of the latest scrape with the same parameters as scraper_input done less than max_age seconds ago, if any."""
+        key = hashlib.sha1(jsonlib.dumps(scrape_params(scraper_input)).encode()).hexdigest()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT id FROM scrapes WHERE key = ? AND scraped_at >= ? ORDER BY scraped_at DESC LIMIT 1",
+                (key, time.time() - max_age),
+            ).fetchone()
+        return row["id"] if row else None
+
+    def scrape_properties(self, scrape_id: int, listing_type: str) -> list[Property]:
+        """The properties of a recorded scrape, in the order it returned them, as they are stored now."""
+        return self._properties(
+            "SELECT l.data FROM scrape_members m JOIN listings l ON l.property_id = m.property_id AND l.listing_type = ? "
+            "WHERE m.scrape_id = ? ORDER BY m.position",
+            (listing_type, scrape_id),
+        )
+
+    def fingerprints(self, property_ids: list[str], listing_type: str) -> dict[str, str]:
+        if not property_ids:
+            return {}
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT property_id, fingerprint FROM listings WHERE listing_type = ? AND fingerprint IS NOT NULL "
+                f"AND property_id IN ({', '.join('?' * len(property_ids))})",
+                (listing_type, *property_ids),
+            ).fetchall()
+        return {row["property_id"]: row["fingerprint"] for row in rows}
+
+    def load(self, property_ids: list[str], listing_type: str) -> list[Property]:
+        if not property_ids:
+            return []
+        return self._properties(
+            f"SELECT data FROM listings WHERE listing_type = ? AND property_id IN ({', '.join('?' * len(property_ids))})",
+            (listing_type, *property_ids),
+        )
+
+    def query(
+        self,
+        zip_code: str | list[str] | None = None,
+        city: str | None = None,
+        state: str | None = None,
+        status: str | list[str] | None = None,
+        listing_type: str | None = None,
+        min_price: int | None = None,
+        max_price: int | None = None,
+        listed_after: str | date | None = None,
+        listed_before: str | date | None = None,
+        min_beds: int | None = None,
+        limit: int | None = None,
+        return_type: str = "pandas",
+    ) -> pd.DataFrame | list[Property]:
+        """
+        Query the stored listings, newest list date first.
+
+        :param zip_code: Zip code, or list of zip codes
+        :param city, state: City name and state code (case insensitive)
+        :param status: Listing status (for_sale, sold, pending, ...), or list of statuses
+        :param listing_type: Listing type the listing was scraped as
+        :param min_price, max_price: List price range
+        :param listed_after, listed_before: List date range (e.g. 2025-01-28)
+        :param min_beds: Minimum bedrooms
+        :param limit: Maximum number of listings returned
+        :param return_type: pandas or pydantic
+        """
+        conditions, params = [], []
+        #: statuses are stored as the API spells them, FOR_SALE, SOLD, PENDING, ...
+        if isinstance(status, (list, tuple)):
+            status = [value.upper() for value in status]
+        elif status is not None:
+            status = status.upper()
+        for column, value in (("p.zip_code", zip_code), ("l.status", status)):
+            if isinstance(value, (list, tuple)):
+                conditions.append(f"{column} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            elif value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        for condition, value in (
+            ("p.city = ? COLLATE NOCASE", city),
+            ("p.state = ? COLLATE NOCASE", state),
+            ("l.listing_type = ?", listing_type),
+            ("l.list_price >= ?", min_price),
+            ("l.list_price <= ?", max_price),
+            ("l.list_date >= ?", _iso(listed_after)),
+            ("l.list_date < ?", _iso(listed_before)),
+            ("p.beds >= ?", min_beds),
+        ):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+
+        sql = "SELECT l.data FROM listings l JOIN properties p ON p.property_id = l.property_id"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY l.list_date DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        properties = self._properties(sql, params)
+        if return_type == "pydantic":
+            return properties
+        if return_type != "pandas":
+            raise ValueError(f"Invalid return_type: {return_type}, the store returns pandas or pydantic results")
+
+        from . import _to_dataframe
+
+        return _to_dataframe(properties)
+
+    def execute(self, sql: str, params: Iterable[Any] = ()) -> list[dict]:
+        """Run a SQL query on the store's tables and return its rows as dicts."""
+        with self._lock:
+            return [dict(row) for row in self._connection.execute(sql, tuple(params)).fetchall()]
+
+    def _properties(self, sql: str, params: Iterable[Any]) -> list[Property]:
+        with self._lock:
+            rows = self._connection.execute(sql, tuple(params)).fetchall()
+        return [Property.model_validate_json(row["data"]) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self) -> PropertyStore:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"PropertyStore({self.path!r})"
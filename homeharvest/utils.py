@@ -1,9 +1,12 @@
 from __future__ import annotations
-import pandas as pd
 from datetime import datetime
+from typing import TYPE_CHECKING
 from .core.scrapers.models import Property, ListingType, Advertisers
 from .exceptions import InvalidListingType, InvalidDate
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 ordered_properties = [
     "property_url",
     "property_id",
@@ -72,7 +75,16 @@ ordered_properties = [
 ]
 
 
-def process_result(result: Property) -> pd.DataFrame:
+#: datetime columns, written as YYYY-MM-DD strings
+date_properties = ["list_date", "pending_date", "last_sold_date"]
+
+
+def flatten_property(result: Property, format_dates: bool = True) -> dict:
+    """Flatten a Property into a dict holding (at least) the ordered_properties columns.
+
+    With format_dates=False, datetime columns are left as datetimes so a batch of rows can be
+    formatted at once with format_date_columns.
+    """
     prop_data = {prop: None for prop in ordered_properties}
     prop_data.update(result.model_dump())
 
@@ -120,9 +132,9 @@ def process_result(result: Property) -> pd.DataFrame:
     prop_data["nearby_schools"] = ", ".join(set(prop_data["nearby_schools"])) if prop_data["nearby_schools"] else None
     
     # Convert datetime objects to strings for CSV
-    for date_field in ["list_date", "pending_date", "last_sold_date"]:
+    for date_field in date_properties if format_dates else []:
         if prop_data.get(date_field):
-            prop_data[date_field] = prop_data[date_field].strftime("%Y-%m-%d") if hasattr(prop_data[date_field], 'strftime') else prop_data[date_field]
+            prop_data[date_field] = _format_date(prop_data[date_field])
     
     # Convert HttpUrl objects to strings for CSV
     if prop_data.get("property_url"):
@@ -148,12 +160,44 @@ def process_result(result: Property) -> pd.DataFrame:
         prop_data["stories"] = description.stories
         prop_data["text"] = description.text
 
-    properties_df = pd.DataFrame([prop_data])
+    return prop_data
+
+
+def process_result(result: Property, format_dates: bool = True) -> pd.DataFrame:
+    """Flatten a Property into a single row DataFrame with the ordered_properties columns."""
+    import pandas as pd
+
+    properties_df = pd.DataFrame([flatten_property(result, format_dates=format_dates)])
     properties_df = properties_df.reindex(columns=ordered_properties)
 
     return properties_df[ordered_properties]
 
 
+def _format_date(value):
+    return value.strftime("%Y-%m-%d") if hasattr(value, "strftime") else value
+
+
+def format_date_columns(properties_df: pd.DataFrame) -> pd.DataFrame:
+    """Vectorized equivalent of the per-row date formatting done by process_result."""
+    import pandas as pd
+
+    for date_field in date_properties:
+        values = properties_df[date_field]
+        dates = pd.to_datetime(values, errors="coerce")
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+        formatted = dates.dt.strftime("%Y-%m-%d").astype(object).where(dates.notna(), None)
+
+        #: a column mixing time zones (or naive and aware dates) is coerced to the first one's, the others
+        #: become NaT: those are formatted one by one, in their own time zone like process_result does
+        missed = dates.isna() & values.notna()
+        if missed.any():
+            formatted[missed] = values[missed].map(_format_date)
+        properties_df[date_field] = formatted
+
+    return properties_df
+
+
 def validate_input(listing_type: str) -> None:
     if listing_type.upper() not in ListingType.__members__:
         raise InvalidListingType(f"Provided listing type, '{listing_type}', does not exist.")
@@ -0,0 +1,211 @@
+"""
+homeharvest.watch
+~~~~~~~~~~~~
+
+Low-latency watch of new listings over many markets.
+
+A poll of a market asks for its listings sorted by list date, newest first, and pages only until
+it reaches listings it has already seen: rows of seen property ids are dropped before their
+extra details are fetched, so a quiet market costs a single search request per poll. The seen
+ids of each market are kept in a bounded set that forgets the least recently seen first.
+
+Markets are polled on an adaptive schedule. Each market's rate of new listings is tracked as an
+exponential moving average, and the market is polled again when about listings_per_poll new
+listings are expected (between min_interval and max_interval; markets without new listings back
+off by doubling their interval). Busy markets are polled often and quiet ones rarely, keeping
+detection latency low for the requests spent.
+
+The first poll of a market only records its newest page of listings, in a single search request.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+from .core.scrapers import ScraperInput
+from .core.scrapers.models import ListingType, Property, ReturnType
+from .core.scrapers.realtor import RealtorScraper
+from .core.tracing import set_attributes, span
+
+logger = logging.getLogger(__name__)
+
+
+class SeenSet:
+    """Bounded set of property ids, forgetting the least recently seen first."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._ids: OrderedDict[str, None] = OrderedDict()
+
+    def __contains__(self, property_id: str) -> bool:
+        return property_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, property_id: str) -> None:
+        self._ids[property_id] = None
+        self._ids.move_to_end(property_id)
+        if len(self._ids) > self.size:
+            self._ids.popitem(last=False)
+
+
+@dataclass(eq=False)
+class MarketWatch:
+    """Watch state of a market."""
+
+    location: str
+    listing_type: str
+    seen: SeenSet
+    interval: float
+    #: new listings per second, averaged over polls (None until two polls were made)
+    rate: float | None = None
+    next_poll: float = 0.0
+    last_poll: float | None = None
+    polls: int = 0
+    new_listings: int = 0
+    errors: int = 0
+
+
+class Watcher:
+    """
+    Watches markets for new listings, calling on_listing(market, property) for each one found.
+
+    :param markets: (location, listing_type) markets to watch (more can be added with add_market)
+    :param on_listing: Called with the MarketWatch and the Property of every new listing
+    :param min_interval, max_interval: Bounds of the seconds between two polls of a market
+    :param listings_per_poll: New listings a poll should find on average, sets the interval from the listing rate
+    :param smoothing: Weight of the latest poll in the average listing rate of a market
+    :param seen_size: Property ids remembered per market
+    :param max_pages: Pages a poll reads at most before giving up on reaching seen listings
+    :param concurrency: Markets polled at once
+    :param scrape_kwargs: Search options (property_type, mls_only, exclude_pending, extra_property_data, proxy, ...)
+    """
+
+    def __init__(
+        self,
+        markets: Iterable[tuple[str, str]],
+        on_listing: Callable[[MarketWatch, Property], Any],
+        min_interval: float = 60,
+        max_interval: float = 1800,
+        listings_per_poll: float = 1.0,
+        smoothing: float = 0.3,
+        seen_size: int = 5000,
+        max_pages: int = 5,
+        concurrency: int = 4,
+        **scrape_kwargs,
+    ):
+        self.on_listing = on_listing
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.listings_per_poll = listings_per_poll
+        self.smoothing = smoothing
+        self.seen_size = seen_size
+        self.max_pages = max_pages
+        self.concurrency = concurrency
+        self.scrape_kwargs = scrape_kwargs
+        self.markets: list[MarketWatch] = []
+        self._stop = threading.Event()
+        for location, listing_type in markets:
+            self.add_market(location, listing_type)
+
+    def add_market(self, location: str, listing_type: str = "for_sale") -> MarketWatch:
+        market = MarketWatch(location, listing_type, SeenSet(self.seen_size), self.min_interval)
+        self.markets.append(market)
+        return market
+
+    def poll(self, market: MarketWatch) -> list[Property]:
+        """Poll a market now: report and return its new listings."""
+        passed = []
+        #: the first poll records the newest page and parses nothing, there is nothing to report yet
+        baseline = market.polls == 0
+
+        def unseen(row: dict) -> bool:
+            property_id = row["property_id"]
+            if property_id in market.seen:
+                market.seen.add(property_id)  #: still listed, remembered for longer
+                return False
+            passed.append(property_id)
+            return not baseline
+
+        scraper = RealtorScraper(
+            ScraperInput(
+                location=market.location,
+                listing_type=ListingType(market.listing_type.upper()),
+                return_type=ReturnType.pydantic,
+                newest_first=True,
+                row_filter=unseen,
+                **self.scrape_kwargs,
+            )
+        )
+        polled_at = time.time()
+        with span("homeharvest.watch", location=market.location, listing_type=market.listing_type) as current_span:
+            homes = [home for home in scraper.search_newest(self.max_pages) if home]
+            set_attributes(current_span, new_listings=len(homes), polls=market.polls)
+
+        for home in homes:
+            self.on_listing(market, home)
+
+        #: only once they were reported; the oldest first, so the newest are remembered the longest
+        for property_id in reversed(passed):
+            market.seen.add(property_id)
+        market.polls += 1
+        market.new_listings += len(homes)
+        self._schedule(market, None if baseline else len(homes), polled_at)
+        return homes
+
+    def _schedule(self, market: MarketWatch, new: int | None, polled_at: float) -> None:
+        if new is not None and market.last_poll is not None:
+            rate = new / max(polled_at - market.last_poll, 1e-3)
+            market.rate = rate if market.rate is None else self.smoothing * rate + (1 - self.smoothing) * market.rate
+        market.last_poll = polled_at
+
+        if market.rate:
+            interval = self.listings_per_poll / market.rate
+        elif market.rate == 0:
+            interval = market.interval * 2
+        else:
+            interval = self.min_interval
+        market.interval = min(max(interval, self.min_interval), self.max_interval)
+        market.next_poll = polled_at + market.interval
+
+    def run(self) -> None:
+        """Poll the markets on their schedule until stop() is called. Failed polls are logged and retried."""
+        stop = self._stop
+        running = {}
+        with ThreadPoolExecutor(max_workers=max(1, self.concurrency)) as executor:
+            while not stop.is_set():
+                now = time.time()
+                busy = set(map(id, running.values()))
+                idle = [market for market in self.markets if id(market) not in busy]
+                for market in sorted((market for market in idle if market.next_poll <= now), key=lambda m: m.next_poll):
+                    if len(running) >= self.concurrency:
+                        break
+                    running[executor.submit(self.poll, market)] = market
+
+                busy = set(map(id, running.values()))
+                next_poll = min((market.next_poll for market in idle if id(market) not in busy), default=now + 1)
+                #: woken at least every second to notice stop
+                timeout = min(max(next_poll - now, 0.0), 1.0)
+                if not running:
+                    stop.wait(timeout)
+                    continue
+
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    market = running.pop(future)
+                    try:
+                        future.result()
+                    except Exception:
+                        market.errors += 1
+                        market.next_poll = time.time() + market.interval
+                        logger.exception("Polling %s (%s) failed", market.location, market.listing_type)
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -0,0 +1,197 @@
+"""
+homeharvest.writers
+~~~~~~~~~~~~
+
+Streaming file writers for scrape results (CSV, JSONL and Parquet).
+
+Each page of results is flattened into the ordered_properties columns and written as soon as the
+scraper hands it over, so exports run in constant memory and the first rows are on disk while the
+remaining pages are still being fetched. Nested values (phones, tax history) are written as JSON.
+"""
+
+from __future__ import annotations
+
+import csv
+from abc import ABC, abstractmethod
+from typing import Any, Callable
+
+from .core import jsonlib
+from .core.scrapers.models import Property
+from .utils import flatten_property, ordered_properties
+
+#: Parquet column types, every other column is a string
+INTEGER_COLUMNS = {
+    "beds",
+    "full_baths",
+    "half_baths",
+    "sqft",
+    "year_built",
+    "days_on_mls",
+    "list_price",
+    "list_price_min",
+    "list_price_max",
+    "sold_price",
+    "last_sold_price",
+    "assessed_value",
+    "estimated_value",
+    "tax",
+    "lot_sqft",
+    "price_per_sqft",
+    "stories",
+    "hoa_fee",
+}
+FLOAT_COLUMNS = {"latitude", "longitude", "parking_garage"}
+BOOLEAN_COLUMNS = {"new_construction"}
+
+
+def _scalar(value: Any) -> Any:
+    """Encode nested values (lists, dicts) as JSON strings, keep scalars as they are."""
+    if isinstance(value, (list, tuple, dict)):
+        return jsonlib.dumps(value)
+    return value
+
+
+class PropertyWriter(ABC):
+    """Base class of the streaming writers. Use as a context manager, and call write() once per page."""
+
+    extension = ""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows_written = 0
+
+    def write(self, properties: list[Property]) -> int:
+        """Flatten and write a page of Property results. Returns the number of rows written."""
+        rows = []
+        for prop in properties:
+            flat = flatten_property(prop)
+            rows.append({column: flat[column] for column in ordered_properties})
+
+        if rows:
+            self.write_rows(rows)
+            self.rows_written += len(rows)
+        return len(rows)
+
+    @abstractmethod
+    def write_rows(self, rows: list[dict]) -> None:
+        """Write a page of flattened rows (dicts keyed by the ordered_properties columns)."""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Flush and close the file."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class CSVPropertyWriter(PropertyWriter):
+    extension = "csv"
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(ordered_properties)
+
+    def write_rows(self, rows: list[dict]) -> None:
+        self._writer.writerows([_scalar(row[column]) for column in ordered_properties] for row in rows)
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class JSONLPropertyWriter(PropertyWriter):
+    extension = "jsonl"
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._file = open(path, "wb")
+
+    def write_rows(self, rows: list[dict]) -> None:
+        self._file.write(b"".join(jsonlib.dumpb(row) + b"\n" for row in rows))
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetPropertyWriter(PropertyWriter):
+    """Writes each page as one Parquet row group. Requires pyarrow (pip install pyarrow)."""
+
+    extension = "parquet"
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet output requires pyarrow, install it with: pip install pyarrow") from e
+
+        def column_type(column: str):
+            if column in INTEGER_COLUMNS:
+                return pa.int64()
+            if column in FLOAT_COLUMNS:
+                return pa.float64()
+            if column in BOOLEAN_COLUMNS:
+                return pa.bool_()
+            return pa.string()
+
+        self._pa = pa
+        self._schema = pa.schema([(column, column_type(column)) for column in ordered_properties])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write_rows(self, rows: list[dict]) -> None:
+        columns = {}
+        for field in self._schema:
+            values = [_scalar(row[field.name]) for row in rows]
+            if field.type == self._pa.string():
+                values = [None if value is None else str(value) for value in values]
+            columns[field.name] = values
+
+        self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self._schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+WRITERS: dict[str, type[PropertyWriter]] = {
+    "csv": CSVPropertyWriter,
+    "jsonl": JSONLPropertyWriter,
+    "parquet": ParquetPropertyWriter,
+}
+
+
+def write_properties(
+    path: str, output: str = "csv", progress: Callable[[int], Any] | None = None, **scrape_kwargs
+) -> int:
+    """
+    Scrape properties straight into a file, page by page, and return the number of rows written.
+
+    :param path: Output file path
+    :param output: Output format (csv, jsonl, parquet)
+    :param progress: Called with the total number of rows written after each page
+    :param scrape_kwargs: Arguments of scrape_property (location, listing_type, past_days, ...)
+    """
+    from . import scrape_property
+
+    with WRITERS[output](path) as writer:
+
+        def write_page(event) -> None:
+            if event.stage == "page" and event.properties:
+                writer.write(event.properties)
+                if progress:
+                    progress(writer.rows_written)
+
+        scrape_property(
+            **scrape_kwargs,
+            return_type="pydantic",
+            retain_results=False,
+            progress_callback=write_page,
+        )
+
+    return writer.rows_written
@@ -1,14 +1,425 @@
 # src/homeharvest_mcp/server.py
-# An MCP server exposing a single tool `scrape_properties` that calls HomeHarvest.
+# An MCP server exposing HomeHarvest scrapes as tools (`scrape_properties`, `fetch_page`, `summarize_market`).
 # Uses FastMCP from the official MCP Python SDK.
+# Runs over stdio by default, or streamable HTTP with one or more worker processes (see main()).
 
 from __future__ import annotations
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
+import argparse
+import functools
+import hashlib
 import json
+import logging
+import os
+import re
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
 
-from mcp.server.fastmcp import FastMCP
+import anyio
+from anyio.from_thread import BlockingPortal
+from mcp.server.fastmcp import FastMCP, Context
 
 mcp = FastMCP("homeharvest-mcp")
+logger = logging.getLogger(__name__)
+
+# Concurrency limits for scrapes (each scrape blocks a worker thread for its whole duration):
+#   HOMEHARVEST_MCP_MAX_WORKERS     scrapes running at once across all clients
+#   HOMEHARVEST_MCP_MAX_PER_CLIENT  scrapes running at once for a single client session
+#   HOMEHARVEST_MCP_MAX_QUEUED      scrapes allowed to wait for a slot before new ones are rejected
+MAX_WORKERS = int(os.environ.get("HOMEHARVEST_MCP_MAX_WORKERS", "4"))
+MAX_PER_CLIENT = int(os.environ.get("HOMEHARVEST_MCP_MAX_PER_CLIENT", "2"))
+MAX_QUEUED = int(os.environ.get("HOMEHARVEST_MCP_MAX_QUEUED", "32"))
+
+# Scrape results are kept server-side and handed out page by page:
+#   HOMEHARVEST_MCP_RESULT_TTL      seconds a result handle stays readable after its last access
+#   HOMEHARVEST_MCP_MAX_RESULTS     result sets kept at once (least recently used are evicted first)
+#   HOMEHARVEST_MCP_PAGE_SIZE       default rows per page
+RESULT_TTL = float(os.environ.get("HOMEHARVEST_MCP_RESULT_TTL", "900"))
+MAX_RESULTS = int(os.environ.get("HOMEHARVEST_MCP_MAX_RESULTS", "64"))
+PAGE_SIZE = int(os.environ.get("HOMEHARVEST_MCP_PAGE_SIZE", "50"))
+MAX_SCRAPE_LIMIT = 10000
+
+# Directory shared by the worker processes of an HTTP deployment (result handles and prefetched markets),
+# so any worker can serve any request. Unset: everything stays in process memory.
+CACHE_DIR = os.environ.get("HOMEHARVEST_MCP_CACHE_DIR") or None
+
+# Warm start (see warm_up): hot markets scraped in the background and served from memory
+#   HOMEHARVEST_MCP_PREFETCH           semicolon-separated locations, e.g. "San Diego, CA;Austin, TX"
+#   HOMEHARVEST_MCP_PREFETCH_TYPES     comma-separated listing types to prefetch for each location
+#   HOMEHARVEST_MCP_PREFETCH_INTERVAL  seconds between refreshes (results older than two intervals are not served)
+PREFETCH_LOCATIONS = [loc.strip() for loc in os.environ.get("HOMEHARVEST_MCP_PREFETCH", "").split(";") if loc.strip()]
+PREFETCH_TYPES = [
+    t.strip() for t in os.environ.get("HOMEHARVEST_MCP_PREFETCH_TYPES", "for_sale").split(",") if t.strip()
+]
+PREFETCH_INTERVAL = float(os.environ.get("HOMEHARVEST_MCP_PREFETCH_INTERVAL", "900"))
+
+# Columns returned by format="table" when no fields are given (any flattened MLS-like column can be requested)
+DEFAULT_TABLE_FIELDS = [
+    "property_url",
+    "property_id",
+    "status",
+    "style",
+    "formatted_address",
+    "zip_code",
+    "beds",
+    "full_baths",
+    "sqft",
+    "list_price",
+    "list_date",
+    "sold_price",
+    "last_sold_date",
+    "price_per_sqft",
+    "days_on_mls",
+    "latitude",
+    "longitude",
+]
+
+
+class ServerBusy(Exception):
+    """Raised when the scrape queue is full."""
+
+
+class ScrapeScheduler:
+    """
+    Runs blocking scrapes on a bounded pool of worker threads.
+
+    At most max_workers scrapes run at once, and a single client never holds more than
+    max_per_client of those slots; requests over the limits wait in FIFO order (anyio
+    semaphores are fair). Once the workers are busy and max_queued requests are waiting, new
+    ones fail fast with ServerBusy instead of piling up. All bookkeeping happens on the event
+    loop thread.
+    """
+
+    def __init__(self, max_workers: int, max_per_client: int, max_queued: int):
+        self.max_workers = max_workers
+        self.max_per_client = max_per_client
+        self.max_queued = max_queued
+        self.active = 0
+        self.waiting = 0
+        self._limiter: anyio.CapacityLimiter | None = None
+        self._client_slots: dict[str, anyio.Semaphore] = {}
+        self._client_refs: dict[str, int] = {}
+
+    async def run(
+        self, client_key: str, func: Callable[..., Any], *args, cancel_event: Optional[threading.Event] = None, **kwargs
+    ) -> Any:
+        """Run func(*args, **kwargs) on a worker thread once a slot is free.
+
+        If the calling task is cancelled (e.g. the client cancelled the request) while func runs,
+        cancel_event is set so func can stop at its next checkpoint, and the slot is freed right away.
+        """
+        if self.active + self.waiting >= self.max_workers + self.max_queued:
+            raise ServerBusy(f"{self.waiting} scrapes are already queued, try again later.")
+
+        if self._limiter is None:  #: created lazily, it needs a running event loop
+            self._limiter = anyio.CapacityLimiter(self.max_workers)
+
+        client_slots = self._client_slots.setdefault(client_key, anyio.Semaphore(self.max_per_client))
+        self._client_refs[client_key] = self._client_refs.get(client_key, 0) + 1
+        self.waiting += 1
+        queued = True
+        try:
+            async with client_slots, self._limiter:
+                self.waiting -= 1
+                queued = False
+                self.active += 1
+                try:
+                    return await anyio.to_thread.run_sync(
+                        functools.partial(func, *args, **kwargs), abandon_on_cancel=cancel_event is not None
+                    )
+                except anyio.get_cancelled_exc_class():
+                    if cancel_event is not None:
+                        cancel_event.set()
+                    raise
+                finally:
+                    self.active -= 1
+        finally:
+            if queued:  #: cancelled while waiting for a slot
+                self.waiting -= 1
+
+            self._client_refs[client_key] -= 1
+            if not self._client_refs[client_key]:
+                del self._client_refs[client_key], self._client_slots[client_key]
+
+    def stats(self) -> dict[str, int]:
+        return {"active": self.active, "waiting": self.waiting, "clients": len(self._client_slots)}
+
+
+scheduler = ScrapeScheduler(MAX_WORKERS, MAX_PER_CLIENT, MAX_QUEUED)
+
+
+class StoredResult:
+    """Rows of one scrape. Filled page by page while the scrape runs, then replaced by the final result.
+
+    fields is None for raw GraphQL rows, else the table columns each row holds (format="table").
+    """
+
+    def __init__(self, fields: Optional[List[str]] = None):
+        self.fields = fields
+        self.rows: List[Dict[str, Any]] = []
+        self.complete = False
+        self.cancel = threading.Event()
+        #: SharedResultStore: file another worker creates to cancel the scrape, and the rows file size loaded
+        self.cancel_marker: Optional[str] = None
+        self.version: Optional[int] = None
+
+    def cancelled(self) -> bool:
+        return self.cancel.is_set() or bool(self.cancel_marker and os.path.exists(self.cancel_marker))
+
+
+class ResultStore:
+    """In-memory store of scrape results, keyed by an opaque handle, with TTL and LRU eviction."""
+
+    def __init__(self, ttl: float, max_results: int):
+        self.ttl = ttl
+        self.max_results = max_results
+        self._results: OrderedDict[str, tuple[float, StoredResult]] = OrderedDict()
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for handle in [handle for handle, (expires_at, _) in self._results.items() if expires_at <= now]:
+            del self._results[handle]
+
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+
+    def create(self, fields: Optional[List[str]] = None) -> tuple[str, StoredResult]:
+        handle = secrets.token_urlsafe(12)
+        self._results[handle] = (time.monotonic() + self.ttl, StoredResult(fields))
+        self._evict()
+        return handle, self._results[handle][1]
+
+    def get(self, handle: str) -> Optional[StoredResult]:
+        """Return the result of handle (refreshing its TTL), or None if it expired or never existed."""
+        self._evict()
+        if handle not in self._results:
+            return None
+
+        _, result = self._results[handle]
+        self._results[handle] = (time.monotonic() + self.ttl, result)
+        self._results.move_to_end(handle)
+        return result
+
+    def discard(self, handle: str) -> None:
+        self._results.pop(handle, None)
+
+    def save(self, handle: str, result: StoredResult, new_rows: Optional[List[Dict[str, Any]]] = None) -> None:
+        """Persist new_rows appended to result (or all of it if None), refreshing its TTL so a running scrape
+        keeps its handle however long it takes. Results only live in memory here."""
+        if handle in self._results:
+            self._results[handle] = (time.monotonic() + self.ttl, result)
+
+    def cancel(self, handle: str, result: StoredResult) -> None:
+        result.cancel.set()
+
+
+class SharedResultStore(ResultStore):
+    """
+    ResultStore persisted to a directory shared by the server's worker processes.
+
+    Each handle is a rows file (one JSON row per line, appended page by page while the scrape runs)
+    and a meta file (fields, complete). The worker running a scrape keeps it in memory as well; other
+    workers load it from disk and reload it when the rows file grew. Expiry follows the meta file's
+    modification time, which every access and every saved page refreshes.
+    """
+
+    HANDLE_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
+
+    def __init__(self, directory: str, ttl: float, max_results: int):
+        super().__init__(ttl, max_results)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, handle: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{handle}{suffix}")
+
+    def _write(self, path: str, data: bytes) -> None:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _write_meta(self, handle: str, result: StoredResult) -> None:
+        meta = {"fields": result.fields, "complete": result.complete}
+        self._write(self._path(handle, ".meta"), _to_json(meta).encode())
+
+    def _evict_files(self) -> None:
+        now = time.time()
+        metas = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".meta"):
+                try:
+                    metas.append((os.path.getmtime(os.path.join(self.directory, name)), name[:-5]))
+                except FileNotFoundError:
+                    continue
+
+        metas.sort()
+        expired = {handle for mtime, handle in metas if now - mtime > self.ttl}
+        overflow = len(metas) - len(expired) - self.max_results
+        for _, handle in metas:
+            if overflow <= 0:
+                break
+            #: only finished results make room, a scrape still being written (by any worker) is kept
+            if handle not in expired and self._read_meta(handle).get("complete"):
+                expired.add(handle)
+                overflow -= 1
+        for handle in expired:
+            self.discard(handle)
+
+    def _read_meta(self, handle: str) -> Dict[str, Any]:
+        try:
+            with open(self._path(handle, ".meta"), "rb") as f:
+                return json.loads(f.read())
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def create(self, fields: Optional[List[str]] = None) -> tuple[str, StoredResult]:
+        handle, result = super().create(fields)
+        result.cancel_marker = self._path(handle, ".cancel")
+        self._write(self._path(handle, ".rows"), b"")
+        self._write_meta(handle, result)
+        self._evict_files()
+        return handle, result
+
+    def get(self, handle: str) -> Optional[StoredResult]:
+        if not self.HANDLE_PATTERN.fullmatch(handle):
+            return None
+
+        meta_path = self._path(handle, ".meta")
+        local = self._results.get(handle)
+        if local is not None and local[1].version is None:  #: scraped by this worker, memory is authoritative
+            try:
+                os.utime(meta_path)
+            except FileNotFoundError:
+                pass
+            result = super().get(handle)
+            if result is not None:
+                return result
+            #: evicted from memory by the results other workers' handles loaded, read back from disk
+
+        try:
+            if time.time() - os.path.getmtime(meta_path) > self.ttl:
+                self.discard(handle)
+                return None
+            with open(meta_path, "rb") as f:
+                meta = json.loads(f.read())
+            with open(self._path(handle, ".rows"), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            super().discard(handle)
+            return None
+        os.utime(meta_path)
+
+        data = data[: data.rfind(b"\n") + 1]  #: skip a row that is still being appended
+        result = super().get(handle)
+        if result is None or result.version != len(data) or result.complete != meta["complete"]:
+            result = StoredResult(meta["fields"])
+            result.rows = [json.loads(line) for line in data.splitlines()]
+            result.complete = meta["complete"]
+            result.cancel_marker = self._path(handle, ".cancel")
+            result.version = len(data)
+            self._results[handle] = (time.monotonic() + self.ttl, result)
+        return result
+
+    def discard(self, handle: str) -> None:
+        super().discard(handle)
+        for suffix in (".meta", ".rows", ".cancel"):
+            try:
+                os.remove(self._path(handle, suffix))
+            except FileNotFoundError:
+                pass
+
+    def save(self, handle: str, result: StoredResult, new_rows: Optional[List[Dict[str, Any]]] = None) -> None:
+        super().save(handle, result, new_rows)
+        rows_path = self._path(handle, ".rows")
+        if new_rows is None:
+            self._write(rows_path, b"".join(_to_json(row).encode() + b"\n" for row in result.rows))
+            self._write_meta(handle, result)
+            return
+
+        if new_rows:
+            with open(rows_path, "ab") as f:
+                f.write(b"".join(_to_json(row).encode() + b"\n" for row in new_rows))
+        #: a scrape still being written isn't expired by the other workers, whatever its duration
+        try:
+            os.utime(self._path(handle, ".meta"))
+        except FileNotFoundError:
+            pass
+
+    def cancel(self, handle: str, result: StoredResult) -> None:
+        super().cancel(handle, result)
+        self._write(result.cancel_marker or self._path(handle, ".cancel"), b"")
+
+
+def _result_store(cache_dir: Optional[str]) -> ResultStore:
+    if cache_dir:
+        return SharedResultStore(os.path.join(cache_dir, "results"), RESULT_TTL, MAX_RESULTS)
+    return ResultStore(RESULT_TTL, MAX_RESULTS)
+
+
+result_store = _result_store(CACHE_DIR)
+
+
+def _page(handle: str, result: StoredResult, cursor: Optional[str], page_size: Optional[int]) -> Dict[str, Any]:
+    """Slice one page out of a result. The cursor is the offset of the page's first row.
+
+    While the scrape is still running, next_cursor points past the rows received so far,
+    so polling it returns the new rows as they arrive. Table results are sent column-oriented:
+    {"fields": [...], "columns": {field: [value per row]}} instead of "rows".
+    """
+    rows = result.rows
+    offset = max(0, int(cursor)) if cursor else 0
+    page_size = max(1, int(page_size or PAGE_SIZE))
+    end = offset + page_size
+    page = rows[offset:end]
+
+    if end < len(rows):
+        next_cursor = str(end)
+    elif not result.complete:
+        next_cursor = str(offset + len(page))
+    else:
+        next_cursor = None
+
+    response = {
+        "handle": handle,
+        "complete": result.complete,
+        "total": len(rows),
+        "cursor": str(offset),
+        "next_cursor": next_cursor,
+    }
+    if result.fields is None:
+        response["rows"] = page
+    else:
+        response["fields"] = result.fields
+        response["columns"] = {field: [row[field] for row in page] for field in result.fields}
+    return response
+
+
+def _client_key(ctx: Context) -> str:
+    """
+    Identify the calling client: its declared client_id, else over HTTP its X-Client-Id header or
+    address, else its MCP session.
+
+    Stateless HTTP (http_app) creates a session per request, so HTTP clients are never keyed by session.
+    """
+    try:
+        if ctx.client_id:
+            return ctx.client_id
+        request = getattr(ctx.request_context, "request", None)
+    except ValueError:  #: called outside of an MCP request (e.g. directly through mcp.call_tool)
+        return "local"
+
+    headers = getattr(request, "headers", None)
+    if headers is not None:
+        if headers.get("x-client-id"):
+            return f"header-{headers['x-client-id']}"
+        if getattr(request, "client", None):
+            return f"address-{request.client.host}"
+    return f"session-{id(ctx.session)}"
 
 
 @mcp.tool()
@@ -17,20 +428,261 @@ def ping() -> str:
     return "ok"
 
 
-@mcp.tool()
-def scrape_properties(
+def _to_json(value: Any) -> str:
+    """Encode a tool result as compact JSON with HomeHarvest's JSON backend (orjson when installed)."""
+    try:
+        from homeharvest.core.jsonlib import dumps  # type: ignore
+    except Exception:
+        return json.dumps(value, default=str)
+    return dumps(value)
+
+
+class PrefetchCache:
+    """
+    Results of the hot market scrapes run by the prefetch thread, as LazyProperty lists.
+
+    A prefetched scrape is served to scrape_properties calls for the same location and listing type
+    that don't add other filters; lazy results serve both raw rows (their payload) and table rows.
+    With a directory, results are also written there, so one worker prefetches for all of them.
+    """
+
+    #: scrape_properties arguments a prefetched result was scraped with
+    DEFAULTS = {
+        "past_days": None,
+        "date_from": None,
+        "date_to": None,
+        "radius": None,
+        "foreclosure": False,
+        "mls_only": False,
+    }
+
+    def __init__(self, max_age: float, directory: Optional[str] = None):
+        self.max_age = max_age
+        self.directory = directory
+        self._lock = threading.Lock()
+        #: key -> (wall clock time fetched, properties)
+        self._entries: dict[tuple[str, str], tuple[float, List[Any]]] = {}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def _key(location: str, listing_type: str) -> tuple[str, str]:
+        return " ".join(location.split()).casefold(), listing_type.lower()
+
+    def _path(self, key: tuple[str, str]) -> str:
+        return os.path.join(self.directory, hashlib.sha1("|".join(key).encode()).hexdigest() + ".json")
+
+    def put(self, location: str, listing_type: str, properties: List[Any]) -> None:
+        key = self._key(location, listing_type)
+        with self._lock:
+            self._entries[key] = (time.time(), properties)
+
+        if self.directory and properties:
+            path = self._path(key)
+            payload = {
+                "reference_time": properties[0].reference_time.isoformat(),
+                "rows": [prop.raw for prop in properties],
+            }
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(_to_json(payload))
+            os.replace(tmp_path, path)
+
+    def _load(self, key: tuple[str, str], fetched_at: float) -> Optional[tuple[float, List[Any]]]:
+        """Load the result another worker prefetched, if it is newer than fetched_at."""
+        path = self._path(key)
+        try:
+            mtime = os.path.getmtime(path)
+            if mtime <= fetched_at:
+                return None
+            with open(path, "rb") as f:
+                payload = json.loads(f.read())
+        except (FileNotFoundError, ValueError):
+            return None
+
+        from datetime import datetime
+        from homeharvest import LazyProperty  # type: ignore
+
+        reference_time = datetime.fromisoformat(payload["reference_time"])
+        properties = [
+            LazyProperty(raw, extra_property_data=True, reference_time=reference_time) for raw in payload["rows"]
+        ]
+        with self._lock:
+            self._entries[key] = (mtime, properties)
+        return mtime, properties
+
+    def get(self, location: str, listing_type: str = "for_sale", **filters) -> Optional[List[Any]]:
+        if any(filters.get(name, default) != default for name, default in self.DEFAULTS.items()):
+            return None
+
+        key = self._key(location, listing_type)
+        with self._lock:
+            entry = self._entries.get(key)
+        if self.directory:
+            entry = self._load(key, entry[0] if entry else 0.0) or entry
+
+        if entry is None or time.time() - entry[0] > self.max_age:
+            return None
+        return entry[1]
+
+
+def _prefetch_cache(cache_dir: Optional[str]) -> PrefetchCache:
+    return PrefetchCache(2 * PREFETCH_INTERVAL, os.path.join(cache_dir, "prefetch") if cache_dir else None)
+
+
+prefetch_cache = _prefetch_cache(CACHE_DIR)
+
+
+def use_cache_dir(cache_dir: Optional[str]) -> None:
+    """Keep result handles and prefetched markets in cache_dir (None: in memory). Call before serving requests."""
+    global CACHE_DIR, result_store, prefetch_cache
+
+    CACHE_DIR = cache_dir
+    result_store = _result_store(cache_dir)
+    prefetch_cache = _prefetch_cache(cache_dir)
+
+
+class HomeHarvestImportError(Exception):
+    """Raised when the homeharvest package cannot be imported."""
+
+
+def _scrape_rows(limit: Optional[int] = None, fields: Optional[List[str]] = None, **kwargs) -> List[Dict[str, Any]]:
+    """Blocking part of scrape_properties, run on a scheduler worker thread."""
+    try:
+        # HomeHarvest is included in your repo (package name: homeharvest)
+        # No network key required; it scrapes Realtor.com.
+        from homeharvest import scrape_property  # type: ignore
+    except Exception as e:
+        raise HomeHarvestImportError(str(e)) from e
+
+    # The limit is pushed into the scrape itself, so no pages beyond it are fetched
+    limit = MAX_SCRAPE_LIMIT if limit is None else min(max(int(limit), 1), MAX_SCRAPE_LIMIT)
+
+    prefetched = prefetch_cache.get(**kwargs)
+    if prefetched is not None:
+        prefetched = prefetched[:limit]
+        if fields is None:
+            return [prop.raw for prop in prefetched]
+        return _to_rows([prop.to_property() for prop in prefetched], fields)
+
+    properties = scrape_property(
+        **kwargs,
+        limit=limit,
+        # raw: JSON-friendly list[dict]; pydantic: flattened into table rows by _to_rows
+        return_type="raw" if fields is None else "pydantic",
+    )
+    return _to_rows(properties[:limit], fields)
+
+
+def _to_rows(properties: List[Any], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """Keep raw rows as-is, or flatten Property objects into rows holding only the table fields."""
+    if fields is None:
+        return properties
+
+    from homeharvest import flatten_property  # type: ignore
+
+    rows = []
+    for prop in properties:
+        row = flatten_property(prop)
+        rows.append({field: row[field] for field in fields})
+    return rows
+
+
+def _table_fields(fields: Optional[List[str]]) -> List[str]:
+    """Validate the requested table fields against HomeHarvest's flattened columns."""
+    from homeharvest.utils import ordered_properties  # type: ignore
+
+    if not fields:
+        return list(DEFAULT_TABLE_FIELDS)
+
+    unknown = [field for field in fields if field not in ordered_properties]
+    if unknown:
+        raise ValueError(f"Unknown fields {', '.join(unknown)}; valid fields are {', '.join(ordered_properties)}.")
+    return list(dict.fromkeys(fields))
+
+
+def _progress_reporter(
+    ctx: Context, portal: BlockingPortal, handle: str, result: StoredResult, stream_partial: bool
+) -> Callable[[Any], None]:
+    """
+    Build the scrape_property progress_callback for a scrape_properties call.
+
+    It runs on the scrape's threads and reaches the event loop through portal: it appends each
+    finished page to the stored result (so fetch_page can read it before the scrape ends), sends
+    an MCP progress notification, and with stream_partial also sends the page's rows as a log
+    notification. It raises ScrapeCancelled once cancel_scrape or a client cancellation set the
+    result's cancel event.
+    """
+    try:
+        ctx.request_context
+        can_notify = True
+    except ValueError:  #: called outside of an MCP request
+        can_notify = False
+
+    events = 0
+
+    def report(event) -> None:
+        nonlocal events
+
+        if result.cancelled():
+            from homeharvest import ScrapeCancelled  # type: ignore
+
+            raise ScrapeCancelled(f"Scrape {handle} was cancelled.")
+
+        page_rows = _to_rows(event.properties, result.fields) if event.stage == "page" else []
+        result.rows.extend(page_rows)
+        result_store.save(handle, result, page_rows)
+
+        if not can_notify:
+            return
+
+        # one page event and (usually) one detail batch event per page of results
+        events += 1
+        total = 2 * event.total if event.total else None
+        message = (
+            f"{event.stage} {event.completed}/{event.total or '?'}, {len(result.rows)} rows so far (handle {handle})"
+        )
+        portal.call(functools.partial(ctx.report_progress, events, total, message))
+
+        if stream_partial and page_rows:
+            data = _to_json({"handle": handle, "page": event.completed, "rows": page_rows})
+            portal.call(functools.partial(ctx.log, "info", data, logger_name="homeharvest.rows"))
+
+    return report
+
+
+# structured_output=False: the rows are encoded once by _to_json into a single text block,
+# instead of FastMCP validating them and pretty-printing one block per row
+@mcp.tool(structured_output=False)
+async def scrape_properties(
+    ctx: Context,
     location: str,
     listing_type: str = "for_sale",  # one of: for_sale, for_rent, sold, pending
     past_days: Optional[int] = None,
     date_from: Optional[str] = None,  # "YYYY-MM-DD"
-    date_to: Optional[str] = None,    # "YYYY-MM-DD"
-    radius: Optional[float] = None,   # miles; only applies if location is a specific address
+    date_to: Optional[str] = None,  # "YYYY-MM-DD"
+    radius: Optional[float] = None,  # miles; only applies if location is a specific address
     foreclosure: bool = False,
     mls_only: bool = False,
-    limit: Optional[int] = None,      # truncate results if provided
-) -> List[Dict[str, Any]]:
+    limit: Optional[int] = None,  # max rows to scrape (1-10000)
+    page_size: Optional[int] = None,  # rows in the first page
+    stream_partial: bool = False,  # also send each page's rows as log notifications
+    format: str = "raw",  # "raw" | "table"
+    fields: Optional[List[str]] = None,  # table columns (format="table")
+) -> str:
     """
-    Fetch property data from Realtor.com via HomeHarvest and return JSON rows.
+    Fetch property data from Realtor.com via HomeHarvest.
+
+    The full result stays on the server: this returns a result handle and its first page of rows.
+    Read the remaining pages with fetch_page(handle, next_cursor) until next_cursor is null.
+
+    format="table" returns a compact column-oriented table of selected flat fields (zip_code, list_price,
+    days_on_mls, ...) instead of the full nested GraphQL rows, and is much smaller; prefer it unless you need
+    nested details (photos, advertisers, estimates, ...). To only compare areas, use summarize_market.
+
+    While the scrape runs, progress notifications report each finished page and include the handle:
+    fetch_page already returns the rows received so far ("complete": false), and cancel_scrape(handle)
+    stops a scrape that is no longer needed.
 
     Args:
         location: e.g. "San Diego, CA" or "123 Main St, San Diego, CA 92104"
@@ -40,21 +692,220 @@ def scrape_properties(
         radius: miles around an address (only if 'location' is a specific address)
         foreclosure: include foreclosures
         mls_only: only MLS listings
-        limit: max records to return (server-side truncation)
+        limit: max records to scrape; set it when you only need the first N rows, as it also shortens the scrape
+        page_size: rows per page (default 50)
+        stream_partial: send the rows of each finished page as "homeharvest.rows" log notifications
+        format: "raw" (full nested rows) or "table" (selected flat fields, column-oriented)
+        fields: columns of the table (default: url, id, status, style, address, zip, beds, baths, sqft,
+            list/sold price and date, price per sqft, days on MLS, coordinates)
 
     Returns:
-        A list[dict] JSON-serializable table of properties (MLS-like fields).
+        JSON object: {"handle", "complete", "total", "cursor", "next_cursor", "rows": [properties (MLS-like fields)]},
+        with "fields" and "columns": {field: [values]} instead of "rows" for format="table"
+        ("cancelled": true is added if the scrape was cancelled, with the rows received until then)
     """
+    if format not in ("raw", "table"):
+        return _to_json({"error": "invalid format", "details": f"{format!r}, expected 'raw' or 'table'"})
     try:
-        # HomeHarvest is included in your repo (package name: homeharvest)
-        # No network key required; it scrapes Realtor.com.
-        from homeharvest import scrape_property  # type: ignore
-    except Exception as e:
+        table_fields = _table_fields(fields) if format == "table" else None
+    except ImportError as e:
+        return _to_json({"error": "homeharvest import failed", "details": str(e)})
+    except ValueError as e:
+        return _to_json({"error": "invalid fields", "details": str(e)})
+
+    handle, result = result_store.create(table_fields)
+    try:
+        async with BlockingPortal() as portal:
+            rows = await scheduler.run(
+                _client_key(ctx),
+                _scrape_rows,
+                cancel_event=result.cancel,
+                location=location,
+                listing_type=listing_type,
+                past_days=past_days,
+                date_from=date_from,
+                date_to=date_to,
+                radius=radius,
+                foreclosure=foreclosure,
+                mls_only=mls_only,
+                limit=limit,
+                fields=table_fields,
+                progress_callback=_progress_reporter(ctx, portal, handle, result, stream_partial),
+            )
+    except ServerBusy as e:
+        result_store.discard(handle)
+        return _to_json({"error": "server busy", "details": str(e)})
+    except HomeHarvestImportError as e:
+        result_store.discard(handle)
         # Make the error visible to the client
-        return [{"error": "homeharvest import failed", "details": str(e)}]
+        return _to_json({"error": "homeharvest import failed", "details": str(e)})
+    except Exception as e:
+        if result.cancelled():
+            result.complete = True
+            result_store.save(handle, result)
+            return _to_json(_page(handle, result, None, page_size) | {"cancelled": True})
+
+        result_store.discard(handle)
+        return _to_json({"error": "scrape failed", "details": str(e)})
+
+    result.rows = rows
+    result.complete = True
+    result_store.save(handle, result)
+    return _to_json(_page(handle, result, None, page_size))
+
+
+@mcp.tool(structured_output=False)
+async def fetch_page(handle: str, cursor: Optional[str] = None, page_size: Optional[int] = None) -> str:
+    """
+    Read a page of a scrape_properties result, also while the scrape is still running.
+
+    Args:
+        handle: result handle returned by scrape_properties (or sent in its progress notifications)
+        cursor: next_cursor of the previous page (omit for the first page)
+        page_size: rows per page (default 50)
+
+    Returns:
+        JSON object: {"handle", "complete", "total", "cursor", "next_cursor", "rows": [...]} (or "fields" and
+        "columns" for a format="table" result, like scrape_properties); next_cursor is null
+        on the last page of a complete result. Handles expire after a period without access; scrape again if
+        the handle is unknown.
+    """
+    result = result_store.get(handle)
+    if result is None:
+        return _to_json({"error": "unknown or expired handle", "details": handle})
+
+    try:
+        return _to_json(_page(handle, result, cursor, page_size))
+    except ValueError:
+        return _to_json({"error": "invalid cursor", "details": cursor})
+
+
+@mcp.tool()
+async def cancel_scrape(handle: str) -> str:
+    """Stop a running scrape_properties call. Rows received so far stay readable with fetch_page."""
+    result = result_store.get(handle)
+    if result is None:
+        return "unknown or expired handle"
+    if result.complete:
+        return "already complete"
+
+    result_store.cancel(handle, result)
+    return "cancelling"
+
+
+# Per-stage scrape metrics of this process (PrometheusSink), registered by warm_up
+metrics_sink = None
+
+
+def _render_metrics() -> str:
+    return metrics_sink.render() if metrics_sink is not None else ""
+
+
+@mcp.tool()
+def scrape_metrics() -> str:
+    """Scrape metrics of this server process in the Prometheus text format: per-stage latency histograms
+    (autocomplete, search, details, process, result), HTTP status codes, bytes and retries."""
+    return _render_metrics()
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def prometheus_metrics(request):
+    """Prometheus scrape endpoint (streamable-http transport)."""
+    from starlette.responses import PlainTextResponse
+
+    return PlainTextResponse(_render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+SUMMARY_GROUPS = ("zip_code", "style", "city", "county", "neighborhoods", "beds")
+
+
+def _median(values) -> Optional[float]:
+    value = values.median()
+    return None if value != value else round(float(value), 2)  #: NaN when the group has no values
 
+
+def _market_summary(group_by: str, cancel: threading.Event, limit: Optional[int] = None, **kwargs) -> Dict[str, Any]:
+    """Blocking part of summarize_market: scrape into a DataFrame and aggregate it by group_by."""
+    try:
+        import pandas as pd
+        from homeharvest import scrape_property, ScrapeCancelled  # type: ignore
+    except Exception as e:
+        raise HomeHarvestImportError(str(e)) from e
+
+    def check_cancelled(event) -> None:
+        if cancel.is_set():
+            raise ScrapeCancelled("Summary was cancelled.")
+
+    limit = MAX_SCRAPE_LIMIT if limit is None else min(max(int(limit), 1), MAX_SCRAPE_LIMIT)
+    df = scrape_property(**kwargs, limit=limit, return_type="pandas", progress_callback=check_cancelled)
+    if df.empty:
+        return {"total": 0, "price_field": None, "overall": None, "groups": []}
+
+    price_field = "sold_price" if kwargs["listing_type"] == "sold" else "list_price"
+    metrics = pd.DataFrame(
+        {
+            "price": pd.to_numeric(df[price_field], errors="coerce"),
+            "price_per_sqft": pd.to_numeric(df["price_per_sqft"], errors="coerce"),
+            "days_on_mls": pd.to_numeric(df["days_on_mls"], errors="coerce"),
+        }
+    )
+
+    def summarize(group: pd.DataFrame) -> Dict[str, Any]:
+        return {
+            "count": len(group),
+            "median_price": _median(group["price"]),
+            "median_price_per_sqft": _median(group["price_per_sqft"]),
+            "median_days_on_mls": _median(group["days_on_mls"]),
+        }
+
+    keys = df[group_by].astype("string").fillna("unknown")
+    groups = [{group_by: key, **summarize(group)} for key, group in metrics.groupby(keys, sort=False)]
+    groups.sort(key=lambda group: (-group["count"], group[group_by]))
+
+    return {"total": len(df), "price_field": price_field, "overall": summarize(metrics), "groups": groups}
+
+
+@mcp.tool(structured_output=False)
+async def summarize_market(
+    ctx: Context,
+    location: str,
+    listing_type: str = "for_sale",  # one of: for_sale, for_rent, sold, pending
+    group_by: str = "zip_code",  # one of: zip_code, style, city, county, neighborhoods, beds
+    past_days: Optional[int] = None,
+    date_from: Optional[str] = None,  # "YYYY-MM-DD"
+    date_to: Optional[str] = None,  # "YYYY-MM-DD"
+    radius: Optional[float] = None,
+    foreclosure: bool = False,
+    mls_only: bool = False,
+    limit: Optional[int] = None,  # max rows to scrape (1-10000)
+) -> str:
+    """
+    Summarize a market server-side: property counts and medians of price, price per sqft and days on MLS,
+    overall and per group (zip code, style, ...). Returns a few kilobytes instead of every listing.
+
+    Args:
+        location: e.g. "San Diego, CA"
+        listing_type: "for_sale" | "for_rent" | "sold" | "pending"
+            (prices are sold prices for "sold", list prices otherwise)
+        group_by: "zip_code" | "style" | "city" | "county" | "neighborhoods" | "beds"
+        past_days, date_from, date_to, radius, foreclosure, mls_only, limit: as in scrape_properties
+
+    Returns:
+        JSON object: {"total", "price_field", "overall": {"count", "median_price", "median_price_per_sqft",
+        "median_days_on_mls"}, "groups": [{<group_by>: value, "count", "median_price", ...}]} (largest groups first)
+    """
+    if group_by not in SUMMARY_GROUPS:
+        details = f"{group_by!r}, expected one of {', '.join(SUMMARY_GROUPS)}"
+        return _to_json({"error": "invalid group_by", "details": details})
+
+    cancel = threading.Event()
     try:
-        rows = scrape_property(
+        summary = await scheduler.run(
+            _client_key(ctx),
+            _market_summary,
+            group_by,
+            cancel,
+            cancel_event=cancel,
             location=location,
             listing_type=listing_type,
             past_days=past_days,
@@ -63,18 +914,153 @@ def scrape_properties(
             radius=radius,
             foreclosure=foreclosure,
             mls_only=mls_only,
-            return_type="raw",   # ensures JSON-friendly list[dict]
+            limit=limit,
         )
-        if limit is not None and isinstance(rows, list):
-            rows = rows[: int(limit)]
-        return rows
+    except ServerBusy as e:
+        return _to_json({"error": "server busy", "details": str(e)})
+    except HomeHarvestImportError as e:
+        return _to_json({"error": "homeharvest import failed", "details": str(e)})
+    except Exception as e:
+        return _to_json({"error": "summary failed", "details": str(e)})
+
+    return _to_json({"location": location, "listing_type": listing_type, "group_by": group_by, **summary})
+
+
+_prefetch_lock_file = None
+
+
+def _acquire_prefetch_lock() -> bool:
+    """Take the prefetch lock file of CACHE_DIR, so a single worker prefetches (held until the process exits)."""
+    global _prefetch_lock_file
+
+    if not CACHE_DIR or _prefetch_lock_file is not None:
+        return True
+
+    try:
+        import fcntl
+    except ImportError:  #: no file locks (Windows): every worker prefetches
+        return True
+
+    lock_file = open(os.path.join(CACHE_DIR, "prefetch.lock"), "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+
+    _prefetch_lock_file = lock_file
+    return True
+
+
+def _prefetch_loop(locations: List[str], listing_types: List[str], interval: float) -> None:
+    """Scrape the hot markets into prefetch_cache every interval seconds (runs on a daemon thread).
+
+    With a shared CACHE_DIR, only the worker holding the prefetch lock scrapes; the others keep
+    trying to take it over in case that worker exits.
+    """
+    from homeharvest import scrape_property  # type: ignore
+
+    while True:
+        started = time.monotonic()
+        for location in locations if _acquire_prefetch_lock() else []:
+            for listing_type in listing_types:
+                try:
+                    properties = scrape_property(
+                        location=location, listing_type=listing_type, limit=MAX_SCRAPE_LIMIT, return_type="lazy"
+                    )
+                except Exception as e:
+                    logger.warning("Prefetch of %s (%s) failed: %s", location, listing_type, e)
+                    continue
+
+                prefetch_cache.put(location, listing_type, properties)
+                logger.info("Prefetched %d %s properties in %s", len(properties), listing_type, location)
+
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+def warm_up() -> None:
+    """
+    Pay the one-time startup costs before the first request instead of during it: import HomeHarvest
+    (and pandas), create its pooled HTTP session, and start prefetching the configured hot markets
+    (which also resolves their locations and opens the connections to Realtor.com).
+    """
+    try:
+        import homeharvest  # noqa: F401  # type: ignore
+        import pandas  # noqa: F401  (only imported by homeharvest for DataFrame results, used by summarize_market)
+        from homeharvest.core.scrapers import Scraper  # type: ignore
     except Exception as e:
-        return [{"error": "scrape failed", "details": str(e)}]
+        logger.warning("HomeHarvest warm-up failed: %s", e)
+        return
+
+    if not Scraper.session:
+        Scraper.create_session()
+
+    global metrics_sink
+    if metrics_sink is None:
+        from homeharvest.core.metrics import PrometheusSink, add_sink  # type: ignore
+
+        metrics_sink = add_sink(PrometheusSink())
+
+    if PREFETCH_LOCATIONS:
+        threading.Thread(
+            target=_prefetch_loop,
+            args=(PREFETCH_LOCATIONS, PREFETCH_TYPES, PREFETCH_INTERVAL),
+            name="homeharvest-prefetch",
+            daemon=True,
+        ).start()
+
+
+def http_app():
+    """ASGI app of the streamable HTTP transport, built in each worker process (uvicorn factory)."""
+    # Stateless: any worker (or host) can serve any request, result handles are shared through CACHE_DIR
+    mcp.settings.stateless_http = True
+    warm_up()
+    return mcp.streamable_http_app()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="HomeHarvest MCP server")
+    parser.add_argument(
+        "--transport",
+        choices=["stdio", "streamable-http"],
+        default=os.environ.get("HOMEHARVEST_MCP_TRANSPORT", "stdio"),
+        help="stdio (default) or streamable-http",
+    )
+    parser.add_argument("--host", default=os.environ.get("HOMEHARVEST_MCP_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("HOMEHARVEST_MCP_PORT", "8000")))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("HOMEHARVEST_MCP_WORKERS", "1")),
+        help="worker processes serving HTTP (streamable-http only)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=CACHE_DIR,
+        help="directory shared by the workers (default: a temp dir with several workers, memory otherwise)",
+    )
+    args = parser.parse_args(argv)
+
+    #: several HTTP workers are configured through the environment instead, each in its own process
+    if (args.transport == "stdio" or args.workers == 1) and args.cache_dir != CACHE_DIR:
+        use_cache_dir(args.cache_dir)
+
+    if args.transport == "stdio":
+        warm_up()
+        # Start the MCP server using STDIO transport (what Smithery expects unless overridden)
+        mcp.run(transport="stdio")
+        return
+
+    import uvicorn
 
+    if args.workers == 1:
+        uvicorn.run(http_app(), host=args.host, port=args.port)
+        return
 
-def main() -> None:
-    # Start the MCP server using STDIO transport (what Smithery expects unless overridden)
-    mcp.run(transport="stdio")
+    # Workers are separate processes importing this module by name, configured through the environment
+    os.environ["HOMEHARVEST_MCP_CACHE_DIR"] = args.cache_dir or os.path.join(tempfile.gettempdir(), "homeharvest-mcp")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    uvicorn.run("homeharvest_mcp.server:http_app", factory=True, host=args.host, port=args.port, workers=args.workers)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,26 @@
+import pathlib
+import sys
+
+import pytest
+
+
+@pytest.fixture
+def synthetic():
+    """Serves the scrapes of a test from the synthetic API of benchmarks/synthetic.py, offline."""
+    from homeharvest.core import transport
+    from homeharvest.core.scrapers.realtor import RealtorScraper
+    from homeharvest.core.singleflight import scrape_flights
+
+    sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "benchmarks"))
+    try:
+        from synthetic import SyntheticAdapter
+    finally:
+        sys.path.pop(0)
+
+    scrape_flights.clear()
+    RealtorScraper._location_cache.clear()
+    adapter = transport.mount(SyntheticAdapter(total=600))
+    yield adapter
+    transport.reset()
+    scrape_flights.clear()
+    RealtorScraper._location_cache.clear()
@@ -0,0 +1,431 @@
+import functools
+import json
+import os
+import pathlib
+import sys
+import threading
+import time
+
+import anyio
+import pytest
+from anyio.from_thread import BlockingPortal
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "src"))
+try:
+    from homeharvest_mcp import server
+finally:
+    sys.path.pop(0)
+
+
+@pytest.fixture
+def tools(synthetic, monkeypatch):
+    """The server with a fresh scheduler and result store, scraping from the synthetic API."""
+    monkeypatch.setattr(server, "scheduler", server.ScrapeScheduler(max_workers=2, max_per_client=2, max_queued=2))
+    monkeypatch.setattr(server, "result_store", server.ResultStore(ttl=60, max_results=8))
+    monkeypatch.setattr(server, "prefetch_cache", server.PrefetchCache(max_age=60))
+    return server
+
+
+def call(tool, *args, **kwargs) -> dict:
+    return json.loads(anyio.run(lambda: tool(*args, **kwargs)))
+
+
+def test_scrape_properties_pages(tools):
+    ctx = tools.mcp.get_context()
+    first = call(tools.scrape_properties, ctx, "Dallas, TX", limit=120, page_size=50)
+    assert first["complete"] and first["total"] == 120
+    assert first["cursor"] == "0" and first["next_cursor"] == "50" and len(first["rows"]) == 50
+
+    rows, cursor = first["rows"], first["next_cursor"]
+    while cursor is not None:
+        page = call(tools.fetch_page, first["handle"], cursor)
+        assert page["cursor"] == cursor
+        rows, cursor = rows + page["rows"], page["next_cursor"]
+    assert [len(page) for page in (first["rows"], rows)] == [50, 120]
+    assert len({row["property_id"] for row in rows}) == 120 and all("photos" in row for row in rows)
+
+    assert call(tools.fetch_page, first["handle"], "ten")["error"] == "invalid cursor"
+    assert call(tools.fetch_page, "unknown")["error"] == "unknown or expired handle"
+    assert anyio.run(tools.cancel_scrape, first["handle"]) == "already complete"
+    assert anyio.run(tools.cancel_scrape, "unknown") == "unknown or expired handle"
+
+
+def test_scrape_properties_table(tools):
+    ctx = tools.mcp.get_context()
+    table = call(tools.scrape_properties, ctx, "Dallas, TX", limit=30, format="table", fields=["zip_code", "beds"])
+    assert table["fields"] == ["zip_code", "beds"] and "rows" not in table
+    assert [len(values) for values in table["columns"].values()] == [30, 30]
+
+    default = call(tools.scrape_properties, ctx, "Dallas, TX", limit=10, page_size=5, format="table")
+    assert default["fields"] == tools.DEFAULT_TABLE_FIELDS and len(default["columns"]["property_id"]) == 5
+    page = call(tools.fetch_page, default["handle"], default["next_cursor"])
+    assert page["fields"] == tools.DEFAULT_TABLE_FIELDS and page["next_cursor"] is None
+
+    assert (
+        call(tools.scrape_properties, ctx, "Dallas, TX", format="table", fields=["nope"])["error"] == "invalid fields"
+    )
+    assert call(tools.scrape_properties, ctx, "Dallas, TX", format="csv")["error"] == "invalid format"
+
+
+def test_cancel_scrape(tools, synthetic, monkeypatch):
+    respond, release = synthetic.api.respond, threading.Event()
+
+    def blocked_respond(method, url, body):
+        #: the second search page waits until the test cancelled the scrape
+        if body and json.loads(body).get("variables", {}).get("offset") == 200:
+            release.wait(10)
+        return respond(method, url, body)
+
+    monkeypatch.setattr(synthetic.api, "respond", blocked_respond)
+
+    async def scrape_and_cancel():
+        async with anyio.create_task_group() as tg:
+            responses = []
+
+            async def scrape():
+                responses.append(await tools.scrape_properties(tools.mcp.get_context(), "Dallas, TX", limit=400))
+
+            tg.start_soon(scrape)
+            try:
+                while not tools.result_store._results or not next(iter(tools.result_store._results.values()))[1].rows:
+                    await anyio.sleep(0.01)
+                handle = next(iter(tools.result_store._results))
+                assert await tools.cancel_scrape(handle) == "cancelling"
+            finally:
+                release.set()
+        return json.loads(responses[0])
+
+    response = anyio.run(scrape_and_cancel)
+    #: the rows received until the scrape was cancelled stay readable
+    assert response["cancelled"] and response["complete"] and response["total"] == 200
+    assert call(tools.fetch_page, response["handle"], "150")["next_cursor"] is None
+
+
+def test_result_store_ttl_and_lru():
+    store = server.ResultStore(ttl=60, max_results=2)
+    first, _ = store.create()
+    second, _ = store.create()
+    store.get(first)  #: the most recently used now
+    third, _ = store.create()
+    assert store.get(second) is None and store.get(first) is not None and store.get(third) is not None
+
+    expiring = server.ResultStore(ttl=0.05, max_results=2)
+    handle, result = expiring.create()
+    time.sleep(0.03)
+    expiring.save(handle, result, [])  #: saving a page refreshes the TTL
+    time.sleep(0.03)
+    assert expiring.get(handle) is result
+    time.sleep(0.1)
+    assert expiring.get(handle) is None
+
+
+def test_page_cursors():
+    result = server.StoredResult()
+    result.rows = [{"id": i} for i in range(5)]
+    #: while the scrape runs, the last page points past the rows received so far
+    assert server._page("h", result, "3", 10)["next_cursor"] == "5"
+    result.complete = True
+    page = server._page("h", result, "-4", 2)
+    assert page["cursor"] == "0" and page["next_cursor"] == "2" and page["rows"] == [{"id": 0}, {"id": 1}]
+    assert server._page("h", result, "4", 2)["next_cursor"] is None
+    with pytest.raises(ValueError):
+        server._page("h", result, "next", 2)
+
+    table = server.StoredResult(["id"])
+    table.rows, table.complete = result.rows, True
+    assert server._page("h", table, None, 3)["columns"] == {"id": [0, 1, 2]}
+
+
+def test_scheduler_limits():
+    scheduler = server.ScrapeScheduler(max_workers=1, max_per_client=1, max_queued=1)
+    started, release = threading.Event(), threading.Event()
+
+    def scrape(name):
+        started.set()
+        release.wait(10)
+        return name
+
+    async def run():
+        results = []
+
+        async def submit(name):
+            results.append(await scheduler.run("client", scrape, name))
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(submit, "first")
+            await anyio.to_thread.run_sync(started.wait)
+            tg.start_soon(submit, "second")
+            await anyio.sleep(0.05)
+            assert scheduler.stats() == {"active": 1, "waiting": 1, "clients": 1}
+            #: the worker is busy and the queue is full
+            with pytest.raises(server.ServerBusy):
+                await scheduler.run("other", scrape, "third")
+            release.set()
+        return results
+
+    assert anyio.run(run) == ["first", "second"]
+    assert scheduler.stats() == {"active": 0, "waiting": 0, "clients": 0}
+
+
+def test_scheduler_per_client_limit():
+    scheduler = server.ScrapeScheduler(max_workers=2, max_per_client=1, max_queued=4)
+    release = threading.Event()
+    order = []
+
+    def scrape(name):
+        order.append(name)
+        if name == "a1":
+            release.wait(10)
+
+    async def run():
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(scheduler.run, "a", scrape, "a1")
+            await anyio.sleep(0.05)
+            tg.start_soon(scheduler.run, "a", scrape, "a2")
+            tg.start_soon(scheduler.run, "b", scrape, "b1")
+            await anyio.sleep(0.1)
+            #: a2 waits for client a's slot, while b1 takes the free worker
+            assert order == ["a1", "b1"] and scheduler.stats()["waiting"] == 1
+            release.set()
+
+    anyio.run(run)
+    assert order == ["a1", "b1", "a2"]
+
+
+def test_shared_result_store(tmp_path):
+    first = server.SharedResultStore(str(tmp_path), ttl=60, max_results=8)
+    second = server.SharedResultStore(str(tmp_path), ttl=60, max_results=8)
+
+    handle, result = first.create(["property_id"])
+    for property_id in ["1", "2"]:
+        result.rows.append({"property_id": property_id})
+        first.save(handle, result, [{"property_id": property_id}])
+        #: the other worker reads the rows saved so far, reloading them as the rows file grows
+        shared = second.get(handle)
+        assert [row["property_id"] for row in shared.rows] == ["1", "2"][: len(result.rows)]
+        assert not shared.complete
+
+    #: cancelled from the other worker
+    second.cancel(handle, second.get(handle))
+    assert result.cancelled()
+
+    #: a scrape running for longer than the TTL is kept as long as its pages are saved
+    meta_path = tmp_path / f"{handle}.meta"
+    os.utime(meta_path, (time.time() - 120, time.time() - 120))
+    first.save(handle, result, [])
+    second.create()
+    assert meta_path.exists()
+
+    os.utime(meta_path, (time.time() - 120, time.time() - 120))
+    second.create()
+    assert not meta_path.exists() and second.get(handle) is None
+
+    result.complete = True
+    first.save(handle, result)
+    assert second.get(handle).complete and len(second.get(handle).rows) == 2
+
+
+def test_shared_result_store_overflow(tmp_path):
+    first = server.SharedResultStore(str(tmp_path), ttl=60, max_results=1)
+    second = server.SharedResultStore(str(tmp_path), ttl=60, max_results=1)
+
+    running, _ = first.create()
+    done, done_result = first.create()
+    done_result.complete = True
+    first.save(done, done_result)
+    #: only finished results make room, the running scrape of the other worker is kept
+    latest, _ = second.create()
+    assert second.get(done) is None
+    assert second.get(running) is not None and second.get(latest) is not None
+
+
+def test_cache_dir_over_stdio(tmp_path, monkeypatch):
+    for name in ("CACHE_DIR", "result_store", "prefetch_cache"):
+        monkeypatch.setattr(server, name, getattr(server, name))
+    monkeypatch.setattr(server, "warm_up", lambda: None)
+    monkeypatch.setattr(server.mcp, "run", lambda transport: None)
+
+    server.main(["--transport", "stdio", "--cache-dir", str(tmp_path)])
+    assert isinstance(server.result_store, server.SharedResultStore)
+    assert server.prefetch_cache.directory == str(tmp_path / "prefetch")
+
+
+def test_scheduler_concurrency_and_queue():
+    scheduler = server.ScrapeScheduler(max_workers=2, max_per_client=2, max_queued=4)
+    running, peak, lock = [0], [0], threading.Lock()
+    order = []
+
+    def scrape(name):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+            order.append(name)
+
+    async def run():
+        async with anyio.create_task_group() as tg:
+            for i in range(6):
+                tg.start_soon(scheduler.run, f"client-{i % 3}", scrape, i)
+                await anyio.sleep(0.001)
+
+    anyio.run(run)
+    #: two scrapes at a time, the queued ones started in order
+    assert peak[0] == 2 and sorted(order) == list(range(6)) and set(order[-2:]) == {4, 5}
+
+
+def test_scheduler_cancellation():
+    scheduler = server.ScrapeScheduler(max_workers=1, max_per_client=1, max_queued=2)
+    cancel, started, release = threading.Event(), threading.Event(), threading.Event()
+
+    def scrape():
+        started.set()
+        release.wait(10)
+        return "done"
+
+    async def run():
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(functools.partial(scheduler.run, "client", scrape, cancel_event=cancel))
+            await anyio.to_thread.run_sync(started.wait)
+            tg.start_soon(scheduler.run, "client", lambda: None)
+            await anyio.sleep(0.05)
+            assert scheduler.stats()["waiting"] == 1
+            tg.cancel_scope.cancel()
+        #: with a cancel event the thread is abandoned: its slot is freed at once and the scrape told to stop
+        assert cancel.is_set() and scheduler.stats() == {"active": 0, "waiting": 0, "clients": 0}
+        assert await scheduler.run("client", lambda: "next") == "next"
+
+    anyio.run(run)
+    release.set()
+
+    #: without one, cancelling waits for the function to return
+    finished = threading.Event()
+
+    def uncancellable():
+        time.sleep(0.1)
+        finished.set()
+
+    async def run_uncancellable():
+        with anyio.move_on_after(0.01):
+            await scheduler.run("client", uncancellable)
+        return finished.is_set()
+
+    assert anyio.run(run_uncancellable)
+
+
+class FakeContext:
+    """Context of an MCP request, recording the notifications sent."""
+
+    def __init__(self):
+        self.request_context = object()
+        self.notifications = []
+
+    async def report_progress(self, progress, total, message):
+        self.notifications.append(("progress", progress, total, message))
+
+    async def log(self, level, data, logger_name=None):
+        self.notifications.append(("log", logger_name, json.loads(data)))
+
+
+def test_progress_reporter():
+    from homeharvest import ScrapeCancelled
+    from homeharvest.core.scrapers import ScrapeProgress
+
+    ctx, result = FakeContext(), server.StoredResult(["id"])
+    rows = [{"id": 1}, {"id": 2}]
+
+    async def run():
+        async with BlockingPortal() as portal:
+            report = server._progress_reporter(ctx, portal, "h", result, stream_partial=True)
+            with pytest.MonkeyPatch.context() as patched:
+                patched.setattr(server, "_to_rows", lambda properties, fields: properties)
+                for event in [
+                    ScrapeProgress(stage="page", completed=1, total=2, properties=rows[:1]),
+                    ScrapeProgress(stage="details", completed=1, total=2),
+                    ScrapeProgress(stage="page", completed=2, total=2, properties=rows[1:]),
+                ]:
+                    await anyio.to_thread.run_sync(report, event)
+
+                result.cancel.set()
+                with pytest.raises(ScrapeCancelled):
+                    await anyio.to_thread.run_sync(report, ScrapeProgress(stage="details", completed=2, total=2))
+
+    anyio.run(run)
+    assert result.rows == rows
+    progress = [notification for notification in ctx.notifications if notification[0] == "progress"]
+    assert [(events, total) for _, events, total, _ in progress] == [(1, 4), (2, 4), (3, 4)]
+    assert progress[2][3] == "page 2/2, 2 rows so far (handle h)"
+    logs = [notification[2] for notification in ctx.notifications if notification[0] == "log"]
+    assert logs == [{"handle": "h", "page": 1, "rows": rows[:1]}, {"handle": "h", "page": 2, "rows": rows[1:]}]
+
+
+def test_summarize_market(tools):
+    from homeharvest import scrape_property
+
+    ctx = tools.mcp.get_context()
+    summary = call(tools.summarize_market, ctx, "Dallas, TX", group_by="zip_code", limit=400)
+    df = scrape_property("Dallas, TX", limit=400)
+    assert summary["total"] == 400 and summary["price_field"] == "list_price"
+    assert summary["overall"]["count"] == 400
+
+    def median(values):
+        return round(float(values.astype(float).median()), 2)
+
+    assert summary["overall"]["median_price"] == median(df["list_price"])
+
+    expected = {
+        zip_code: (len(group), median(group["list_price"]), median(group["price_per_sqft"]))
+        for zip_code, group in df.groupby("zip_code")
+    }
+    assert len(expected) > 1
+    assert {
+        group["zip_code"]: (group["count"], group["median_price"], group["median_price_per_sqft"])
+        for group in summary["groups"]
+    } == expected
+    #: largest groups first
+    assert [group["count"] for group in summary["groups"]] == sorted(
+        (count for count, *_ in expected.values()), reverse=True
+    )
+
+    by_beds = call(tools.summarize_market, ctx, "Dallas, TX", group_by="beds", limit=400)
+    assert sum(group["count"] for group in by_beds["groups"]) == 400
+    assert call(tools.summarize_market, ctx, "Dallas, TX", group_by="price")["error"] == "invalid group_by"
+
+
+def test_prefetch_cache(tools, synthetic, monkeypatch, tmp_path):
+    from homeharvest import scrape_property
+
+    cache = tools._prefetch_cache(str(tmp_path))
+    monkeypatch.setattr(tools, "prefetch_cache", cache)
+    assert cache.max_age == 2 * tools.PREFETCH_INTERVAL
+    prefetched = scrape_property("Dallas, TX", limit=50, return_type="lazy")
+    cache.put("Dallas, TX", "for_sale", prefetched)
+
+    ctx = tools.mcp.get_context()
+    requests = synthetic.requests
+    raw = call(tools.scrape_properties, ctx, " dallas,  TX", limit=20, page_size=20)
+    table = call(tools.scrape_properties, ctx, "Dallas, TX", format="table", fields=["property_id"], page_size=50)
+    #: served from the prefetched market, without a request
+    assert synthetic.requests == requests
+    assert [row["property_id"] for row in raw["rows"]] == [prop.property_id for prop in prefetched[:20]]
+    assert table["columns"]["property_id"] == [prop.property_id for prop in prefetched]
+
+    #: another worker reads the market from the shared directory
+    other = tools._prefetch_cache(str(tmp_path))
+    assert [prop.property_id for prop in other.get("Dallas, TX")] == [prop.property_id for prop in prefetched]
+
+    #: other filters, other listing types and markets older than two intervals are scraped live
+    call(tools.scrape_properties, ctx, "Dallas, TX", past_days=7, limit=20)
+    assert synthetic.requests > requests
+    assert cache.get("Dallas, TX", "sold") is None
+
+    key = cache._key("Dallas, TX", "for_sale")
+    for age, served in [(cache.max_age - 5, True), (cache.max_age + 1, False)]:
+        fetched_at = time.time() - age
+        cache._entries[key] = (fetched_at, prefetched)
+        os.utime(cache._path(key), (fetched_at, fetched_at))
+        assert (cache.get("Dallas, TX") is not None) == served
+    requests = synthetic.requests
+    assert call(tools.scrape_properties, ctx, "Dallas, TX", limit=20)["total"] == 20
+    assert synthetic.requests > requests
@@ -1,5 +1,11 @@
-from homeharvest import scrape_property, Property
+from homeharvest import scrape_property, Property, CompactProperty, LazyProperty
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+import json
+import pytest
+import subprocess
+import time
+import sys
 
 
 def test_realtor_pending_or_contingent():
@@ -446,4 +452,849 @@ def test_pending_date_filtering():
             
             # We should get at least one of each type (when available)
             total_properties = pending_count + contingent_count
-            assert total_properties > 0, "Should find at least some pending or contingent properties"
\ No newline at end of file
+            assert total_properties > 0, "Should find at least some pending or contingent properties"
+
+
+def test_compact_return_type():
+    pydantic_results = scrape_property(
+        location="Surprise, AZ", listing_type="for_rent", limit=100, return_type="pydantic"
+    )
+    compact_results = scrape_property(
+        location="Surprise, AZ", listing_type="for_rent", limit=100, return_type="compact"
+    )
+
+    assert len(compact_results) > 0
+    assert all(isinstance(result, CompactProperty) for result in compact_results)
+
+    pydantic_ids = {prop.property_id for prop in pydantic_results}
+    compact_row = next(prop for prop in compact_results if prop.property_id in pydantic_ids)
+    pydantic_row = next(prop for prop in pydantic_results if prop.property_id == compact_row.property_id)
+
+    assert compact_row.address.city == pydantic_row.address.city
+    assert compact_row.address.formatted_address == pydantic_row.address.formatted_address
+    assert compact_row.property_url == str(pydantic_row.property_url)
+
+
+def test_lazy_return_type():
+    lazy_results = scrape_property(location="Surprise, AZ", listing_type="for_sale", limit=50, return_type="lazy")
+
+    assert len(lazy_results) > 0
+    assert all(isinstance(result, LazyProperty) for result in lazy_results)
+
+    lazy_row = lazy_results[0]
+    assert lazy_row.property_id == lazy_row.raw["property_id"]
+    assert isinstance(lazy_row.to_property(), Property)
+    assert lazy_row.to_property().address == lazy_row.address
+
+
+def test_lazy_return_type_offline(synthetic):
+    pydantic_results = scrape_property(location="Dallas, TX", limit=200, return_type="pydantic")
+    lazy_results = scrape_property(location="Dallas, TX", limit=200, return_type="lazy")
+    assert all(isinstance(result, LazyProperty) for result in lazy_results)
+
+    lazy_row = lazy_results[0]
+    assert "list_price" not in vars(lazy_row) and "description" not in vars(lazy_row)
+    assert lazy_row.list_price == lazy_row.raw["list_price"]
+    assert "list_price" in vars(lazy_row) and "description" not in vars(lazy_row)  #: only read fields are parsed
+
+    by_id = {prop.property_id: prop for prop in pydantic_results}
+    assert {row.property_id for row in lazy_results} == set(by_id)
+    for row in lazy_results:
+        assert row.description == by_id[row.property_id].description
+        assert row.to_property().model_dump(exclude={"days_on_mls"}) == by_id[row.property_id].model_dump(
+            exclude={"days_on_mls"}
+        )
+
+
+def test_progress_event_order(synthetic):
+    events = []
+    results = scrape_property(location="Dallas, TX", limit=400, return_type="lazy", progress_callback=events.append)
+
+    pages = [event for event in events if event.stage == "page"]
+    details = [event for event in events if event.stage == "details"]
+    assert [event.completed for event in pages] == [1, 2]
+    assert [event.completed for event in details] == [1, 2]
+    assert [event.total for event in pages] == [2, 2]
+    assert {event.found for event in pages} == {600}
+
+    #: a page is reported after the details of its rows are in
+    seen_details = 0
+    for event in events:
+        if event.stage == "details":
+            seen_details += 1
+        else:
+            assert event.completed <= seen_details
+
+    streamed = [prop.property_id for event in pages for prop in event.properties]
+    assert sorted(streamed) == sorted(prop.property_id for prop in results)
+
+
+def test_coalesced_scrapes():
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [
+            executor.submit(scrape_property, location=location, listing_type="sold", past_days=30, return_type="raw")
+            for location in ["Phoenix, AZ", "phoenix, az", " Phoenix,  AZ"]
+        ]
+        results = [future.result() for future in futures]
+
+    assert len(results[0]) > 0
+    assert results[0] == results[1] == results[2]
+    assert results[0] is not results[1]
+
+
+def test_import_time():
+    #: pandas and the optional backends are only imported by the code paths that use them
+    script = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import homeharvest\n"
+        "print(time.perf_counter() - start)\n"
+        "print(','.join(m for m in ('pandas', 'numpy', 'multiprocessing', 'homeharvest.core.scrapers.compact') if m in sys.modules))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout.split(
+        "\n"
+    )
+
+    assert output[1] == ""
+    assert float(output[0]) < 1.0
+
+
+def test_write_properties(tmp_path):
+    from homeharvest.writers import write_properties
+
+    path = tmp_path / "properties.jsonl"
+    rows = write_properties(str(path), "jsonl", location="Surprise, AZ", listing_type="for_rent", limit=250)
+
+    lines = path.read_text().splitlines()
+    assert rows > 0
+    assert len(lines) == rows
+    assert json.loads(lines[0])["property_url"]
+
+
+def test_batch_resume(tmp_path):
+    import os
+
+    from homeharvest.batch import market_path, run_batch
+
+    markets = [("Surprise, AZ", "for_rent"), ("Surprise, AZ", "sold")]
+    counts = run_batch(markets, str(tmp_path), "csv", concurrency=2, limit=100, past_days=30)
+    assert counts == {"done": 2, "failed": 0, "skipped": 0}
+    assert os.path.exists(market_path(str(tmp_path), "Surprise, AZ", "for_rent", "csv"))
+
+    counts = run_batch(markets, str(tmp_path), "csv", concurrency=2, limit=100, past_days=30)
+    assert counts == {"done": 0, "failed": 0, "skipped": 2}
+
+
+def test_record_replay(tmp_path):
+    from homeharvest.core import transport
+    from homeharvest.core.scrapers.realtor import RealtorScraper
+
+    transport.record(str(tmp_path))
+    try:
+        recorded = scrape_property(location="Surprise, AZ", listing_type="for_rent", limit=100, coalesce=False)
+    finally:
+        transport.reset()
+
+    RealtorScraper._location_cache.clear()
+    transport.replay(str(tmp_path))
+    try:
+        replayed = scrape_property(location="Surprise, AZ", listing_type="for_rent", limit=100, coalesce=False)
+    finally:
+        transport.reset()
+
+    assert len(recorded) > 0
+    assert recorded["property_url"].tolist() == replayed["property_url"].tolist()
+
+
+def test_scrape_stats():
+    from homeharvest import ScrapeStats
+    from homeharvest.core.metrics import PrometheusSink, add_sink, remove_sink
+
+    sink = add_sink(PrometheusSink())
+    stats = ScrapeStats()
+    try:
+        result = scrape_property(
+            location="Surprise, AZ", listing_type="for_rent", limit=250, stats=stats, coalesce=False
+        )
+    finally:
+        remove_sink(sink)
+
+    assert stats.rows == len(result)
+    assert stats.stages["search"].status_codes.get(200)
+    assert stats.stages["search"].bytes > 0
+    assert "result" in stats.stages
+    assert 'homeharvest_stage_seconds_count{stage="search"}' in sink.render()
+
+
+def test_tracing_spans():
+    sdk_trace = pytest.importorskip("opentelemetry.sdk.trace")
+    from opentelemetry import trace
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    exporter = InMemorySpanExporter()
+    provider = sdk_trace.TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+    scrape_property(location="Surprise, AZ", listing_type="for_rent", limit=450, coalesce=False)
+
+    spans = exporter.get_finished_spans()
+    names = {span.context.span_id: span.name for span in spans}
+    assert len({span.context.trace_id for span in spans}) == 1
+    pages = [span for span in spans if span.name == "homeharvest.search_page"]
+    assert pages and all(names[span.parent.span_id] == "homeharvest.scrape" for span in pages)
+
+
+def test_profile_mode():
+    from homeharvest import ScrapeStats
+
+    stats = ScrapeStats()
+    result = scrape_property(location="Surprise, AZ", listing_type="for_rent", limit=250, profile=True, stats=stats)
+
+    assert len(result) > 0
+    stage_seconds = stats.profile.stage_seconds()
+    assert stage_seconds["process_property"] > 0
+    assert "CPU time per stage" in stats.profile.report()
+
+
+def test_memory_budget_spill():
+    from homeharvest.core.spill import SpilledResults
+
+    in_memory = scrape_property(
+        location="Phoenix, AZ", listing_type="for_rent", return_type="raw", limit=1000, coalesce=False
+    )
+    spilled = scrape_property(
+        location="Phoenix, AZ", listing_type="for_rent", return_type="raw", limit=1000, coalesce=False, memory_budget=1
+    )
+
+    assert isinstance(spilled, SpilledResults)
+    assert len(spilled) == len(in_memory)
+    assert sorted(prop["property_id"] for prop in spilled) == sorted(prop["property_id"] for prop in in_memory)
+    assert spilled[-1]["property_id"]
+
+    spilled.close()
+
+
+def test_property_store(tmp_path):
+    from homeharvest import PropertyStore
+
+    with PropertyStore(str(tmp_path / "homes.sqlite")) as store:
+        scraped = scrape_property(
+            location="Phoenix, AZ", listing_type="for_sale", limit=400, coalesce=False, store=store
+        )
+        stored = scrape_property(
+            location="Phoenix, AZ", listing_type="for_sale", limit=400, coalesce=False, store=store, max_age=3600
+        )
+
+        assert len(stored) == len(scraped) > 0
+        assert list(stored["property_id"]) == list(scraped["property_id"])
+        assert store.execute("SELECT COUNT(*) AS n FROM scrapes")[0]["n"] == 1
+
+        zip_code = scraped["zip_code"].dropna().iloc[0]
+        homes = store.query(zip_code=zip_code, return_type="pydantic")
+        assert homes and all(home.address.zip == zip_code for home in homes)
+
+
+def test_incremental_scrape(tmp_path):
+    from homeharvest import PropertyStore
+    from homeharvest.core.metrics import ScrapeStats
+
+    with PropertyStore(str(tmp_path / "homes.sqlite")) as store:
+        full = scrape_property(location="Phoenix, AZ", listing_type="for_sale", limit=400, coalesce=False, store=store)
+
+        stats = ScrapeStats()
+        incremental = scrape_property(
+            location="Phoenix, AZ",
+            listing_type="for_sale",
+            limit=400,
+            coalesce=False,
+            store=store,
+            incremental=True,
+            stats=stats,
+        )
+
+        assert len(incremental) == len(full) > 0
+        assert set(incremental["property_id"]) == set(full["property_id"])
+        #: listings rarely change between two scrapes seconds apart, most rows are reused as saved
+        assert stats.stages["delta"].items > len(full) // 2
+        assert stats.stages["process"].items < len(full) // 2
+
+
+def test_change_feed(tmp_path):
+    from homeharvest.changes import ChangeIndex, scrape_changes
+
+    with ChangeIndex(str(tmp_path / "changes.sqlite")) as index:
+        #: the first scrape of a market records its state, the second one compares with it
+        assert list(scrape_changes(index, "Phoenix, AZ", listing_type="for_sale", limit=400, coalesce=False)) == []
+        events = list(scrape_changes(index, "Phoenix, AZ", listing_type="for_sale", limit=400, coalesce=False))
+
+        assert all(
+            event.type in ("new_listing", "price_change", "status_change", "sold", "delisted") for event in events
+        )
+        assert len(events) < 400
+
+
+def test_watcher():
+    from homeharvest.watch import Watcher
+
+    found = []
+    watcher = Watcher(
+        [("Phoenix, AZ", "for_sale")], lambda market, prop: found.append(prop), min_interval=1, max_interval=10
+    )
+    market = watcher.markets[0]
+
+    #: the first poll records the newest listings without reporting them, the next ones stop at them
+    assert watcher.poll(market) == []
+    assert len(market.seen) > 0
+    new = watcher.poll(market)
+
+    assert new == found
+    assert len({prop.property_id for prop in new}) == len(new)
+    assert 1 <= market.interval <= 10
+
+
+def test_process_pools_per_worker_count():
+    from homeharvest.core.scrapers.realtor.workers import get_process_pool, split_batches
+
+    pool = get_process_pool(1)
+    #: a scrape asking for another worker count must not shut down the pool of a running one
+    assert get_process_pool(2) is not pool
+    assert get_process_pool(1) is pool
+    assert pool.submit(split_batches, [1, 2, 3], 2).result() == [[1, 2], [3]]
+
+
+def test_process_pool_rows_match_threads(synthetic):
+    def scrape(return_type, parse_processes=None):
+        return scrape_property(
+            location="Dallas, TX", limit=400, return_type=return_type, parse_processes=parse_processes, coalesce=False
+        )
+
+    def rows(df):
+        return df.drop(columns="days_on_mls").sort_values("property_id", ignore_index=True)
+
+    pd.testing.assert_frame_equal(rows(scrape("pandas", 2)), rows(scrape("pandas")))
+
+    def dumps(results):
+        return sorted((prop.model_dump(exclude={"days_on_mls"}) for prop in results), key=lambda row: row["property_id"])
+
+    assert dumps(scrape("pydantic", 2)) == dumps(scrape("pydantic"))
+
+
+def test_scrape_key():
+    from homeharvest.core.scrapers import ScraperInput
+    from homeharvest.core.scrapers.models import ListingType, SearchPropertyType
+    from homeharvest.core.singleflight import scrape_key
+
+    def key(location, property_types, **kwargs):
+        return scrape_key(
+            ScraperInput(
+                location=location,
+                listing_type=ListingType.FOR_SALE,
+                property_type=[SearchPropertyType[property_type.upper()] for property_type in property_types],
+                **kwargs,
+            )
+        )
+
+    assert key("Dallas, TX", ["land", "condos"]) == key(" dallas,  tx", ["condos", "land"])
+    assert key("Dallas, TX", ["land", "condos"]) == key("Dallas, TX", ["land", "condos"], proxy="http://proxy:8080")
+    assert key("Dallas, TX", ["land", "condos"]) != key("Dallas, TX", ["land"])
+    assert hash(key("Dallas, TX", ["land", "condos"]))
+
+
+def test_single_flight():
+    import threading
+    from homeharvest.core.singleflight import SingleFlight
+
+    flights = SingleFlight(memo_ttl=60)
+    started, release = threading.Event(), threading.Event()
+    calls, leader_events, joiner_events = [], [], []
+
+    def scrape(progress):
+        calls.append(1)
+        progress("page 1")
+        started.set()
+        release.wait(5)
+        progress("page 2")
+        return ["home"]
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        leader = executor.submit(flights.do, "key", scrape, leader_events.append)
+        started.wait(5)
+        #: a caller joining late first gets the events it missed, then shares the result
+        joiner = threading.Thread(target=lambda: joiner_events.append(flights.do("key", scrape, joiner_events.append)))
+        joiner.start()
+        while not flights._flights["key"].subscribers[1:]:
+            time.sleep(0.01)
+        release.set()
+        joiner.join(5)
+        result = leader.result(5)
+
+    assert calls == [1]
+    assert leader_events == ["page 1", "page 2"]
+    assert joiner_events == ["page 1", "page 2", result]
+    #: memoized for identical calls right after
+    assert flights.do("key", scrape) is result
+    assert calls == [1]
+
+    failing, joined = threading.Event(), threading.Event()
+
+    def fail(progress):
+        failing.set()
+        joined.wait(5)
+        raise ValueError("search failed")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(flights.do, "other", fail)
+        failing.wait(5)
+        joiner = executor.submit(flights.do, "other", fail)
+        while not flights._flights["other"].subscribers[1:]:
+            time.sleep(0.01)
+        joined.set()
+        #: the error of the shared call is raised to every caller
+        for future in (leader, joiner):
+            with pytest.raises(ValueError):
+                future.result(5)
+    #: errors aren't memoized
+    assert flights.do("other", lambda progress: ["retried"]) == ["retried"]
+
+
+def test_format_date_columns():
+    from datetime import date, datetime, timedelta, timezone
+
+    from homeharvest.utils import date_properties, format_date_columns
+
+    eastern = timezone(timedelta(hours=-5))
+    rows = [
+        #: a column mixing aware and naive dates, or time zones, is only partly parsed in bulk by pandas
+        [datetime(2024, 1, 2, 23, 0, tzinfo=eastern), datetime(2024, 3, 4, 12, 0), date(2024, 5, 6)],
+        [datetime(2024, 7, 8, 1, 0, tzinfo=timezone.utc), datetime(2024, 9, 10, 22, 0, tzinfo=eastern), None],
+        [None, None, None],
+    ]
+    df = pd.DataFrame([dict(zip(date_properties, row)) for row in rows], columns=date_properties, dtype=object)
+    formatted = format_date_columns(df.copy())
+    #: each date in its own time zone, like the per-row formatting of flatten_property
+    assert formatted.values.tolist() == [
+        ["2024-01-02", "2024-03-04", "2024-05-06"],
+        ["2024-07-08", "2024-09-10", None],
+        [None, None, None],
+    ]
+
+
+def test_single_reference_time(synthetic, monkeypatch):
+    from homeharvest.core.scrapers.realtor import processors
+
+    calculate_days_on_mls, references = processors.calculate_days_on_mls, set()
+
+    def recording_days_on_mls(result, now=None):
+        references.add(now)
+        return calculate_days_on_mls(result, now=now)
+
+    monkeypatch.setattr(processors, "calculate_days_on_mls", recording_days_on_mls)
+    homes = scrape_property(location="Dallas, TX", limit=400, return_type="pydantic")
+    #: every row of a scrape counts its days on the market against the same instant
+    assert len(homes) == 400 and len(references) == 1 and None not in references
+
+
+def test_json_backends(monkeypatch):
+    from datetime import datetime
+    from importlib.util import find_spec
+
+    from homeharvest.core import jsonlib
+
+    monkeypatch.setattr(jsonlib, "_backend", jsonlib.get_backend())
+    installed = {name for name in ("orjson", "simdjson") if find_spec(name)}
+    names = ["json", *sorted(installed)]
+    for name in names:
+        backend = jsonlib.set_backend(name)
+        assert backend.name == name and jsonlib.get_backend() is backend
+        assert jsonlib.loads(b'{"a": [1, "\xc3\xa9"]}') == {"a": [1, "\u00e9"]}
+        #: callers retry on json.JSONDecodeError, whichever backend decodes
+        with pytest.raises(json.JSONDecodeError):
+            jsonlib.loads(b'{"a": ')
+
+        value = {"when": datetime(2024, 1, 2, 3, 4), "na": pd.NA, "count": pd.Series([3]).iloc[0], "name": "\u00e9"}
+        expected = {"when": "2024-01-02T03:04:00", "na": None, "count": 3, "name": "\u00e9"}
+        assert json.loads(jsonlib.dumps(value)) == expected
+        assert jsonlib.dumpb([1]) == b"[1]"
+
+    with pytest.raises(ValueError):
+        jsonlib.set_backend("ujson")
+
+    #: without orjson, the fastest installed backend is picked, down to the standard library
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    assert jsonlib.set_backend().name == ("simdjson" if "simdjson" in installed else "json")
+    monkeypatch.setitem(sys.modules, "simdjson", None)
+    assert jsonlib.set_backend().name == "json"
+
+
+def test_json_backend_environment():
+    import os
+
+    script = "from homeharvest.core import jsonlib; print(jsonlib.get_backend().name)"
+    env = {**os.environ, "HOMEHARVEST_JSON_BACKEND": "json"}
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True, env=env)
+    assert output.stdout.strip() == "json"
+
+
+def test_compact_return_type_offline(synthetic):
+    import pickle
+
+    df = scrape_property(location="Dallas, TX", limit=400)
+    compact_results = scrape_property(location="Dallas, TX", limit=400, return_type="compact")
+    assert len(compact_results) == len(df) == 400
+    assert all(isinstance(result, CompactProperty) for result in compact_results)
+
+    def columns(prop) -> dict:
+        agent = prop.advertisers.agent if prop.advertisers else None
+        return {
+            "property_url": prop.property_url,
+            "status": prop.status,
+            "zip_code": prop.address.zip,
+            "formatted_address": prop.address.formatted_address,
+            "list_price": prop.list_price,
+            "list_date": prop.list_date.strftime("%Y-%m-%d") if prop.list_date else None,
+            "beds": prop.description.beds,
+            "full_baths": prop.description.baths_full,
+            "sqft": prop.description.sqft,
+            "style": prop.description.style.value if prop.description.style else None,
+            "latitude": prop.latitude,
+            "county": prop.county,
+            "agent_name": agent.name if agent else None,
+            "days_on_mls": prop.days_on_mls,
+        }
+
+    fields = list(columns(compact_results[0]))
+    rows = df.set_index("property_id")[fields].astype(object)
+    expected = rows.where(rows.notna(), None).to_dict("index")
+    assert {prop.property_id: columns(prop) for prop in compact_results} == expected
+    #: records come back from worker processes pickled
+    assert pickle.loads(pickle.dumps(compact_results[:10])) == compact_results[:10]
+
+
+def test_location_cache_size(monkeypatch):
+    from collections import OrderedDict
+    from homeharvest.core.scrapers import ScraperInput
+    from homeharvest.core.scrapers.models import ListingType
+    from homeharvest.core.scrapers.realtor import RealtorScraper
+
+    resolved = []
+    monkeypatch.setattr(RealtorScraper, "_location_cache", OrderedDict())
+    monkeypatch.setattr(RealtorScraper, "LOCATION_CACHE_SIZE", 2)
+    monkeypatch.setattr(
+        RealtorScraper, "_resolve_location", lambda self: resolved.append(self.location) or {"city": self.location}
+    )
+
+    def resolve(location):
+        RealtorScraper(ScraperInput(location=location, listing_type=ListingType.FOR_SALE)).handle_location()
+
+    for location in ["Austin, TX", "Dallas, TX", "Austin, TX", "Tulsa, OK", "Austin, TX", "Dallas, TX"]:
+        resolve(location)
+
+    #: the least recently used location is dropped first
+    assert resolved == ["Austin, TX", "Dallas, TX", "Tulsa, OK", "Dallas, TX"]
+    assert len(RealtorScraper._location_cache) == 2
+
+
+def test_property_writers(tmp_path, synthetic):
+    import csv
+    from homeharvest.writers import PropertyWriter, write_properties
+
+    rows = write_properties(str(tmp_path / "homes.jsonl"), "jsonl", location="Dallas, TX", limit=400)
+    lines = (tmp_path / "homes.jsonl").read_text().splitlines()
+    assert rows == len(lines) > 0
+    assert json.loads(lines[0])["property_id"]
+
+    rows = write_properties(str(tmp_path / "homes.csv"), "csv", location="Dallas, TX", limit=400)
+    with open(tmp_path / "homes.csv", newline="") as f:
+        assert rows == len(list(csv.DictReader(f)))
+
+    class UnfinishedWriter(PropertyWriter):
+        def close(self) -> None:
+            pass
+
+    #: a writer missing write_rows fails when it's created, not on the first page of a scrape
+    with pytest.raises(TypeError):
+        UnfinishedWriter(str(tmp_path / "homes.txt"))
+
+
+def test_batch_journal(tmp_path, synthetic):
+    import os
+
+    from homeharvest.batch import Journal, market_path, run_batch
+
+    journal = Journal(str(tmp_path / "journal.jsonl"))
+    journal.record("Dallas, TX", "for_sale", "done", rows=10)
+    journal.record("Phoenix, AZ", "for_sale", "done", rows=10)
+    journal.record("Phoenix, AZ", "for_sale", "failed", error="timeout")
+    with open(journal.path, "ab") as f:
+        f.write(b'{"location": "Tulsa, OK", "listing')  #: torn by an interrupted run
+    #: the last entry of a market wins, and a torn line is skipped
+    assert journal.completed() == {("Dallas, TX", "for_sale")}
+
+    markets = [("Dallas, TX", "for_sale"), ("Phoenix, AZ", "sold")]
+    output_dir = tmp_path / "batch"
+    assert run_batch(markets, str(output_dir), "jsonl", limit=200) == {"done": 2, "failed": 0, "skipped": 0}
+    assert os.path.exists(market_path(str(output_dir), "Phoenix, AZ", "sold", "jsonl"))
+    assert run_batch(markets, str(output_dir), "jsonl", limit=200) == {"done": 0, "failed": 0, "skipped": 2}
+
+
+def test_market_path():
+    import os
+
+    from homeharvest.batch import market_path
+
+    path = market_path("out", "St. Louis, MO", "for_sale", "csv")
+    assert os.path.dirname(path) == os.path.join("out", "listing_type=for_sale")
+    assert os.path.basename(path).startswith("st_louis_mo_") and path.endswith(".csv")
+    #: same slug, distinct markets
+    assert market_path("out", "St Louis, MO", "for_sale", "csv") != path
+    assert market_path("out", "St. Louis, MO", "for_sale", "csv") == path
+
+
+def test_prometheus_sink(synthetic):
+    from homeharvest.core.metrics import PrometheusSink, ScrapeStats, add_sink, remove_sink
+
+    sink = add_sink(PrometheusSink(buckets=(0.1, 1.0)))
+    try:
+        stats = ScrapeStats()
+        stats.record("search", 0.05, bytes=1000, status=200)
+        stats.record("search", 0.5, bytes=500, retries=1, status=429)
+        stats.record("process", 2.0, items=200)
+        stats.finish(200)
+
+        text = sink.render()
+        #: histogram buckets are cumulative
+        assert 'homeharvest_stage_seconds_bucket{stage="search",le="0.1"} 1' in text
+        assert 'homeharvest_stage_seconds_bucket{stage="search",le="1.0"} 2' in text
+        assert 'homeharvest_stage_seconds_bucket{stage="process",le="1.0"} 0' in text
+        assert 'homeharvest_stage_seconds_bucket{stage="process",le="+Inf"} 1' in text
+        assert 'homeharvest_responses_total{stage="search",status="429"} 1' in text
+        assert 'homeharvest_response_bytes_total{stage="search"} 1500' in text
+        assert 'homeharvest_retries_total{stage="search"} 1' in text
+        assert "homeharvest_rows_total 200" in text
+
+        scraped = ScrapeStats()
+        result = scrape_property(location="Dallas, TX", limit=400, stats=scraped, coalesce=False)
+    finally:
+        remove_sink(sink)
+
+    text = sink.render()
+    assert "homeharvest_scrapes_total 2" in text
+    assert f"homeharvest_rows_total {200 + len(result)}" in text
+    assert scraped.stages["search"].status_codes[200] == scraped.stages["search"].count
+
+
+def test_profiler(synthetic):
+    from homeharvest import ScrapeStats
+
+    stats = ScrapeStats()
+    result = scrape_property(location="Dallas, TX", limit=400, profile=True, stats=stats, return_type="pydantic")
+
+    #: the parsing runs on pool threads, which are profiled too
+    assert len(result) > 0
+    assert stats.profile.stage_seconds()["process_property"] > 0
+    assert "Top 15 functions by own CPU time" in stats.profile.report()
+
+
+def test_spill_buffer(tmp_path):
+    import os
+    from homeharvest.core.spill import SpillBuffer, SpilledResults
+
+    pages = [[{"property_id": str(page * 10 + row)} for row in range(10)] for page in range(5)]
+    buffer = SpillBuffer(budget=1, directory=str(tmp_path))
+    in_memory = [row for page in pages for row in buffer.add(page)]
+    results = buffer.results(in_memory)
+
+    assert isinstance(results, SpilledResults)
+    assert len(results) == 50 and buffer.spilled_rows == 50
+    assert [row["property_id"] for row in results] == [str(i) for i in range(50)]
+    assert results[-1] == {"property_id": "49"} and results[12:14] == pages[1][2:4]
+    with pytest.raises(IndexError):
+        results[50]
+
+    results.close()
+    assert not os.path.exists(results.path)
+    #: under budget, the pages stay in memory as a plain list
+    buffer = SpillBuffer(budget=10**9)
+    rows = [row for page in pages for row in page]
+    assert buffer.results([row for page in pages for row in buffer.add(page)]) == rows
+
+
+def test_memory_budget_not_coalesced(synthetic):
+    import os
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(scrape_property, location="Dallas, TX", return_type="raw", memory_budget=1)
+            for _ in range(2)
+        ]
+        first, second = [future.result() for future in futures]
+
+    #: every caller gets its own spill file, closing one leaves the other readable
+    assert first.path != second.path
+    first.close()
+    assert os.path.exists(second.path)
+    assert len(list(second)) == len(second) > 0
+    second.close()
+
+
+def test_property_store_offline(tmp_path, synthetic):
+    from homeharvest import PropertyStore
+
+    with PropertyStore(str(tmp_path / "homes.sqlite")) as store:
+        scraped = scrape_property(location="Dallas, TX", limit=400, return_type="pydantic", store=store)
+        #: a repeat right away would be memoized by coalescing, store scrapes are never shared so it's saved too
+        again = scrape_property(location="Dallas, TX", limit=400, return_type="pydantic", store=store)
+        scrapes = store.execute("SELECT id, rows FROM scrapes ORDER BY id")
+        assert [scrape["rows"] for scrape in scrapes] == [len(scraped), len(again)]
+
+        requests = synthetic.requests
+        stored = scrape_property(location="dallas, tx", limit=400, return_type="pydantic", store=store, max_age=60)
+        assert synthetic.requests == requests
+        assert sorted(home.property_id for home in stored) == sorted(home.property_id for home in scraped)
+
+        #: scraped in no particular order, a few of the synthetic listings are pending
+        home = next(home for home in scraped if home.status == "FOR_SALE")
+        homes = store.query(zip_code=home.address.zip, status="for_sale", return_type="pydantic")
+        assert home.property_id in {match.property_id for match in homes}
+        assert all(match.address.zip == home.address.zip for match in homes)
+
+        prices = sorted(home.list_price for home in scraped)
+        cheap = store.query(max_price=prices[len(prices) // 2], return_type="pydantic")
+        assert len(cheap) >= len(prices) // 2 and all(home.list_price <= prices[len(prices) // 2] for home in cheap)
+        assert len(store.query(limit=5)) == 5
+
+    #: stores opened per call (which may reuse the id of a closed one) each get the scrape saved
+    for name in ("first.sqlite", "second.sqlite"):
+        scrape_property(location="Dallas, TX", limit=200, return_type="pydantic", store=str(tmp_path / name))
+        with PropertyStore(str(tmp_path / name)) as store:
+            assert store.execute("SELECT rows FROM scrapes")[0]["rows"] == 200
+
+
+def test_incremental_scrape_offline(tmp_path, synthetic):
+    from homeharvest import PropertyStore
+    from homeharvest.core.metrics import ScrapeStats
+
+    with PropertyStore(str(tmp_path / "homes.sqlite")) as store:
+        full = scrape_property(location="Dallas, TX", limit=400, return_type="pydantic", store=store)
+        #: ten listings changed since they were saved
+        store.execute(
+            "UPDATE listings SET fingerprint = 'stale' WHERE property_id IN (SELECT property_id FROM listings LIMIT 10)"
+        )
+
+        stats = ScrapeStats()
+        incremental = scrape_property(
+            location="Dallas, TX", limit=400, return_type="pydantic", store=store, incremental=True, stats=stats
+        )
+
+    assert sorted(home.property_id for home in incremental) == sorted(home.property_id for home in full)
+    assert stats.stages["delta"].items == len(full) - 10
+    assert stats.stages["process"].items == 10
+    prices = {home.property_id: home.list_price for home in full}
+    assert {home.property_id: home.list_price for home in incremental} == prices
+
+
+def test_change_index(synthetic):
+    from homeharvest.changes import ChangeIndex, scrape_changes
+
+    homes = scrape_property(location="Dallas, TX", limit=200, return_type="pydantic")
+    with ChangeIndex(":memory:") as index:
+        market = index.begin("Dallas, TX", "for_sale", {})
+        events, states = index.diff(market, homes)
+        assert events == []  #: the first scrape of a market is its baseline
+        index.update(states)
+        index.finish(market, complete=True)
+
+        repriced = homes[0].model_copy(update={"list_price": homes[0].list_price + 1000})
+        sold = homes[1].model_copy(update={"status": "SOLD"})
+        listed = homes[2].model_copy(update={"property_id": "1"})
+        market = index.begin(" dallas,  tx", "for_sale", {"proxy": "http://proxy:8080"})
+        events, states = index.diff(market, [repriced, sold, listed, *homes[3:-1]])
+        index.update(states)
+
+        assert {(event.type, event.property_id) for event in events} == {
+            ("price_change", repriced.property_id),
+            ("sold", sold.property_id),
+            ("new_listing", "1"),
+        }
+        assert events[0].previous_price == homes[0].list_price and events[0].location == " dallas,  tx"
+        delisted = index.delisted(market)
+        assert {event.property_id for event in delisted} == {homes[2].property_id, homes[-1].property_id}
+        index.finish(market, complete=True)
+        #: delisted properties are dropped from the state, a relisting is new again
+        events, _ = index.diff(index.begin("Dallas, TX", "for_sale", {}), [homes[-1]])
+        assert [event.type for event in events] == ["new_listing"]
+
+    with ChangeIndex(":memory:") as index:
+        assert list(scrape_changes(index, "Dallas, TX", limit=400)) == []
+        #: unchanged listings produce no events
+        assert list(scrape_changes(index, "Dallas, TX", limit=400)) == []
+
+
+def test_change_feed_delists_complete_scrapes_only(synthetic, monkeypatch):
+    from homeharvest.changes import ChangeIndex, scrape_changes
+    from homeharvest.core.scrapers.realtor import RealtorScraper
+
+    with ChangeIndex(":memory:") as index:
+        assert list(scrape_changes(index, "Dallas, TX")) == []
+        market = index.begin("Dallas, TX", "for_sale", {})
+        index.update([(market.key, "1", "0", 1, "FOR_SALE", 1)])
+
+        #: search pages without results (an error response) don't delist pages without results (an error response)
+        with monkeypatch.context() as patched:
+            patched.setattr(synthetic.api, "respond", lambda method, url, body: {"data": None})
+            assert list(scrape_changes(index, "Dallas, TX")) == []
+        #: nor does a failed location lookup, which saw nothing of the market
+        with monkeypatch.context() as patched:
+            patched.setattr(RealtorScraper, "_resolve_location", lambda self: None)
+            RealtorScraper._location_cache.clear()
+            assert list(scrape_changes(index, "Dallas, TX")) == []
+
+        #: a complete scrape delists the property it didn't see, and nothing else
+        assert [(event.type, event.property_id) for event in scrape_changes(index, "Dallas, TX")] == [("delisted", "1")]
+
+    with ChangeIndex(":memory:") as index:
+        assert list(scrape_changes(index, "Dallas, TX", limit=400, exclude_pending=True)) == []
+        market = index.begin("Dallas, TX", "for_sale", {"limit": 400, "exclude_pending": True})
+        index.update([(market.key, "1", "0", 1, "FOR_SALE", 1)])
+        #: the limit cut off the results, even though the filters kept fewer rows than the limit
+        events = list(scrape_changes(index, "Dallas, TX", limit=400, exclude_pending=True))
+        assert events == []
+
+
+def test_watcher_schedule(synthetic):
+    from homeharvest.watch import SeenSet, Watcher
+
+    seen = SeenSet(2)
+    for property_id in ["1", "2", "1", "3"]:
+        seen.add(property_id)
+    #: the least recently seen id is forgotten first
+    assert "2" not in seen and "1" in seen and "3" in seen and len(seen) == 2
+
+    watcher = Watcher([], lambda market, prop: None, min_interval=10, max_interval=1000, smoothing=0.5)
+    market = watcher.add_market("Dallas, TX")
+    watcher._schedule(market, None, polled_at=0)  #: baseline
+    assert market.interval == 10 and market.next_poll == 10
+
+    watcher._schedule(market, 2, polled_at=10)  #: 2 new listings in 10 seconds, one every 5 seconds
+    assert market.rate == 0.2 and market.interval == 10
+    watcher._schedule(market, 0, polled_at=20)
+    assert market.rate == 0.1 and market.interval == 10
+    watcher._schedule(market, 0, polled_at=30)
+    watcher._schedule(market, 0, polled_at=40)
+    assert market.rate == 0.025 and market.interval == 40  #: slower as the average rate decays
+    market.rate = 0  #: no new listings at all, the interval doubles up to max_interval
+    watcher._schedule(market, 0, polled_at=200)
+    assert market.interval == 80
+    for polled_at in range(300, 800, 100):
+        watcher._schedule(market, 0, polled_at=polled_at)
+    assert market.interval == 1000
+
+    #: the first poll records the newest page, the next one stops at it after a single search request
+    market = watcher.add_market("Dallas, TX")
+    assert watcher.poll(market) == [] and len(market.seen) == 200
+    requests = synthetic.requests
+    assert watcher.poll(market) == []
+    assert synthetic.requests == requests + 1